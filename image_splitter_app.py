@@ -1,8 +1,152 @@
 import os
+import csv
+import time
+import hashlib
+import tempfile
 import tkinter as tk
-from tkinter import filedialog, messagebox
+from tkinter import filedialog, messagebox, simpledialog
+from concurrent.futures import ProcessPoolExecutor
 from PIL import Image, ImageTk
 
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff')
+OFFSETS_FILENAME = "offsets.csv"
+POLL_INTERVAL_MS = 100
+PREVIEW_CACHE_DIR = os.path.join(tempfile.gettempdir(), "image_splitter_previews")
+PREVIEW_CACHE_MAX_FILES = 500
+
+
+def compute_crop_boxes(img_size, orig_x1, orig_y1, rect_w, rect_h, sub_w, sub_h):
+    # Clamp the selection to the image bounds, then walk it in sub-rectangle steps
+    img_w, img_h = img_size
+    orig_x1 = max(0, int(orig_x1))
+    orig_y1 = max(0, int(orig_y1))
+    if orig_x1 + rect_w > img_w:
+        rect_w = img_w - orig_x1
+    if orig_y1 + rect_h > img_h:
+        rect_h = img_h - orig_y1
+    boxes = []
+    for row_offset in range(0, max(rect_h, 0), sub_h):
+        for col_offset in range(0, max(rect_w, 0), sub_w):
+            crop_left = orig_x1 + col_offset
+            crop_top = orig_y1 + row_offset
+            crop_right = min(crop_left + sub_w, orig_x1 + rect_w)
+            crop_bottom = min(crop_top + sub_h, orig_y1 + rect_h)
+            if crop_right > crop_left and crop_bottom > crop_top:
+                boxes.append((crop_left, crop_top, crop_right, crop_bottom))
+    return boxes
+
+
+def is_split_output(fn, bases):
+    # "{base}_{index}{ext}" written by Split & Save next to its source scan
+    base, sep, index = os.path.splitext(fn)[0].rpartition('_')
+    return bool(sep) and index.isdigit() and base in bases
+
+
+def source_image_names(folder):
+    # Sorted image names of a folder, without the tiles earlier splits left there
+    names = sorted(fn for fn in os.listdir(folder) if fn.lower().endswith(IMAGE_EXTENSIONS))
+    bases = {os.path.splitext(fn)[0] for fn in names}
+    return [fn for fn in names if not is_split_output(fn, bases)]
+
+
+def split_image_file(file_path, orig_x1, orig_y1):
+    # Runs in a worker process: decode once, save every sub-image next to the source
+    base, ext = os.path.splitext(os.path.basename(file_path))
+    folder = os.path.dirname(file_path)
+    bytes_written = 0
+    with Image.open(file_path) as img:
+        boxes = compute_crop_boxes(img.size, orig_x1, orig_y1,
+                                   ImageSplitterApp.RECT_ORIG_W, ImageSplitterApp.RECT_ORIG_H,
+                                   ImageSplitterApp.SUB_ORIG_W, ImageSplitterApp.SUB_ORIG_H)
+        for index, crop_box in enumerate(boxes, start=1):
+            save_path = os.path.join(folder, f"{base}_{index}{ext}")
+            img.crop(crop_box).save(save_path)
+            bytes_written += os.path.getsize(save_path)
+    return file_path, len(boxes), bytes_written
+
+
+def preview_cache_path(file_path, max_w, max_h):
+    st = os.stat(file_path)
+    key = f"{os.path.abspath(file_path)}|{st.st_mtime_ns}|{st.st_size}|{max_w}x{max_h}"
+    return os.path.join(PREVIEW_CACHE_DIR, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".jpg")
+
+
+def prune_preview_cache():
+    try:
+        entries = [os.path.join(PREVIEW_CACHE_DIR, fn) for fn in os.listdir(PREVIEW_CACHE_DIR)]
+    except OSError:
+        return
+    if len(entries) <= PREVIEW_CACHE_MAX_FILES:
+        return
+    entries.sort(key=lambda p: os.path.getmtime(p))
+    for old in entries[:len(entries) - PREVIEW_CACHE_MAX_FILES]:
+        try:
+            os.remove(old)
+        except OSError:
+            pass
+
+
+def load_preview(file_path, max_w, max_h):
+    # Returns (preview, original size, scale) without a full-resolution resize.
+    # JPEG is downscaled by the decoder via draft(); other formats are box-reduced
+    # once and the result is kept in a small on-disk cache.
+    with Image.open(file_path) as img:
+        img_w, img_h = img.size
+        scale = min(max_w / img_w, max_h / img_h, 1.0) # Ensure scale is not > 1
+        disp_size = (max(1, int(img_w * scale)), max(1, int(img_h * scale)))
+
+        cache_path = preview_cache_path(file_path, max_w, max_h)
+        if os.path.exists(cache_path):
+            try:
+                with Image.open(cache_path) as cached:
+                    if cached.size == disp_size:
+                        cached.load()
+                        return cached.copy(), (img_w, img_h), scale
+            except OSError:
+                pass
+
+        if img.format == "JPEG":
+            img.draft("RGB", disp_size)
+            preview = img.convert("RGB")
+        else:
+            factor = max(1, int(1 / scale))
+            if img.mode not in ("RGB", "L"):
+                img = img.convert("RGB")
+            preview = img.reduce(factor) if factor > 1 else img.copy()
+            if preview.mode != "RGB":
+                preview = preview.convert("RGB")
+        if preview.size != disp_size:
+            preview = preview.resize(disp_size, Image.Resampling.BILINEAR)
+
+    try:
+        os.makedirs(PREVIEW_CACHE_DIR, exist_ok=True)
+        preview.save(cache_path, quality=90)
+        prune_preview_cache()
+    except OSError as e:
+        print(f"Could not cache preview for '{file_path}': {e}")
+    return preview, (img_w, img_h), scale
+
+
+def warm_preview(file_path, max_w, max_h):
+    # Worker-pool entry point: only fills the cache
+    load_preview(file_path, max_w, max_h)
+    return file_path
+
+
+def read_offsets_file(path):
+    # Optional per-image offsets: one "filename,x,y" row per image (header allowed)
+    offsets = {}
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.reader(f):
+            if len(row) < 3:
+                continue
+            try:
+                offsets[row[0].strip()] = (int(float(row[1])), int(float(row[2])))
+            except ValueError:
+                continue
+    return offsets
+
+
 class ImageSplitterApp:
     # Original rectangle and sub-rectangle sizes (in original image pixels)
     RECT_ORIG_W = 5676
@@ -21,9 +165,19 @@ class ImageSplitterApp:
         open_btn = tk.Button(toolbar, text="Open Image", command=self.open_image)
         open_btn.pack(side=tk.LEFT, padx=5, pady=5)
 
+        next_btn = tk.Button(toolbar, text="Open Next", command=self.open_next_image)
+        next_btn.pack(side=tk.LEFT, padx=5, pady=5)
+
         split_btn = tk.Button(toolbar, text="Split & Save", command=self.split_and_save)
         split_btn.pack(side=tk.LEFT, padx=5, pady=5)
 
+        batch_btn = tk.Button(toolbar, text="Batch Folder", command=self.batch_split_folder)
+        batch_btn.pack(side=tk.LEFT, padx=5, pady=5)
+
+        self.status_var = tk.StringVar(value="")
+        status_label = tk.Label(root, textvariable=self.status_var, anchor=tk.W)
+        status_label.pack(side=tk.BOTTOM, fill=tk.X)
+
         # Canvas for image display
         self.canvas = tk.Canvas(root, cursor="cross")
         self.canvas.pack(fill=tk.BOTH, expand=True)
@@ -32,43 +186,72 @@ class ImageSplitterApp:
         self.canvas.bind("<ButtonPress-1>", self.on_press)
         self.canvas.bind("<B1-Motion>", self.on_drag)
 
-        self.img = None
+        self.img_size = None
         self.photo = None
         self.rect = None
         self.file_path = None
         self.start_x = self.start_y = None
         self.scale = 1.0
 
+        # Worker pool shared by single splits and batch runs
+        self.executor = None
+        self.busy = False
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def get_executor(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=os.cpu_count() or 1)
+        return self.executor
+
+    def on_close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+        self.root.destroy()
+
+    def preview_bounds(self):
+        # Add some padding to avoid taking the full screen
+        pad_x = 100
+        pad_y = 150 # More padding for toolbar etc.
+        return (self.root.winfo_screenwidth() - pad_x,
+                self.root.winfo_screenheight() - pad_y)
+
     def open_image(self):
         file_path = filedialog.askopenfilename(
             title="Select Image",
-            filetypes=[("Image files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif")]
+            filetypes=[("Image files", "*.png;*.jpg;*.jpeg;*.bmp;*.gif;*.tif;*.tiff")]
         )
         if not file_path:
             return
-        self.file_path = file_path
-        # Load full-resolution image
+        self.show_image(file_path)
+
+    def next_image_path(self, file_path):
+        folder = os.path.dirname(file_path)
+        current = os.path.basename(file_path)
+        later = [fn for fn in source_image_names(folder) if fn > current]
+        return os.path.join(folder, later[0]) if later else None
+
+    def open_next_image(self):
+        if not self.file_path:
+            self.open_image()
+            return
+        next_path = self.next_image_path(self.file_path)
+        if not next_path:
+            messagebox.showinfo("Last Image", "No more images in this folder.")
+            return
+        self.show_image(next_path)
+
+    def show_image(self, file_path):
+        screen_w, screen_h = self.preview_bounds()
+        # Only a reduced preview is decoded here; split_and_save decodes the full image in a worker
         try:
-            self.img = Image.open(file_path)
+            disp_img, self.img_size, self.scale = load_preview(file_path, screen_w, screen_h)
         except Exception as e:
             messagebox.showerror("Error", f"Failed to open image:\n{e}")
             return
+        self.file_path = file_path
+        self.root.title(f"Image Splitter - {os.path.basename(file_path)}")
 
-        img_w, img_h = self.img.size
-
-        # Compute scale to fit screen (without altering original)
-        # Add some padding to avoid taking the full screen
-        pad_x = 100
-        pad_y = 150 # More padding for toolbar etc.
-        screen_w = self.root.winfo_screenwidth() - pad_x
-        screen_h = self.root.winfo_screenheight() - pad_y
-        self.scale = min(screen_w / img_w, screen_h / img_h, 1.0) # Ensure scale is not > 1
-
-        # Create a downscaled preview for display
-        disp_w = int(img_w * self.scale)
-        disp_h = int(img_h * self.scale)
-        # Use ANTIALIAS for better quality resizing
-        disp_img = self.img.resize((disp_w, disp_h), Image.Resampling.LANCZOS) # Updated PIL resampling
+        disp_w, disp_h = disp_img.size
         self.photo = ImageTk.PhotoImage(disp_img)
 
         # Configure canvas
@@ -96,6 +279,14 @@ class ImageSplitterApp:
         # Clear any previous status text
         self.canvas.delete("status_text")
 
+        # Decode the next scan's preview in the background so opening it is instant
+        try:
+            next_path = self.next_image_path(file_path)
+        except OSError:
+            next_path = None
+        if next_path:
+            self.get_executor().submit(warm_preview, next_path, screen_w, screen_h)
+
 
     def on_press(self, event):
         if not self.rect:
@@ -147,98 +338,169 @@ class ImageSplitterApp:
         self.start_y = event.y
 
     def split_and_save(self):
-        if not self.img or not self.rect:
+        if not self.img_size or not self.rect:
             messagebox.showwarning("No Image", "Please load an image first.")
             return
         if not self.file_path:
              messagebox.showerror("Error", "Cannot save, original file path not found.")
              return
-
-        base, ext = os.path.splitext(os.path.basename(self.file_path))
-        folder = os.path.dirname(self.file_path)
+        if self.busy:
+            messagebox.showwarning("Busy", "A split is already running.")
+            return
 
         # Get rectangle coordinates in display scale
         x1_disp, y1_disp, x2_disp, y2_disp = self.canvas.coords(self.rect)
 
         # Convert display coordinates back to original image coordinates
-        # Ensure division by scale is done carefully, handling potential float inaccuracies
         orig_x1 = int(x1_disp / self.scale)
         orig_y1 = int(y1_disp / self.scale)
-        # Use the predefined original rectangle dimensions for consistency
-        # The actual width/height might be slightly off due to scaling/clamping
-        orig_rect_w = self.RECT_ORIG_W
-        orig_rect_h = self.RECT_ORIG_H
-
-        # Ensure the crop area doesn't exceed the original image bounds
-        img_w, img_h = self.img.size
-        if orig_x1 + orig_rect_w > img_w:
-            orig_rect_w = img_w - orig_x1
-        if orig_y1 + orig_rect_h > img_h:
-            orig_rect_h = img_h - orig_y1
-        if orig_x1 < 0: orig_x1 = 0 # Should not happen with clamping, but safety check
-        if orig_y1 < 0: orig_y1 = 0
-
-        index = 1
-        num_saved = 0
-        try:
-            # Iterate based on the *original* sub-rectangle dimensions within the selected *original* rectangle area
-            for row_offset in range(0, orig_rect_h, self.SUB_ORIG_H):
-                for col_offset in range(0, orig_rect_w, self.SUB_ORIG_W):
-                    # Define the crop box relative to the original image's top-left (0,0)
-                    crop_left = orig_x1 + col_offset
-                    crop_top = orig_y1 + row_offset
-                    # Calculate the right and bottom edges, ensuring they don't exceed the selected rect bounds
-                    crop_right = min(orig_x1 + col_offset + self.SUB_ORIG_W, orig_x1 + orig_rect_w)
-                    crop_bottom = min(orig_y1 + row_offset + self.SUB_ORIG_H, orig_y1 + orig_rect_h)
-
-                    # Check if the calculated crop box has valid dimensions (width/height > 0)
-                    if crop_right > crop_left and crop_bottom > crop_top:
-                        crop_box = (crop_left, crop_top, crop_right, crop_bottom)
-                        region = self.img.crop(crop_box)
-
-                        # Construct save path
-                        save_path = os.path.join(folder, f"{base}_{index}{ext}")
-                        region.save(save_path)
-                        # print(f"Saved: {save_path} from box {crop_box}") # Optional: for debugging
-                        index += 1
-                        num_saved += 1
-                    # else: # Optional: Debugging for invalid crop boxes
-                        # print(f"Skipped invalid crop box: L{crop_left}, T{crop_top}, R{crop_right}, B{crop_bottom}")
-
-
-            messagebox.showinfo("Success", f"{num_saved} sub-images saved successfully in '{folder}'.")
-
-            # Optionally ask before deleting original
-            if messagebox.askyesno("Delete Original?", f"Do you want to delete the original file?\n{self.file_path}"):
-                 try:
-                     os.remove(self.file_path)
-                     print(f"Original file '{self.file_path}' deleted.")
-                     # Clear the display after deleting
-                     self.canvas.delete("all")
-                     self.img = None
-                     self.photo = None
-                     self.rect = None
-                     self.file_path = None
-                     self.root.title("Image Splitter") # Reset title
-                 except OSError as e:
-                     messagebox.showerror("Deletion Error", f"Could not delete original file:\n{e}")
-                 except Exception as e: # Catch other potential errors
-                      messagebox.showerror("Error", f"An unexpected error occurred during deletion:\n{e}")
-
-            else:
-                 # Overlay success text on canvas if original not deleted
-                self.canvas.delete("status_text") # Remove previous text if any
-                self.canvas.create_text(
-                    self.canvas.winfo_width() // 2, 20, # Centered horizontally, near top
-                    text="Split complete!",
-                    fill="green",
-                    font=("Helvetica", 16, "bold"),
-                    tags="status_text",
-                    anchor=tk.N # Anchor text at the top-center
-                )
 
+        # Crop/save runs in the worker pool so the window stays responsive
+        self.busy = True
+        self.status_var.set(f"Splitting {os.path.basename(self.file_path)}...")
+        future = self.get_executor().submit(split_image_file, self.file_path, orig_x1, orig_y1)
+        self.root.after(POLL_INTERVAL_MS, self._poll_single_split, future, self.file_path)
+
+    def _poll_single_split(self, future, file_path):
+        if not future.done():
+            self.root.after(POLL_INTERVAL_MS, self._poll_single_split, future, file_path)
+            return
+        self.busy = False
+        self.status_var.set("")
+        try:
+            _, num_saved, _ = future.result()
         except Exception as e:
             messagebox.showerror("Save Error", f"An error occurred while splitting or saving:\n{e}")
+            return
+
+        folder = os.path.dirname(file_path)
+        messagebox.showinfo("Success", f"{num_saved} sub-images saved successfully in '{folder}'.")
+
+        # The user may have opened another image while the split was running
+        if file_path != self.file_path:
+            return
+
+        # Optionally ask before deleting original
+        if messagebox.askyesno("Delete Original?", f"Do you want to delete the original file?\n{file_path}"):
+             try:
+                 os.remove(file_path)
+                 print(f"Original file '{file_path}' deleted.")
+                 # Clear the display after deleting
+                 self.canvas.delete("all")
+                 self.img_size = None
+                 self.photo = None
+                 self.rect = None
+                 self.file_path = None
+                 self.root.title("Image Splitter") # Reset title
+             except OSError as e:
+                 messagebox.showerror("Deletion Error", f"Could not delete original file:\n{e}")
+             except Exception as e: # Catch other potential errors
+                  messagebox.showerror("Error", f"An unexpected error occurred during deletion:\n{e}")
+
+        else:
+             # Overlay success text on canvas if original not deleted
+            self.canvas.delete("status_text") # Remove previous text if any
+            self.canvas.create_text(
+                self.canvas.winfo_width() // 2, 20, # Centered horizontally, near top
+                text="Split complete!",
+                fill="green",
+                font=("Helvetica", 16, "bold"),
+                tags="status_text",
+                anchor=tk.N # Anchor text at the top-center
+            )
+
+    def current_offset(self):
+        # Offset of the on-screen rectangle in original image pixels, if any
+        if not self.img_size or not self.rect:
+            return None
+        x1_disp, y1_disp, _, _ = self.canvas.coords(self.rect)
+        return int(x1_disp / self.scale), int(y1_disp / self.scale)
+
+    def batch_split_folder(self):
+        if self.busy:
+            messagebox.showwarning("Busy", "A split is already running.")
+            return
+        folder = filedialog.askdirectory(title="Select Folder to Split")
+        if not folder:
+            return
+        paths = [os.path.join(folder, fn) for fn in source_image_names(folder)]
+        if not paths:
+            messagebox.showwarning("No Images", f"No images found in '{folder}'.")
+            return
+
+        per_image = {}
+        offsets_path = os.path.join(folder, OFFSETS_FILENAME)
+        if os.path.isfile(offsets_path):
+            try:
+                per_image = read_offsets_file(offsets_path)
+            except Exception as e:
+                messagebox.showerror("Error", f"Could not read '{OFFSETS_FILENAME}':\n{e}")
+                return
+
+        # Images without their own row in offsets.csv use one shared offset
+        shared = self.current_offset()
+        if any(os.path.basename(p) not in per_image for p in paths):
+            initial = f"{shared[0]},{shared[1]}" if shared else "0,0"
+            answer = simpledialog.askstring(
+                "Shared Offset",
+                f"Rectangle offset x,y (original pixels) for images not listed in {OFFSETS_FILENAME}:",
+                initialvalue=initial, parent=self.root)
+            if answer is None:
+                return
+            try:
+                shared = tuple(int(float(v)) for v in answer.split(","))
+                if len(shared) != 2:
+                    raise ValueError(answer)
+            except ValueError:
+                messagebox.showerror("Error", f"Invalid offset: '{answer}'. Use the form x,y.")
+                return
+
+        executor = self.get_executor()
+        futures = []
+        for path in paths:
+            x, y = per_image.get(os.path.basename(path), shared)
+            futures.append(executor.submit(split_image_file, path, x, y))
+
+        self.busy = True
+        batch = {
+            'folder': folder, 'pending': futures, 'total': len(futures),
+            'done': 0, 'tiles': 0, 'bytes': 0, 'errors': [], 'started': time.perf_counter(),
+        }
+        self.status_var.set(f"Batch: 0/{batch['total']} images")
+        self.root.after(POLL_INTERVAL_MS, self._poll_batch, batch)
+
+    def _poll_batch(self, batch):
+        still_pending = []
+        for future in batch['pending']:
+            if not future.done():
+                still_pending.append(future)
+                continue
+            batch['done'] += 1
+            try:
+                _, num_tiles, num_bytes = future.result()
+                batch['tiles'] += num_tiles
+                batch['bytes'] += num_bytes
+            except Exception as e:
+                batch['errors'].append(str(e))
+        batch['pending'] = still_pending
+
+        elapsed = max(time.perf_counter() - batch['started'], 1e-6)
+        throughput = (f"{batch['done'] / elapsed:.2f} img/s, {batch['tiles'] / elapsed:.1f} tiles/s, "
+                      f"{batch['bytes'] / elapsed / 1e6:.1f} MB/s")
+        self.status_var.set(f"Batch: {batch['done']}/{batch['total']} images, {batch['tiles']} tiles ({throughput})")
+
+        if still_pending:
+            self.root.after(POLL_INTERVAL_MS, self._poll_batch, batch)
+            return
+
+        self.busy = False
+        summary = (f"{batch['done'] - len(batch['errors'])} of {batch['total']} images split into "
+                   f"{batch['tiles']} sub-images in {elapsed:.1f} s\n({throughput}).")
+        if batch['errors']:
+            print("\n".join(batch['errors']))
+            messagebox.showwarning("Batch Finished", f"{summary}\n\n{len(batch['errors'])} images failed, see console.")
+        else:
+            messagebox.showinfo("Batch Finished", f"{summary}\nSaved in '{batch['folder']}'.")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,164 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import tracemalloc
+
+try:
+    import psutil
+except ImportError:  # psutil is optional; fall back to /proc or getrusage
+    psutil = None
+
+MB = 1024 * 1024
+
+
+def current_rss_bytes():
+    if psutil is not None:
+        try:
+            return psutil.Process(os.getpid()).memory_info().rss
+        except Exception:
+            pass
+    try:
+        with open('/proc/self/statm') as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError, IndexError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes on Linux
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except (ImportError, OSError):
+        return None
+
+
+class StageStats:
+    def __init__(self, name):
+        self.name = name
+        self.samples = 0
+        self.rss_high_water = 0
+        self.heap_high_water = 0
+        self.first_rss = None
+        self.last_rss = None
+        self.top_growth = []
+
+    def add(self, rss, heap_peak):
+        self.samples += 1
+        if rss is not None:
+            if self.first_rss is None:
+                self.first_rss = rss
+            self.last_rss = rss
+            self.rss_high_water = max(self.rss_high_water, rss)
+        self.heap_high_water = max(self.heap_high_water, heap_peak)
+
+
+class MemoryMonitor:
+    STAGES = ('load', 'delimit', 'tile', 'infer', 'review')
+
+    def __init__(self, budget_mb=0, warn_fraction=0.9, trace=True, snapshot_top=5):
+        self.budget_bytes = int(budget_mb * MB) if budget_mb else 0
+        self.warn_fraction = warn_fraction
+        self.snapshot_top = snapshot_top
+        self.started_at = time.time()
+        self.stages = {}
+        self.rss_high_water = 0
+        self.rss_high_water_stage = None
+        self.heap_high_water = 0
+        self._warned_levels = set()
+        self._last_snapshot = None
+        self._owns_tracemalloc = False
+        if trace and not tracemalloc.is_tracing():
+            # One frame per allocation keeps the tracing overhead small
+            tracemalloc.start(1)
+            self._owns_tracemalloc = True
+
+    def _stage(self, stage):
+        if stage not in self.stages:
+            self.stages[stage] = StageStats(stage)
+        return self.stages[stage]
+
+    def sample(self, stage):
+        """Cheap RSS/heap reading; returns a warning string when the budget is close."""
+        rss = current_rss_bytes()
+        heap_peak = 0
+        if tracemalloc.is_tracing():
+            _, heap_peak = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+        self._stage(stage).add(rss, heap_peak)
+        if rss is not None and rss > self.rss_high_water:
+            self.rss_high_water = rss
+            self.rss_high_water_stage = stage
+        self.heap_high_water = max(self.heap_high_water, heap_peak)
+        return self._check_budget(rss, stage)
+
+    def boundary(self, stage):
+        """Stage boundary: sample and keep the top allocation growth since the previous boundary."""
+        warning = self.sample(stage)
+        if tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot().filter_traces((
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+            ))
+            if self._last_snapshot is not None:
+                diff = snapshot.compare_to(self._last_snapshot, 'lineno')
+                self._stage(stage).top_growth = [
+                    str(stat) for stat in diff[:self.snapshot_top] if stat.size_diff > 0
+                ]
+            self._last_snapshot = snapshot
+        return warning
+
+    def would_exceed(self, extra_bytes, stage):
+        """Predictive check before allocating `extra_bytes` (e.g. decoding a plate)."""
+        rss = current_rss_bytes()
+        if rss is None or not self.budget_bytes:
+            return None
+        return self._check_budget(rss + extra_bytes, stage, predicted=True)
+
+    def _check_budget(self, rss, stage, predicted=False):
+        if not self.budget_bytes or rss is None:
+            return None
+        if rss >= self.budget_bytes:
+            level = 'exceeded'
+        elif rss >= self.budget_bytes * self.warn_fraction:
+            level = 'warning'
+        else:
+            return None
+        # Each level is reported once per session so long loops do not spam the operator
+        if level in self._warned_levels:
+            return None
+        self._warned_levels.add(level)
+        prefix = "previsto" if predicted else "atual"
+        return (f"Memória {prefix} na etapa '{stage}': {rss / MB:.0f} MB "
+                f"({'acima do' if level == 'exceeded' else 'próximo ao'} limite de {self.budget_bytes / MB:.0f} MB)")
+
+    def report(self):
+        lines = ["Relatório de Memória",
+                 f"Duração da sessão: {time.time() - self.started_at:.0f} s"]
+        if self.budget_bytes:
+            lines.append(f"Limite configurado: {self.budget_bytes / MB:.0f} MB")
+        if self.rss_high_water:
+            lines.append(f"Pico RSS: {self.rss_high_water / MB:.1f} MB (etapa '{self.rss_high_water_stage}')")
+        lines.append(f"Pico heap Python (tracemalloc): {self.heap_high_water / MB:.1f} MB")
+        ordered = [s for s in self.STAGES if s in self.stages] + \
+                  [s for s in self.stages if s not in self.STAGES]
+        for name in ordered:
+            st = self.stages[name]
+            lines.append("")
+            lines.append(f"[{name}] amostras={st.samples} pico RSS={st.rss_high_water / MB:.1f} MB "
+                         f"pico heap={st.heap_high_water / MB:.1f} MB")
+            if st.first_rss is not None and st.last_rss is not None:
+                lines.append(f"  variação RSS na etapa: {(st.last_rss - st.first_rss) / MB:+.1f} MB")
+            for growth in st.top_growth:
+                lines.append(f"  {growth}")
+        return "\n".join(lines)
+
+    def write_report(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.report() + "\n")
+        return path
+
+    def stop(self):
+        if self._owns_tracemalloc and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self._last_snapshot = None
@@ -1,34 +1,100 @@
 # -*- coding: utf-8 -*-
 import sys
 import os
+import math
 import random
 import numpy as np
+import cv2
 from PyQt6.QtWidgets import (
     QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
     QPushButton, QFileDialog, QListWidget, QLabel, QGraphicsView,
-    QGraphicsScene, QGraphicsPixmapItem, QGraphicsRectItem, QMessageBox,
-    QSizePolicy, QSplitter, QTextEdit, QListWidgetItem, QGraphicsItem,
-    QLineEdit
+    QGraphicsScene, QGraphicsRectItem, QMessageBox,
+    QSizePolicy, QSplitter, QTextEdit, QListWidgetItem, QGraphicsItem, QGraphicsSimpleTextItem,
+    QLineEdit, QCheckBox
 )
 from PyQt6.QtGui import (QPixmap, QImage, QPainter, QPen, QColor, QDoubleValidator, QIntValidator,
                          QWheelEvent, QKeyEvent) 
-from PyQt6.QtCore import Qt, QRectF, QPointF, QSize, QSizeF
+from PyQt6.QtCore import Qt, QRectF, QPointF, QSize
 from PIL import Image
 import traceback
-import csv
+import io
+import json
+from collections import OrderedDict
 from datetime import datetime
-from ultralytics import YOLO
-import cv2
+from memory_monitor import MemoryMonitor
+from seed_detections import DetectionTable, DETECTIONS_FILENAME
+from seed_store import AnalysisStore, QUEUED_STATUS
+from seed_queue import CursorQueue
+from seed_triage import TRIAGE_ENABLED, triage_tile, triage_summary
+from seed_mosaic import plate_mosaic
+from seed_report import report_filename, write_report
+from seed_cache import load_decoded
+from seed_bundle import (BUNDLE_METADATA_MEMBER, bundle_member_path, split_member_path, is_member_path, path_exists,
+                         read_bytes, write_bytes, save_image, close_containers, image_size,
+                         expand_archives, output_base_dir, source_label)
+from seed_archive import is_archive
+from seed_watch import SESSION_FILENAME, read_session
+from seed_autotune import load_inference_profile
+from seed_pipeline import (
+    TARGET_RECT_WIDTH_ORIGINAL, TARGET_RECT_HEIGHT_ORIGINAL, TILE_COLS, TILE_ROWS,
+    EXPECTED_PROCESSED_WIDTH, EXPECTED_PROCESSED_HEIGHT, MODEL_PATH, SYNTHETIC_MODEL_PATH, INFERENCE_SERVER_URL,
+    ORIGINAL_TILES_DIRNAME, ORIGINAL_ANALYZED_DIRNAME, PROCESSED_ANALYZED_DIRNAME, OUTPUT_BUNDLE, BUNDLE_FILENAME,
+    PRESCREEN_EMPTY, PRESCREEN_BLURRY, is_image_file, plate_tile_rects, tile_name, load_model, screen_and_analyze_tile, prescreen_summary,
+    cascade_summary, reset_cascade_stats
+)
 
 # --- Configuration ---
-TARGET_RECT_WIDTH_ORIGINAL = 5676
-TARGET_RECT_HEIGHT_ORIGINAL = 1892
-TILE_COLS = 6
-TILE_ROWS = 2
-EXPECTED_PROCESSED_WIDTH = 946
-EXPECTED_PROCESSED_HEIGHT = 946
+MEMORY_BUDGET_MB = 0  # 0 disables budget warnings
+MEMORY_WARNING_FRACTION = 0.9
+# Allocation tracing slows every allocation; turn on (SEED_ANALYZER_TRACEMALLOC=1) only to hunt a leak
+MEMORY_TRACEMALLOC = os.environ.get('SEED_ANALYZER_TRACEMALLOC', '') == '1'
+MOSAIC_CACHE_PLATES = 8  # stitched plate mosaics kept in memory
+LOD_TILE_SIZE = 512      # pixels per side of the viewer's pyramid tiles
+LOD_CACHE_TILES = 64     # tile pixmaps kept per image (about 1 MB each)
+LOD_MAX_ZOOM = 4.0       # screen pixels per original pixel at the deepest zoom
 # --- End Configuration ---
 
+IMAGE_FILE_FILTER = ("Imagens ou arquivos compactados (*.png *.jpg *.jpeg *.bmp *.tif *.tiff "
+                     "*.zip *.tar *.tar.gz *.tgz *.tar.bz2 *.tar.xz)")
+
+ANALYSIS_STATUS_MARKERS = {'Confirmado': ' [C]', 'Removido': ' [R]', 'Erro no Processamento': ' [ERRO]',
+                           QUEUED_STATUS: ' [AGUARDANDO]'}
+PRESCREEN_MARKERS = {PRESCREEN_EMPTY: ' [VAZIO]', PRESCREEN_BLURRY: ' [DESFOCADO]'}
+
+def load_pixmap(path):
+    if is_member_path(path):
+        pixmap = QPixmap()
+        pixmap.loadFromData(read_bytes(path))
+        return pixmap
+    return QPixmap(path)
+
+def source_list_item(path, suffix=''):
+    # The full path rides along so equal names from different folders of an archive stay apart
+    list_item = QListWidgetItem(source_label(path) + suffix)
+    list_item.setData(Qt.ItemDataRole.UserRole, path)
+    return list_item
+
+def analysis_list_text(item):
+    screen = item.get('prescreen')
+    prescreen_marker = PRESCREEN_MARKERS.get(screen['reason'], '') if screen else ''
+    triage = item.get('triage') or {}
+    if triage.get('auto') and item['status'] == 'Confirmado':
+        status_marker = ' [C auto]'
+    else:
+        status_marker = (' [AUDITORIA]' if triage.get('audit') else '') + ANALYSIS_STATUS_MARKERS.get(item['status'], '')
+    return source_label(item['recorte']) + prescreen_marker + status_marker
+
+def update_analysis_list_item(list_item, item):
+    list_item.setText(analysis_list_text(item))
+    status = item['status']
+    if status == QUEUED_STATUS:
+        list_item.setForeground(QColor('gray'))
+    elif status and status.startswith('Erro'):
+        list_item.setForeground(QColor('magenta'))
+    else:
+        list_item.setData(Qt.ItemDataRole.ForegroundRole, None)
+    return list_item
+
 class ConstrainedRectItem(QGraphicsRectItem):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
@@ -53,8 +119,9 @@ class ConstrainedRectItem(QGraphicsRectItem):
             max_x = self.boundary_rect.right() - w
             min_y = self.boundary_rect.top()
             max_y = self.boundary_rect.bottom() - h
-            x = max(min_x, min(new_pos.x(), max_x))
-            y = max(min_y, min(new_pos.y(), max_y))
+            # Scene units are original pixels: keep the ROI on whole pixels
+            x = round(max(min_x, min(new_pos.x(), max_x)))
+            y = round(max(min_y, min(new_pos.y(), max_y)))
             return QPointF(x, y)
         return super().itemChange(change, value)
 
@@ -121,85 +188,187 @@ class NavigableGraphicsView(QGraphicsView):
         if not processed_by_us:
             super().keyPressEvent(event)
 
+class TiledImageItem(QGraphicsItem):
+    """A scan drawn from a pyramid of tiles, in original-pixel scene coordinates.
+
+    `pixels` is the decoded RGB array (possibly a memory map from the decode cache).
+    Level k halves level k-1. Each paint uses the coarsest level that still has one
+    image pixel per screen pixel and converts only the exposed tiles of it to
+    pixmaps; the last LOD_CACHE_TILES tiles are kept in an LRU cache.
+    """
+
+    def __init__(self, pixels, parent=None):
+        super().__init__(parent)
+        self.pixels = pixels
+        self.levels = {0: pixels}
+        self.tiles = OrderedDict()
+        self.height, self.width = pixels.shape[:2]
+        self.max_level = 0
+        while max(self.width, self.height) / 2 ** self.max_level > LOD_TILE_SIZE:
+            self.max_level += 1
+        self.setFlag(QGraphicsItem.GraphicsItemFlag.ItemUsesExtendedStyleOption)
+
+    def boundingRect(self):
+        return QRectF(0, 0, self.width, self.height)
+
+    def level_image(self, level):
+        img = self.levels.get(level)
+        if img is None:
+            previous = self.level_image(level - 1)
+            h, w = previous.shape[:2]
+            img = self.levels[level] = cv2.resize(previous, (max(1, w // 2), max(1, h // 2)),
+                                                  interpolation=cv2.INTER_AREA)
+        return img
+
+    def tile_pixmap(self, level, tx, ty):
+        key = (level, tx, ty)
+        pixmap = self.tiles.get(key)
+        if pixmap is not None:
+            self.tiles.move_to_end(key)
+            return pixmap
+        img = self.level_image(level)
+        # Only this tile of the level is read (and paged in, for a memory map)
+        crop = np.ascontiguousarray(img[ty * LOD_TILE_SIZE:(ty + 1) * LOD_TILE_SIZE,
+                                        tx * LOD_TILE_SIZE:(tx + 1) * LOD_TILE_SIZE])
+        h, w = crop.shape[:2]
+        pixmap = QPixmap.fromImage(QImage(crop.data, w, h, w * 3, QImage.Format.Format_RGB888))
+        self.tiles[key] = pixmap
+        if len(self.tiles) > LOD_CACHE_TILES:
+            self.tiles.popitem(last=False)
+        return pixmap
+
+    def paint(self, painter, option, widget=None):
+        lod = option.levelOfDetailFromTransform(painter.worldTransform())
+        level = self.max_level if lod <= 0 else min(self.max_level, max(0, int(math.floor(math.log2(1 / lod)))))
+        img = self.level_image(level)
+        sx, sy = self.width / img.shape[1], self.height / img.shape[0]  # original pixels per level pixel
+        exposed = option.exposedRect.intersected(self.boundingRect())
+        span_x, span_y = LOD_TILE_SIZE * sx, LOD_TILE_SIZE * sy
+        painter.setRenderHint(QPainter.RenderHint.SmoothPixmapTransform)
+        for ty in range(int(exposed.top() // span_y), int(math.ceil(exposed.bottom() / span_y))):
+            for tx in range(int(exposed.left() // span_x), int(math.ceil(exposed.right() / span_x))):
+                pixmap = self.tile_pixmap(level, tx, ty)
+                target = QRectF(tx * span_x, ty * span_y, pixmap.width() * sx, pixmap.height() * sy)
+                painter.drawPixmap(target, pixmap, QRectF(pixmap.rect()))
+
+
 class PlacementView(QGraphicsView):
     def __init__(self, list_widget_ref, parent=None): 
         super().__init__(parent)
         self.list_widget_ref = list_widget_ref 
         self._scene = QGraphicsScene(self)
         self.setScene(self._scene)
-        self.pixmap_item = None
-        self.rect_item = None
-        self.current_scale_factor = 1.0
+        self.image_item = None
+        self.rect_items = []  # one red rectangle per plate in the scan
         self.original_image_size = QSize()
+        self.zoomed = False
         self.setRenderHint(QPainter.RenderHint.Antialiasing)
         self.setDragMode(QGraphicsView.DragMode.ScrollHandDrag)
+        self.setTransformationAnchor(QGraphicsView.ViewportAnchor.AnchorUnderMouse)
         self.setFocusPolicy(Qt.FocusPolicy.StrongFocus)
 
-    def set_image(self, pixmap_original: QPixmap):
+    def set_image(self, pixels):
+        """Shows a decoded scan (RGB array). Scene coordinates are original pixels; the view
+        transform does the scaling, so only the visible pyramid tiles are ever converted."""
         try:
             self._scene.clear()
-            self.rect_item = None
-            self.pixmap_item = None
-            if pixmap_original.isNull():
+            self.rect_items = []
+            self.image_item = None
+            if pixels is None:
                 return
-            self.original_image_size = pixmap_original.size()
-            view_rect = self.viewport().rect()
-            if view_rect.width() <= 0 or view_rect.height() <= 0:
-                view_rect.setSize(QSize(400, 300))
-            img_rect = QRectF(QPointF(0, 0), QSizeF(pixmap_original.size()))
-            scale_x = view_rect.width() / img_rect.width()
-            scale_y = view_rect.height() / img_rect.height()
-            factor = max(0.001, min(scale_x, scale_y, 1.0))
-            sw = max(1, int(img_rect.width() * factor))
-            sh = max(1, int(img_rect.height() * factor))
-            scaled = pixmap_original.scaled(sw, sh, Qt.AspectRatioMode.KeepAspectRatio, Qt.TransformationMode.SmoothTransformation)
-            self.current_scale_factor = factor
-            self.pixmap_item = QGraphicsPixmapItem(scaled)
-            self._scene.addItem(self.pixmap_item)
-            scene_rect = self.pixmap_item.boundingRect()
-            self.setSceneRect(scene_rect)
-            self.create_initial_rectangle(scene_rect)
+            self.original_image_size = QSize(pixels.shape[1], pixels.shape[0])
+            self.image_item = TiledImageItem(pixels)
+            self._scene.addItem(self.image_item)
+            self.setSceneRect(self.image_item.boundingRect())
+            self.fit_image()
+            self.create_initial_rectangle(self.image_item.boundingRect())
         except Exception as e:
             print(f"PlacementView.set_image error: {e}")
             traceback.print_exc()
 
+    def fit_image(self):
+        self.zoomed = False
+        if self.image_item:
+            self.fitInView(self.image_item.boundingRect(), Qt.AspectRatioMode.KeepAspectRatio)
+
+    def zoom(self, steps):
+        if not self.image_item:
+            return
+        current = self.transform().m11()
+        rect = self.image_item.boundingRect()
+        view = self.viewport().rect()
+        fit = min(view.width() / rect.width(), view.height() / rect.height())
+        target = max(fit, min(current * 1.25 ** steps, LOD_MAX_ZOOM))
+        if target <= fit:
+            self.fit_image()
+            return
+        self.scale(target / current, target / current)
+        self.zoomed = True
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if not self.zoomed:
+            self.fit_image()
+
     def create_initial_rectangle(self, boundary: QRectF):
-        if self.rect_item:
-            self._scene.removeItem(self.rect_item)
-        w = TARGET_RECT_WIDTH_ORIGINAL * self.current_scale_factor
-        h = TARGET_RECT_HEIGHT_ORIGINAL * self.current_scale_factor
-        w, h = max(1.0, w), max(1.0, h)
-        self.rect_item = ConstrainedRectItem(0, 0, w, h)
-        self.rect_item.setBoundary(boundary)
+        for item in self.rect_items:
+            self._scene.removeItem(item)
+        self.rect_items = []
+        self.add_rectangle(boundary)
+
+    def add_rectangle(self, boundary: QRectF = None):
+        boundary = boundary or self.image_item.boundingRect()
+        w, h = TARGET_RECT_WIDTH_ORIGINAL, TARGET_RECT_HEIGHT_ORIGINAL
+        rect_item = ConstrainedRectItem(0, 0, w, h)
+        rect_item.setBoundary(boundary)
         pen = QPen(QColor("red"), 1)
         pen.setCosmetic(True)
-        self.rect_item.setPen(pen)
-        self.rect_item.setZValue(1)
-        self._scene.addItem(self.rect_item)
-        self.rect_item.setPos(boundary.left(), boundary.top())
-
-    def get_roi_original_coords(self) -> tuple | None:
-        if not self.rect_item:
-            return None
-        pos = self.rect_item.scenePos()
-        ox, oy = pos.x() / self.current_scale_factor, pos.y() / self.current_scale_factor
+        rect_item.setPen(pen)
+        rect_item.setZValue(1)
+        label = QGraphicsSimpleTextItem(str(len(self.rect_items) + 1), rect_item)
+        label.setBrush(QColor("red"))
+        label.setFlag(QGraphicsItem.GraphicsItemFlag.ItemIgnoresTransformations)
+        label.setPos(3, 1)
+        self._scene.addItem(rect_item)
+        # A new plate starts below the previous one when it fits there
+        top = boundary.top()
+        if self.rect_items:
+            below = self.rect_items[-1].scenePos().y() + h
+            if below + h <= boundary.bottom():
+                top = below
+        rect_item.setPos(boundary.left(), top)
+        self.rect_items.append(rect_item)
+        return rect_item
+
+    def remove_last_rectangle(self):
+        if len(self.rect_items) <= 1:
+            return False
+        self._scene.removeItem(self.rect_items.pop())
+        return True
+
+    def get_rois_original_coords(self) -> list:
+        rois = []
         w, h = TARGET_RECT_WIDTH_ORIGINAL, TARGET_RECT_HEIGHT_ORIGINAL
-        return (max(0, min(ox, self.original_image_size.width() - w)),
-                max(0, min(oy, self.original_image_size.height() - h)), w, h)
-
-    def show_existing_roi(self, roi):
-        if not self.pixmap_item:
+        for rect_item in self.rect_items:
+            pos = rect_item.scenePos()
+            rois.append((max(0, min(int(round(pos.x())), self.original_image_size.width() - w)),
+                         max(0, min(int(round(pos.y())), self.original_image_size.height() - h)), w, h))
+        return rois
+
+    def show_existing_rois(self, rois):
+        if not self.image_item:
             return
-        orig_x, orig_y, _, _ = roi 
-        scaled_x = orig_x * self.current_scale_factor
-        scaled_y = orig_y * self.current_scale_factor
-        if not self.rect_item:
-            self.create_initial_rectangle(self.pixmap_item.boundingRect())
-        self.rect_item.setPos(scaled_x, scaled_y)
+        boundary = self.image_item.boundingRect()
+        self.create_initial_rectangle(boundary)
+        for _ in rois[1:]:
+            self.add_rectangle(boundary)
+        for rect_item, (orig_x, orig_y, _, _) in zip(self.rect_items, rois):
+            rect_item.setPos(orig_x, orig_y)
 
     def wheelEvent(self, event: QWheelEvent):
         if QApplication.keyboardModifiers() & Qt.KeyboardModifier.ControlModifier:
-            super().wheelEvent(event) 
+            self.zoom(event.angleDelta().y() / 120)
+            event.accept()
             return
 
         if not self.list_widget_ref or self.list_widget_ref.count() == 0:
@@ -248,6 +417,38 @@ class PlacementView(QGraphicsView):
             super().keyPressEvent(event)
 
 
+class MosaicView(NavigableGraphicsView):
+    """All tiles of one plate in a single view: left click confirms a tile, right click removes it,
+    Page Up/Page Down move to the previous/next plate."""
+
+    def __init__(self, list_widget_ref, on_cell_clicked, on_plate_step, parent=None):
+        super().__init__(list_widget_ref, parent)
+        self.on_cell_clicked = on_cell_clicked
+        self.on_plate_step = on_plate_step
+        self.cells = []  # (scene rect, row)
+
+    def mousePressEvent(self, event):
+        pos = self.mapToScene(event.position().toPoint())
+        for rect, row in self.cells:
+            if rect.contains(pos):
+                self.on_cell_clicked(row, event.button())
+                event.accept()
+                return
+        super().mousePressEvent(event)
+
+    def keyPressEvent(self, event: QKeyEvent):
+        if event.key() in (Qt.Key.Key_PageDown, Qt.Key.Key_PageUp):
+            self.on_plate_step(1 if event.key() == Qt.Key.Key_PageDown else -1)
+            event.accept()
+            return
+        super().keyPressEvent(event)
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        if self.scene() and not self.scene().sceneRect().isEmpty():
+            self.fitInView(self.scene().sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
+
+
 class SeedAnalyzerApp(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -255,16 +456,26 @@ class SeedAnalyzerApp(QMainWindow):
         self.resize(1200, 700)
         self.image_paths = []
         self.image_data = {}
-        self.analysis_items = []
+        self.analysis_items = AnalysisStore()
+        self.detection_table = DetectionTable()
         self.analysis_stage = False
+        self.inference_queue = None
+        self.mosaic_cache = OrderedDict()
+        self.mosaic_key = None
+        self.mosaic_overlays = []
         self.processed_files_base_dir = None
+        self.memory_monitor = MemoryMonitor(MEMORY_BUDGET_MB, MEMORY_WARNING_FRACTION, trace=MEMORY_TRACEMALLOC)
         docs = "C:\\Documentos"
         self.default_directory = docs if os.path.isdir(docs) else os.path.expanduser("~")
         self.yolo_model = None
-        self.model_path = "model_weights/best.pt" 
+        self.model_path = MODEL_PATH
+        self.inference_profile = load_inference_profile()
         try:
-            if os.path.exists(self.model_path):
-                self.yolo_model = YOLO(self.model_path)
+            if INFERENCE_SERVER_URL:
+                self.yolo_model = load_model(self.model_path)
+                print(f"Usando servidor de inferência: {INFERENCE_SERVER_URL}")
+            elif os.path.exists(self.model_path) or self.model_path == SYNTHETIC_MODEL_PATH:
+                self.yolo_model = load_model(self.model_path)
             else:
                 print(f"ERRO: Arquivo do modelo YOLO não encontrado em: {self.model_path}")
         except Exception as e:
@@ -322,11 +533,13 @@ class SeedAnalyzerApp(QMainWindow):
         self.btn_load_folder = QPushButton("Selecionar Pasta")
         self.btn_load_processed_files = QPushButton("Selecionar Arquivos Processados")
         self.btn_load_processed_folder = QPushButton("Selecionar Pasta Processada") 
+        self.btn_load_session = QPushButton("Carregar Sessão")
         self.list_widget = QListWidget() 
         for w in (self.btn_load_files, self.btn_load_folder, QLabel("Itens:"), self.list_widget):
             l_layout.addWidget(w)
         l_layout.addWidget(self.btn_load_processed_files)
         l_layout.addWidget(self.btn_load_processed_folder)
+        l_layout.addWidget(self.btn_load_session)
         splitter.addWidget(left)
 
         center = QWidget()
@@ -334,7 +547,15 @@ class SeedAnalyzerApp(QMainWindow):
         self.image_view = PlacementView(self.list_widget) 
         c_layout.addWidget(self.image_view, 3)
         self.recorte_container = QWidget()
-        rc_layout = QHBoxLayout(self.recorte_container)
+        rc_outer = QVBoxLayout(self.recorte_container)
+        rc_outer.setContentsMargins(0, 0, 0, 0)
+        self.chk_mosaic = QCheckBox("Mosaico da placa [M]")
+        self.chk_mosaic.setToolTip("Mostra os recortes da placa juntos: clique esquerdo confirma, clique direito remove")
+        rc_outer.addWidget(self.chk_mosaic)
+        tiles_views = QWidget()
+        rc_layout = QHBoxLayout(tiles_views)
+        rc_layout.setContentsMargins(0, 0, 0, 0)
+        rc_outer.addWidget(tiles_views, 1)
         
         self.view_orig = NavigableGraphicsView(self.list_widget) 
         self.scene_orig = QGraphicsScene(self.view_orig)
@@ -345,6 +566,12 @@ class SeedAnalyzerApp(QMainWindow):
         self.scene_analyzed = QGraphicsScene(self.view_analyzed)
         self.view_analyzed.setScene(self.scene_analyzed)
         rc_layout.addWidget(self.view_analyzed, 1)
+
+        self.view_mosaic = MosaicView(self.list_widget, self.mosaic_cell_clicked, self.step_plate)
+        self.scene_mosaic = QGraphicsScene(self.view_mosaic)
+        self.view_mosaic.setScene(self.scene_mosaic)
+        self.view_mosaic.setVisible(False)
+        rc_layout.addWidget(self.view_mosaic, 2)
         
         self.recorte_container.setVisible(False)
         c_layout.addWidget(self.recorte_container, 2)
@@ -356,7 +583,17 @@ class SeedAnalyzerApp(QMainWindow):
         r_layout.addWidget(self.details_text)
 
         self.btn_delimit = QPushButton('Delimitar [D]')
+        self.roi_buttons = QWidget()
+        roi_layout = QHBoxLayout(self.roi_buttons)
+        roi_layout.setContentsMargins(0, 0, 0, 0)
+        self.btn_add_roi = QPushButton('+ Placa')
+        self.btn_remove_roi = QPushButton('- Placa')
+        self.btn_add_roi.setToolTip("Adiciona outro retângulo para uma segunda placa na mesma imagem")
+        self.btn_remove_roi.setToolTip("Remove o último retângulo adicionado")
+        roi_layout.addWidget(self.btn_add_roi)
+        roi_layout.addWidget(self.btn_remove_roi)
         self.btn_analyze = QPushButton('Analisar Imagens')
+        self.btn_back_to_delimit = QPushButton('Ajustar Delimitação')
         self.btn_confirm = QPushButton('Confirmar [C]')
         self.btn_remove = QPushButton('Remover [R]')
         self.btn_confirm_all = QPushButton('Confirmar Todas')
@@ -367,7 +604,9 @@ class SeedAnalyzerApp(QMainWindow):
         self.btn_help = QPushButton("Ajuda")
 
         r_layout.addWidget(self.btn_delimit)
+        r_layout.addWidget(self.roi_buttons)
         r_layout.addWidget(self.btn_analyze)
+        r_layout.addWidget(self.btn_back_to_delimit)
         r_layout.addWidget(self.btn_confirm)
         r_layout.addWidget(self.btn_remove)
         r_layout.addWidget(self.btn_confirm_all)
@@ -386,7 +625,7 @@ class SeedAnalyzerApp(QMainWindow):
             self.btn_confirm, self.btn_remove, 
             self.btn_confirm_all, self.btn_remove_all,
             self.btn_confirm_remaining, self.btn_remove_remaining, 
-            self.btn_confirm_report
+            self.btn_confirm_report, self.btn_back_to_delimit
         ]
         for btn in buttons_to_hide_initially:
             btn.setVisible(False)
@@ -399,9 +638,13 @@ class SeedAnalyzerApp(QMainWindow):
         self.btn_load_folder.clicked.connect(self.load_folder)
         self.btn_load_processed_files.clicked.connect(self.load_processed_files) 
         self.btn_load_processed_folder.clicked.connect(self.load_processed_folder)
+        self.btn_load_session.clicked.connect(self.load_session)
         self.list_widget.currentItemChanged.connect(self.display_selected_item)
         self.btn_delimit.clicked.connect(self.confirm_delimit)
+        self.btn_add_roi.clicked.connect(self.add_roi)
+        self.btn_remove_roi.clicked.connect(self.remove_roi)
         self.btn_analyze.clicked.connect(self.analyze_images)
+        self.btn_back_to_delimit.clicked.connect(self.back_to_delimit)
         self.btn_confirm.clicked.connect(self.confirm_current_analysis)
         self.btn_remove.clicked.connect(self.remove_current_analysis)
         self.btn_confirm_all.clicked.connect(self.confirm_all)
@@ -410,6 +653,7 @@ class SeedAnalyzerApp(QMainWindow):
         self.btn_remove_remaining.clicked.connect(self.remove_remaining) 
         self.btn_confirm_report.clicked.connect(self.generate_report)
         self.btn_help.clicked.connect(self.show_help)
+        self.chk_mosaic.toggled.connect(self.toggle_mosaic)
 
         self.statusBar().showMessage("Pronto.")
 
@@ -430,18 +674,60 @@ class SeedAnalyzerApp(QMainWindow):
              self.analysis_stage and self.btn_remove.isVisible() and self.btn_remove.isEnabled():
             self.remove_current_analysis()
             event.accept()
+        elif event.key() == Qt.Key.Key_M and event.modifiers() & Qt.KeyboardModifier.ControlModifier and \
+             self.analysis_stage and self.chk_mosaic.isVisible():
+            self.chk_mosaic.toggle()
+            event.accept()
         else:
             super().keyPressEvent(event)
 
+    def set_delimit_controls_visible(self, visible):
+        self.btn_delimit.setVisible(visible)
+        self.roi_buttons.setVisible(visible)
+
+    def add_roi(self):
+        if self.analysis_stage or not self.image_view.image_item:
+            return
+        self.image_view.add_rectangle()
+        self.statusBar().showMessage(f"{len(self.image_view.rect_items)} placas nesta imagem. Posicione e clique em Delimitar.")
+
+    def remove_roi(self):
+        if self.analysis_stage or not self.image_view.remove_last_rectangle():
+            return
+        self.statusBar().showMessage(f"{len(self.image_view.rect_items)} placas nesta imagem.")
+
+    def memory_checkpoint(self, stage, boundary=False, extra_bytes=0):
+        if extra_bytes:
+            warning = self.memory_monitor.would_exceed(extra_bytes, stage)
+        elif boundary:
+            warning = self.memory_monitor.boundary(stage)
+        else:
+            warning = self.memory_monitor.sample(stage)
+        if warning:
+            print(f"AVISO: {warning}")
+            self.statusBar().showMessage(f"AVISO: {warning}")
+        return warning
+
+    def closeEvent(self, event):
+        print(self.memory_monitor.report())
+        self.memory_monitor.stop()
+        self.stop_inference()
+        close_containers()
+        super().closeEvent(event)
+
     def update_details_text(self):
         if not self.analysis_stage:
             if not getattr(self, 'current_image', None) or not self.list_widget.currentItem(): 
                 self.details_text.setText("Nenhum arquivo selecionado ou lista vazia.")
                 return
             data = self.image_data.get(self.current_image, {})
-            basename = os.path.basename(self.current_image)
-            roi = data.get('roi')
-            txt = f"Arquivo: {basename}\nROI: x={roi[0]:.1f}, y={roi[1]:.1f}, w={roi[2]}, h={roi[3]}" if roi else f"Arquivo: {basename}\nROI não definida"
+            basename = source_label(self.current_image)
+            rois = data.get('rois')
+            if rois:
+                txt = f"Arquivo: {basename}\n" + "\n".join(
+                    f"Placa {i+1}: x={roi[0]:.1f}, y={roi[1]:.1f}, w={roi[2]}, h={roi[3]}" for i, roi in enumerate(rois))
+            else:
+                txt = f"Arquivo: {basename}\nROI não definida"
             self.details_text.setText(txt)
         else: 
             idx = self.list_widget.currentRow()
@@ -451,27 +737,39 @@ class SeedAnalyzerApp(QMainWindow):
             item = self.analysis_items[idx]
             cnt = item['counts']
             status = item['status'] or 'Aguardando'
-            self.details_text.setText(
-                f"Arquivo: {os.path.basename(item['recorte'])}\n"
-                f"Total sementes: {cnt['total']}\nViáveis: {cnt['viable']}\nInviáveis: {cnt['inviable']}\nStatus: {status}"
-            )
+            txt = (f"Arquivo: {source_label(item['recorte'])}\n"
+                   f"Total sementes: {cnt['total']}\nViáveis: {cnt['viable']}\nInviáveis: {cnt['inviable']}\nStatus: {status}")
+            screen = item.get('prescreen')
+            if screen:
+                txt += (f"\nTriagem: {screen['reason']} (primeiro plano {screen['foreground']:.2%}, "
+                        f"nitidez {screen['sharpness']:.1f})")
+                txt += " - auditado pelo modelo" if screen['audited'] else " - sem inferência"
+            triage = item.get('triage')
+            if triage:
+                txt += f"\nConfiança: {triage['score']:.2f} ({triage['uncertain']} de {triage['detections']} detecções incertas)"
+                if triage['auto']:
+                    txt += " - confirmado automaticamente"
+                elif triage['audit']:
+                    txt += " - amostra de auditoria"
+            self.details_text.setText(txt)
 
     def load_processed_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Selecionar Arquivos Processados", self.default_directory,
-                                                "Imagens (*.png *.jpg *.jpeg *.bmp *.tif *.tiff)")
+                                                IMAGE_FILE_FILTER)
         if files:
             self.default_directory = os.path.dirname(files[0])
-            self.process_selected_processed_paths(files)
+            self.process_selected_processed_paths(expand_archives(files, is_image_file))
 
     def load_processed_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Selecionar Pasta com Imagens Processadas", self.default_directory)
         if folder:
             self.default_directory = folder
-            imgs = [os.path.join(folder, fn) for fn in sorted(os.listdir(folder))
-                    if fn.lower().endswith(('.png','.jpg','.jpeg','.bmp','.tif','.tiff'))]
+            imgs = expand_archives([os.path.join(folder, fn) for fn in sorted(os.listdir(folder))
+                                    if is_image_file(fn) or is_archive(fn)], is_image_file)
             self.process_selected_processed_paths(imgs)
 
     def process_selected_processed_paths(self, paths):
+        self.stop_inference()
         self.analysis_stage = False 
         self.input_analise.clear(); self.input_especie.clear(); self.input_temp.clear(); self.input_tempo.clear()
         self.image_paths = [] 
@@ -481,6 +779,7 @@ class SeedAnalyzerApp(QMainWindow):
         self.details_text.clear()
         self.current_image = None 
         self.processed_files_base_dir = None 
+        self.btn_back_to_delimit.setVisible(False)
 
         if not paths:
             self.statusBar().showMessage("Nenhum arquivo processado selecionado.")
@@ -492,7 +791,7 @@ class SeedAnalyzerApp(QMainWindow):
              self.statusBar().showMessage("Falha ao carregar: Modelo YOLO não disponível.")
              self.image_view.setVisible(True) 
              self.recorte_container.setVisible(False)
-             self.btn_delimit.setVisible(True) 
+             self.set_delimit_controls_visible(True) 
              self.btn_delimit.setEnabled(False)
              self.btn_analyze.setVisible(False)
              for btn_name in ['btn_confirm_all', 'btn_remove_all', 'btn_confirm_remaining', 
@@ -501,19 +800,19 @@ class SeedAnalyzerApp(QMainWindow):
              self.update_analysis_action_buttons_state()
              return
 
-        self.processed_files_base_dir = os.path.dirname(paths[0]) 
+        self.processed_files_base_dir = output_base_dir(paths[0])
 
         QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
         self.statusBar().showMessage(f"Validando 0 de {len(paths)} imagens processadas...")
         QApplication.processEvents()
 
         validated_paths_for_yolo = []
+        self.memory_checkpoint('load')
         for i, rec_path_validate in enumerate(paths):
             self.statusBar().showMessage(f"Validando {i+1} de {len(paths)} imagens...")
             QApplication.processEvents()
             try:
-                with Image.open(rec_path_validate) as img_validate:
-                    width, height = img_validate.size
+                width, height = image_size(rec_path_validate)
                 if width != EXPECTED_PROCESSED_WIDTH or height != EXPECTED_PROCESSED_HEIGHT:
                     error_msg = f"{os.path.basename(rec_path_validate)} [DIMENSÕES INVÁLIDAS: {width}x{height}, esperado {EXPECTED_PROCESSED_WIDTH}x{EXPECTED_PROCESSED_HEIGHT}]"
                     itm = QListWidgetItem(error_msg)
@@ -530,6 +829,8 @@ class SeedAnalyzerApp(QMainWindow):
                 print(f"Erro ao validar {rec_path_validate}: {e}")
                 traceback.print_exc()
         
+        self.memory_checkpoint('load', boundary=True)
+
         if not validated_paths_for_yolo:
             QApplication.restoreOverrideCursor()
             self.statusBar().showMessage("Nenhuma imagem processada válida encontrada após validação de dimensões.")
@@ -541,7 +842,7 @@ class SeedAnalyzerApp(QMainWindow):
             self.analysis_stage = True 
             self.image_view.setVisible(False) 
             self.recorte_container.setVisible(True)
-            self.btn_delimit.setVisible(False)
+            self.set_delimit_controls_visible(False)
             self.btn_analyze.setVisible(False)
             buttons_to_show = [
                 self.btn_confirm_all, self.btn_remove_all,
@@ -555,7 +856,7 @@ class SeedAnalyzerApp(QMainWindow):
 
         self.image_view.setVisible(False)
         self.recorte_container.setVisible(True)
-        self.btn_delimit.setVisible(False)
+        self.set_delimit_controls_visible(False)
         self.btn_analyze.setVisible(False)
         buttons_to_show = [
             self.btn_confirm_all, self.btn_remove_all,
@@ -565,91 +866,117 @@ class SeedAnalyzerApp(QMainWindow):
         for btn in buttons_to_show:
             btn.setVisible(True)
 
-        yolo_analyzed_output_dir = os.path.join(self.processed_files_base_dir, 'imagens_processadas_analisadas')
-        os.makedirs(yolo_analyzed_output_dir, exist_ok=True)
+        yolo_analyzed_output_dir, = self.output_dirs(self.processed_files_base_dir, PROCESSED_ANALYZED_DIRNAME)
         
         self.statusBar().showMessage(f"Iniciando análise YOLO em 0 de {len(validated_paths_for_yolo)} imagens...")
         QApplication.processEvents()
         
         self.list_widget.clear() 
-        self.analysis_items = [] 
-
-        processed_yolo_count = 0
-        for i, rec_path in enumerate(validated_paths_for_yolo): 
-            self.statusBar().showMessage(f"Analisando com YOLO {i+1} de {len(validated_paths_for_yolo)} imagens...")
-            QApplication.processEvents()
-            try:
-                analyzed_yolo_img_path, counts = self.perform_yolo_analysis(rec_path, yolo_analyzed_output_dir)
-                
-                self.analysis_items.append({
-                    'recorte': rec_path,                 
-                    'analysed': analyzed_yolo_img_path,  
-                    'counts': counts,
-                    'status': None 
-                })
-                self.list_widget.addItem(QListWidgetItem(os.path.basename(rec_path))) 
-                processed_yolo_count += 1
-            except Exception as e: 
-                error_msg_yolo = f"{os.path.basename(rec_path)} [ERRO NA ANÁLISE YOLO]"
-                itm = QListWidgetItem(error_msg_yolo)
-                itm.setForeground(QColor('magenta')) 
-                self.list_widget.addItem(itm)
-                self.analysis_items.append({
-                    'recorte': rec_path, 
-                    'analysed': rec_path,
-                    'counts': {'total': 0, 'viable': 0, 'inviable': 0},
-                    'status': 'Erro na Análise YOLO'
-                })
-                print(f"Erro durante análise YOLO da imagem processada {rec_path}: {e}")
-                traceback.print_exc()
+        self.analysis_items.clear()
+        self.detection_table.clear()
+
+        jobs = {}
+        for rec_path in validated_paths_for_yolo:
+            row = self.analysis_items.append({
+                'recorte': rec_path,
+                'analysed': rec_path,
+                'counts': {'total': 0, 'viable': 0, 'inviable': 0},
+                'status': QUEUED_STATUS
+            })
+            jobs[row] = (rec_path, None, None)
 
         QApplication.restoreOverrideCursor()
-        self.statusBar().showMessage(f"Análise YOLO concluída. {processed_yolo_count} imagens prontas para revisão.")
-        
         self.analysis_stage = True 
-        
+        self.fill_analysis_list()
+        self.list_widget.setCurrentRow(0)
+        self.activateWindow(); self.list_widget.setFocus()
+
+        if not self.run_inference_queue(jobs, yolo_analyzed_output_dir):
+            return
+        self.memory_checkpoint('infer', boundary=True)
+        self.save_detections(yolo_analyzed_output_dir)
+        self.report_prescreen()
+        processed_yolo_count = len(validated_paths_for_yolo) - self.analysis_items.count('Erro na Análise YOLO')
+        self.statusBar().showMessage(f"Análise YOLO concluída. {processed_yolo_count} imagens prontas para revisão.")
+
+        self.update_analysis_action_buttons_state()
+        self.activateWindow(); self.list_widget.setFocus()
+
+    def load_session(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Selecionar Sessão", self.default_directory,
+                                              f"Sessão ({SESSION_FILENAME} *.jsonl)")
+        if not path:
+            return
+        self.default_directory = os.path.dirname(path)
         try:
-            self.list_widget.currentItemChanged.disconnect()
-        except TypeError: 
-            pass
-        self.list_widget.currentItemChanged.connect(self.display_selected_item)
-        
+            records = read_session(path)
+        except Exception as e:
+            print(f"Erro ao ler sessão {path}: {e}"); traceback.print_exc()
+            QMessageBox.critical(self, "Erro", f"Não foi possível ler a sessão:\n{e}")
+            return
+
+        self.stop_inference()
+        self.analysis_stage = True
+        self.input_analise.clear(); self.input_especie.clear(); self.input_temp.clear(); self.input_tempo.clear()
+        self.image_paths = []
+        self.image_data.clear()
+        self.list_widget.clear()
+        self.details_text.clear()
+        self.current_image = None
+        self.processed_files_base_dir = os.path.dirname(path)
+        self.detection_table.clear()
+        self.analysis_items.clear()
+        for r in records:
+            item = {
+                'recorte': r['recorte'],
+                'analysed': r['analysed'],
+                'counts': r['counts'],
+                'status': r.get('status'),
+                'prescreen': r.get('prescreen'),
+                'triage': r.get('triage')
+            }
+            if r.get('rect'):
+                item.update(source=r['source'], plate=r.get('plate', 0), tile=r['tile'], rect=tuple(r['rect']))
+            self.analysis_items.append(item)
+
+        self.image_view.setVisible(False)
+        self.recorte_container.setVisible(True)
+        self.set_delimit_controls_visible(False)
+        self.btn_analyze.setVisible(False)
+        self.btn_back_to_delimit.setVisible(False)
+        for btn in [self.btn_confirm_all, self.btn_remove_all, self.btn_confirm_remaining,
+                    self.btn_remove_remaining, self.btn_confirm, self.btn_remove, self.btn_confirm_report]:
+            btn.setVisible(True)
+
+        # Also drops the mosaics of the previous load, whose cells point at rows of the old list
+        self.fill_analysis_list()
+
+        pending_idx = self.analysis_items.next_with_status(None)
         if self.list_widget.count() > 0:
-            first_selectable_idx = -1
-            for item_idx in range(self.list_widget.count()):
-                if item_idx < len(self.analysis_items) and \
-                   self.analysis_items[item_idx].get('status') not in ['Erro na Análise YOLO', 'Erro ao Abrir/Validar']:
-                    first_selectable_idx = item_idx
-                    break
-            
-            if first_selectable_idx != -1:
-                self.list_widget.setCurrentRow(first_selectable_idx)
-            elif self.list_widget.count() > 0:
-                self.list_widget.setCurrentRow(0)
-        else: 
+            self.list_widget.setCurrentRow(max(pending_idx, 0))
+        else:
             self.scene_orig.clear(); self.scene_analyzed.clear()
             self.update_details_text()
-
-
         self.update_analysis_action_buttons_state()
-        self.activateWindow(); self.list_widget.setFocus()
+        self.statusBar().showMessage(f"Sessão carregada: {len(self.analysis_items)} recortes.")
 
     def load_files(self):
         files, _ = QFileDialog.getOpenFileNames(self, "Selecionar Arquivos de Imagem", self.default_directory,
-                                                "Imagens (*.png *.jpg *.jpeg *.bmp *.tif *.tiff)")
+                                                IMAGE_FILE_FILTER)
         if files:
             self.default_directory = os.path.dirname(files[0])
-            self.process_selected_paths(files)
+            self.process_selected_paths(expand_archives(files, is_image_file))
 
     def load_folder(self):
         folder = QFileDialog.getExistingDirectory(self, "Selecionar Pasta com Imagens", self.default_directory)
         if folder:
             self.default_directory = folder
-            imgs = [os.path.join(folder, fn) for fn in sorted(os.listdir(folder))
-                    if fn.lower().endswith(('.png','.jpg','.jpeg','.bmp','.tif','.tiff'))]
+            imgs = expand_archives([os.path.join(folder, fn) for fn in sorted(os.listdir(folder))
+                                    if is_image_file(fn) or is_archive(fn)], is_image_file)
             self.process_selected_paths(imgs)
 
     def process_selected_paths(self, paths):
+        self.stop_inference()
         self.analysis_stage = False
         self.input_analise.clear(); self.input_especie.clear(); self.input_temp.clear(); self.input_tempo.clear()
         self.image_paths = paths
@@ -658,14 +985,15 @@ class SeedAnalyzerApp(QMainWindow):
         self.processed_files_base_dir = None
         self.image_view.setVisible(True); self.recorte_container.setVisible(False)
         
-        self.btn_delimit.setVisible(True)
+        self.set_delimit_controls_visible(True)
         self.btn_delimit.setEnabled(False) 
         self.btn_analyze.setVisible(False)
         self.btn_analyze.setEnabled(False) 
         
         buttons_to_hide = [
             self.btn_confirm, self.btn_remove, self.btn_confirm_all, self.btn_remove_all,
-            self.btn_confirm_remaining, self.btn_remove_remaining, self.btn_confirm_report
+            self.btn_confirm_remaining, self.btn_remove_remaining, self.btn_confirm_report,
+            self.btn_back_to_delimit
         ]
         for btn in buttons_to_hide:
             btn.setVisible(False)
@@ -679,23 +1007,27 @@ class SeedAnalyzerApp(QMainWindow):
             self.statusBar().showMessage(f"Carregando {i+1} de {len(paths)} imagens...")
             QApplication.processEvents()
             try:
-                pil = Image.open(path).convert('RGB')
-                width, height = pil.size
+                # Size check from the header before decoding (also for archive members)
+                width, height = image_size(path)
                 if width < TARGET_RECT_WIDTH_ORIGINAL or height < TARGET_RECT_HEIGHT_ORIGINAL:
-                    itm = QListWidgetItem(f"{os.path.basename(path)} [TAMANHO INSUFICIENTE]")
+                    itm = source_list_item(path, ' [TAMANHO INSUFICIENTE]')
                     itm.setForeground(QColor('red'))
                     self.list_widget.addItem(itm)
                     continue
-                self.image_data[path] = {'pil': pil, 'roi': None, 'pixmap_display': None}
-                self.list_widget.addItem(QListWidgetItem(os.path.basename(path)))
+                self.memory_checkpoint('load', extra_bytes=width * height * 3)
+                # A memory map of the cached decode when this scan was opened before
+                self.image_data[path] = {'pixels': load_decoded(path), 'rois': None}
+                self.list_widget.addItem(source_list_item(path))
                 valid_images += 1
+                self.memory_checkpoint('load')
             except Exception as e:
-                itm = QListWidgetItem(f"{os.path.basename(path)} [ERRO]")
+                itm = source_list_item(path, ' [ERRO]')
                 itm.setForeground(QColor('red'))
                 self.list_widget.addItem(itm)
                 print(f"Erro ao carregar {path}: {e}")
 
         self.statusBar().showMessage(f"Pronto. {valid_images} imagens válidas carregadas.")
+        self.memory_checkpoint('load', boundary=True)
         QApplication.processEvents() 
         QApplication.restoreOverrideCursor()
         
@@ -745,8 +1077,8 @@ class SeedAnalyzerApp(QMainWindow):
             if '[ERRO]' in name or '[TAMANHO INSUFICIENTE]' in name:
                 self.image_view._scene.clear()
             else:
-                path = next((p for p in self.image_data if os.path.basename(p) == name.replace(' [D]','')), None)
-                if not path: 
+                path = current.data(Qt.ItemDataRole.UserRole)
+                if path not in self.image_data: 
                     self.image_view._scene.clear() 
                     self.update_details_text()
                     self.update_analysis_action_buttons_state()
@@ -756,31 +1088,38 @@ class SeedAnalyzerApp(QMainWindow):
                 data = self.image_data[path]
                 QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
                 
-                if data.get('pixmap_display') is None: 
-                    arr = np.array(data['pil'], dtype=np.uint8)
-                    h_orig, w_orig, _ = arr.shape
-                    img_q = QImage(arr.data, w_orig, h_orig, w_orig*3, QImage.Format.Format_RGB888)
-                    data['pixmap_display'] = QPixmap.fromImage(img_q)
-
-                self.image_view.set_image(data['pixmap_display'])
+                self.image_view.set_image(data['pixels'])
+                self.memory_checkpoint('delimit')
                 
-                roi_data = data.get('roi')
-                if roi_data:
-                    self.image_view.show_existing_roi(roi_data)
+                rois = data.get('rois')
+                if rois:
+                    self.image_view.show_existing_rois(rois)
                 else: 
-                    if self.image_view.pixmap_item:
-                         self.image_view.create_initial_rectangle(self.image_view.pixmap_item.boundingRect())
+                    if self.image_view.image_item:
+                         self.image_view.create_initial_rectangle(self.image_view.image_item.boundingRect())
 
                 self.btn_delimit.setEnabled(True)
                 QApplication.restoreOverrideCursor()
         else: 
             idx = self.list_widget.currentRow()
-            if 0 <= idx < len(self.analysis_items):
+            use_mosaic = (self.chk_mosaic.isChecked() and 0 <= idx < len(self.analysis_items)
+                          and self.analysis_items[idx].get('source') is not None)
+            self.set_mosaic_visible(use_mosaic)
+            if use_mosaic:
+                self.show_plate_mosaic(idx)
+                self.memory_checkpoint('review')
+            elif 0 <= idx < len(self.analysis_items) and self.analysis_items[idx]['status'] == QUEUED_STATUS:
+                # Shown again by the inference queue as soon as this tile's result arrives
+                for scene in (self.scene_orig, self.scene_analyzed):
+                    scene.clear()
+                    scene.addText("Aguardando análise...\nEste recorte será analisado em seguida.")
+            elif 0 <= idx < len(self.analysis_items):
                 item = self.analysis_items[idx]
-                self.scene_orig.clear(); self.scene_orig.addPixmap(QPixmap(item['recorte']))
+                self.scene_orig.clear(); self.scene_orig.addPixmap(load_pixmap(item['recorte']))
                 self.view_orig.fitInView(self.scene_orig.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
-                self.scene_analyzed.clear(); self.scene_analyzed.addPixmap(QPixmap(item['analysed']))
+                self.scene_analyzed.clear(); self.scene_analyzed.addPixmap(load_pixmap(item['analysed']))
                 self.view_analyzed.fitInView(self.scene_analyzed.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
+                self.memory_checkpoint('review')
             else: 
                 self.scene_orig.clear(); self.scene_analyzed.clear()
         
@@ -800,16 +1139,16 @@ class SeedAnalyzerApp(QMainWindow):
             QMessageBox.warning(self, "Aviso", "Não é possível delimitar uma imagem com erro ou tamanho insuficiente.")
             return
 
-        roi = self.image_view.get_roi_original_coords()
-        if not roi:
+        rois = self.image_view.get_rois_original_coords()
+        if not rois:
             QMessageBox.warning(self, "Aviso", "Não foi possível obter coordenadas.")
             return
             
-        self.image_data[self.current_image]['roi'] = roi
+        self.image_data[self.current_image]['rois'] = rois
+        self.memory_checkpoint('delimit', boundary=True)
         
-        base_name = os.path.basename(self.current_image)
         if not current_list_item.text().endswith(' [D]'):
-            current_list_item.setText(base_name + ' [D]')
+            current_list_item.setText(source_label(self.current_image) + ' [D]')
         
         all_valid_delimited_so_far = True 
         has_any_valid_image = False
@@ -824,18 +1163,19 @@ class SeedAnalyzerApp(QMainWindow):
             
             if not is_error_or_small:
                 has_any_valid_image = True
-                current_item_base_name = item_text.split(" [")[0]
+                path_key_found = list_item.data(Qt.ItemDataRole.UserRole)
                 
-                path_key_found = next((p_key for p_key in self.image_data 
-                                       if os.path.basename(p_key) == current_item_base_name), None)
-                
-                if path_key_found and self.image_data[path_key_found].get('roi') is None:
+                if path_key_found in self.image_data and not self.image_data[path_key_found].get('rois'):
                     all_valid_delimited_so_far = False 
 
         if has_any_valid_image and all_valid_delimited_so_far:
             self.btn_analyze.setVisible(True)
             self.btn_analyze.setEnabled(True)
-            QMessageBox.information(self, "Info", "Todas as imagens válidas foram delimitadas. Pronto para analisar.")
+            if self.analysis_items:
+                changed = self.count_changed_tiles()
+                self.statusBar().showMessage(f"Delimitação ajustada. {changed} recortes serão reanalisados.")
+            else:
+                QMessageBox.information(self, "Info", "Todas as imagens válidas foram delimitadas. Pronto para analisar.")
         else:
             self.btn_analyze.setVisible(False)
             self.btn_analyze.setEnabled(False)
@@ -845,11 +1185,9 @@ class SeedAnalyzerApp(QMainWindow):
             list_item = self.list_widget.item(i)
             item_text = list_item.text()
             is_error_or_small = '[ERRO]' in item_text or '[TAMANHO INSUFICIENTE]' in item_text
-            current_item_base_name = item_text.split(" [")[0] 
-            path_key_next = next((p_key for p_key in self.image_data 
-                                  if os.path.basename(p_key) == current_item_base_name), None)
+            path_key_next = list_item.data(Qt.ItemDataRole.UserRole)
 
-            if not is_error_or_small and path_key_next and self.image_data[path_key_next].get('roi') is None:
+            if not is_error_or_small and path_key_next in self.image_data and not self.image_data[path_key_next].get('rois'):
                 next_undelimited_row = i
                 break
         
@@ -859,10 +1197,8 @@ class SeedAnalyzerApp(QMainWindow):
                 list_item = self.list_widget.item(i)
                 item_text = list_item.text()
                 is_error_or_small = '[ERRO]' in item_text or '[TAMANHO INSUFICIENTE]' in item_text
-                current_item_base_name = item_text.split(" [")[0]
-                path_key_next = next((p_key for p_key in self.image_data 
-                                      if os.path.basename(p_key) == current_item_base_name), None)
-                if not is_error_or_small and path_key_next and self.image_data[path_key_next].get('roi') is None:
+                path_key_next = list_item.data(Qt.ItemDataRole.UserRole)
+                if not is_error_or_small and path_key_next in self.image_data and not self.image_data[path_key_next].get('rois'):
                     next_undelimited_row = i
                     break
         
@@ -872,12 +1208,50 @@ class SeedAnalyzerApp(QMainWindow):
         self.update_details_text()
 
 
+    def count_changed_tiles(self):
+        analyzed_rects = {(it['source'], it['plate'], it['tile']): it['rect']
+                          for it in self.analysis_items if it.get('source')}
+        changed = 0
+        for path, data in self.image_data.items():
+            if not data.get('rois'):
+                continue
+            for plate, idx, rect in plate_tile_rects(data['rois']):
+                if analyzed_rects.get((path, plate, idx)) != rect:
+                    changed += 1
+        return changed
+
+    def back_to_delimit(self):
+        if not self.image_data:
+            return
+        self.stop_inference()
+        self.analysis_stage = False
+        self.scene_orig.clear(); self.scene_analyzed.clear()
+        self.image_view.setVisible(True); self.recorte_container.setVisible(False)
+        for btn in [self.btn_confirm, self.btn_remove, self.btn_confirm_all, self.btn_remove_all,
+                    self.btn_confirm_remaining, self.btn_remove_remaining, self.btn_confirm_report,
+                    self.btn_back_to_delimit]:
+            btn.setVisible(False)
+        self.set_delimit_controls_visible(True)
+        self.btn_analyze.setVisible(True)
+        self.btn_analyze.setEnabled(True)
+
+        self.list_widget.clear()
+        for path in self.image_paths:
+            data = self.image_data.get(path)
+            if data is None:
+                continue
+            suffix = ' [D]' if data.get('rois') else ''
+            self.list_widget.addItem(source_list_item(path, suffix))
+        if self.list_widget.count() > 0:
+            self.list_widget.setCurrentRow(0)
+        self.update_analysis_action_buttons_state()
+        self.statusBar().showMessage("Ajuste a delimitação. Apenas recortes alterados serão reanalisados.")
+
     def update_report_button_state(self):
         if not self.analysis_stage or not self.analysis_items:
             self.btn_confirm_report.setEnabled(False)
             return
-        all_processed = all(item['status'] in ['Confirmado', 'Removido'] for item in self.analysis_items)
-        self.btn_confirm_report.setEnabled(all_processed)
+        self.btn_confirm_report.setEnabled(self.analysis_items.all_reviewed())
 
     def update_analysis_action_buttons_state(self):
         if not self.analysis_stage or not self.analysis_items:
@@ -888,77 +1262,256 @@ class SeedAnalyzerApp(QMainWindow):
                     getattr(self, btn_name).setEnabled(is_enabled)
             return
 
-        has_unprocessed_items = any(item['status'] is None for item in self.analysis_items)
+        has_unprocessed_items = self.analysis_items.pending > 0
         
         self.btn_confirm_remaining.setEnabled(has_unprocessed_items)
         self.btn_remove_remaining.setEnabled(has_unprocessed_items)
 
-        self.btn_confirm_all.setEnabled(bool(self.analysis_items))
-        self.btn_remove_all.setEnabled(bool(self.analysis_items))
+        # Whole-list actions wait until every queued tile has its result
+        inference_running = self.inference_queue is not None
+        self.btn_confirm_all.setEnabled(bool(self.analysis_items) and not inference_running)
+        self.btn_remove_all.setEnabled(bool(self.analysis_items) and not inference_running)
 
         current_row = self.list_widget.currentRow()
-        can_process_current = (0 <= current_row < len(self.analysis_items))
+        can_process_current = (0 <= current_row < len(self.analysis_items)
+                               and self.analysis_items.status(current_row) != QUEUED_STATUS)
             
         self.btn_confirm.setEnabled(can_process_current)
         self.btn_remove.setEnabled(can_process_current)
+        self.refresh_mosaic_overlays()
         
         self.update_report_button_state()
 
-    def perform_yolo_analysis(self, image_path_to_analyze, output_dir_for_analyzed_image):
-        if not self.yolo_model:
-            print("Modelo YOLO não carregado. Análise não pode ser realizada.")
-            img_pil = Image.open(image_path_to_analyze)
-            error_img_path = os.path.join(output_dir_for_analyzed_image, os.path.basename(image_path_to_analyze).replace(".png", "_error.png"))
-            img_pil.save(error_img_path)
-            return error_img_path, {'total': 0, 'viable': 0, 'inviable': 0}
-
+    def perform_yolo_analysis(self, image_path_to_analyze, output_dir_for_analyzed_image, image=None):
+        # Returns (annotated path, counts, pre-screen info or None); see screen_and_analyze_tile
+        return screen_and_analyze_tile(self.yolo_model, image_path_to_analyze, output_dir_for_analyzed_image,
+                                       detection_table=self.detection_table, image=image)
+
+    def save_bundle_metadata(self, output_dir):
+        metadata = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'model': self.model_path,
+            'rois': {path: [list(roi) for roi in data['rois']] for path, data in self.image_data.items() if data.get('rois')},
+            'tiles': [{'recorte': it['recorte'], 'analysed': it['analysed'], 'counts': it['counts'],
+                       'plate': it.get('plate', 0)}
+                      for it in self.analysis_items],
+        }
+        bundle_path, _ = split_member_path(output_dir)
+        write_bytes(bundle_member_path(bundle_path, BUNDLE_METADATA_MEMBER),
+                    json.dumps(metadata, ensure_ascii=False, indent=1).encode('utf-8'))
+
+    def report_prescreen(self):
+        summary = prescreen_summary(it.get('prescreen') for it in self.analysis_items)
+        if summary:
+            print(summary)
+        summary = cascade_summary()
+        if summary:
+            print(summary)
+
+    def output_dirs(self, base_dir, *dirnames):
+        # With OUTPUT_BUNDLE the "folders" are prefixes inside one pack file; remote models need real files
+        if OUTPUT_BUNDLE and not hasattr(self.yolo_model, 'analyze_tile'):
+            os.makedirs(base_dir, exist_ok=True)
+            bundle_path = os.path.join(base_dir, BUNDLE_FILENAME)
+            return [bundle_member_path(bundle_path, name) for name in dirnames]
+        dirs = [os.path.join(base_dir, name) for name in dirnames]
+        for d in dirs:
+            os.makedirs(d, exist_ok=True)
+        return dirs
+
+    def save_detections(self, output_dir):
+        path = os.path.join(output_dir, DETECTIONS_FILENAME)
         try:
-            img_to_predict = Image.open(image_path_to_analyze)
-            width, height = img_to_predict.size
-
-            results = self.yolo_model.predict(source=image_path_to_analyze, 
-                                            imgsz=960, 
-                                            conf=0.25,
-                                            save=False, 
-                                            verbose=False) 
-
-            counts = {'total': 0, 'viable': 0, 'inviable': 0}
-            
-            if results and results[0].masks is not None: 
-                annotated_frame_np = results[0].plot() 
-                annotated_frame_pil = Image.fromarray(cv2.cvtColor(annotated_frame_np, cv2.COLOR_BGR2RGB))
-
-                base_name = os.path.splitext(os.path.basename(image_path_to_analyze))[0]
-                analyzed_img_name = f"{base_name}_analisada.png"
-                analyzed_img_path = os.path.join(output_dir_for_analyzed_image, analyzed_img_name)
-                annotated_frame_pil.save(analyzed_img_path)
-
-                detected_classes = results[0].boxes.cls.cpu().numpy() 
-                class_names_from_model = results[0].names 
-
-                for cls_idx in detected_classes:
-                    class_name = class_names_from_model[int(cls_idx)]
-                    if class_name == 'viavel':
-                        counts['viable'] += 1
-                    elif class_name == 'inviavel':
-                        counts['inviable'] += 1
-                counts['total'] = counts['viable'] + counts['inviable']
-                
-                return analyzed_img_path, counts
+            if is_member_path(path):
+                buf = io.BytesIO()
+                self.detection_table.save(buf)
+                write_bytes(path, buf.getvalue())
+                self.save_bundle_metadata(output_dir)
             else:
-                print(f"Nenhuma detecção para {image_path_to_analyze}")
-                img_pil = Image.open(image_path_to_analyze)
-                no_detection_img_path = os.path.join(output_dir_for_analyzed_image, os.path.basename(image_path_to_analyze).replace(".png", "_no_detection.png"))
-                img_pil.save(no_detection_img_path)
-                return no_detection_img_path, counts 
-
+                self.detection_table.save(path)
+            print(f"{len(self.detection_table)} detecções salvas em {path}")
         except Exception as e:
-            print(f"Erro durante a análise YOLO da imagem {image_path_to_analyze}: {e}")
+            print(f"Erro ao salvar detecções em {path}: {e}")
             traceback.print_exc()
-            img_pil = Image.open(image_path_to_analyze)
-            error_during_pred_path = os.path.join(output_dir_for_analyzed_image, os.path.basename(image_path_to_analyze).replace(".png", "_pred_error.png"))
-            img_pil.save(error_during_pred_path)
-            return error_during_pred_path, {'total': 0, 'viable': 0, 'inviable': 0}
+
+    def set_mosaic_visible(self, visible):
+        self.view_mosaic.setVisible(visible)
+        self.view_orig.setVisible(not visible)
+        self.view_analyzed.setVisible(not visible)
+
+    def toggle_mosaic(self, checked):
+        if self.analysis_stage:
+            self.display_selected_item(self.list_widget.currentItem())
+            if checked and not self.view_mosaic.isVisible():
+                self.statusBar().showMessage("Mosaico disponível apenas para recortes de imagens originais.")
+
+    def show_plate_mosaic(self, row):
+        items = self.analysis_items
+        rows = items.plate_rows(row)
+        key = (items.field(row, 'source'), items.field(row, 'plate'))
+        if key != self.mosaic_key:
+            entry = self.mosaic_cache.get(key)
+            if entry is None:
+                # One composite per plate instead of two image loads per tile
+                tiles = [(items.field(r, 'tile'), items.field(r, 'recorte'), items.field(r, 'analysed'))
+                         for r in rows if items.status(r) != QUEUED_STATUS]
+                if tiles:
+                    mosaic, cell = plate_mosaic(tiles, self.detection_table)
+                    h, w = mosaic.shape[:2]
+                    pixmap = QPixmap.fromImage(QImage(mosaic.data, w, h, w * 3, QImage.Format.Format_RGB888).copy())
+                else:
+                    pixmap, cell = QPixmap(), (1, 1)
+                entry = (pixmap, cell)
+                # Plates with tiles still queued are rebuilt as their results arrive
+                if len(tiles) == len(rows):
+                    self.mosaic_cache[key] = entry
+                    while len(self.mosaic_cache) > MOSAIC_CACHE_PLATES:
+                        self.mosaic_cache.popitem(last=False)
+            else:
+                self.mosaic_cache.move_to_end(key)
+            pixmap, (cell_w, cell_h) = entry
+            self.scene_mosaic.clear()
+            self.scene_mosaic.addPixmap(pixmap)
+            self.view_mosaic.cells = [
+                (QRectF((items.field(r, 'tile') % TILE_COLS) * cell_w, (items.field(r, 'tile') // TILE_COLS) * cell_h,
+                        cell_w, cell_h), r) for r in rows]
+            self.scene_mosaic.setSceneRect(QRectF(0, 0, cell_w * TILE_COLS, cell_h * TILE_ROWS))
+            self.view_mosaic.fitInView(self.scene_mosaic.sceneRect(), Qt.AspectRatioMode.KeepAspectRatio)
+            self.mosaic_key = key
+            self.mosaic_overlays = []
+        self.refresh_mosaic_overlays()
+
+    def refresh_mosaic_overlays(self):
+        if not self.view_mosaic.isVisible():
+            return
+        for overlay in self.mosaic_overlays:
+            self.scene_mosaic.removeItem(overlay)
+        self.mosaic_overlays = []
+        current = self.list_widget.currentRow()
+        fills = {'Confirmado': QColor(40, 200, 40, 60), 'Removido': QColor(230, 40, 40, 110),
+                 QUEUED_STATUS: QColor(128, 128, 128, 150)}
+        for rect, row in self.view_mosaic.cells:
+            status = self.analysis_items.status(row)
+            overlay = QGraphicsRectItem(rect)
+            fill = fills.get(status, QColor(255, 0, 255, 90) if status and status.startswith('Erro') else None)
+            if fill is not None:
+                overlay.setBrush(fill)
+            pen = QPen(QColor('yellow') if row == current else QColor(80, 80, 80), 3 if row == current else 1)
+            pen.setCosmetic(True)
+            overlay.setPen(pen)
+            self.scene_mosaic.addItem(overlay)
+            self.mosaic_overlays.append(overlay)
+
+    def mosaic_cell_clicked(self, row, button):
+        if button == Qt.MouseButton.LeftButton:
+            status = 'Confirmado'
+        elif button == Qt.MouseButton.RightButton:
+            status = 'Removido'
+        else:
+            return
+        if self.analysis_items.status(row) == QUEUED_STATUS:
+            return
+        self.analysis_items.set_status(row, status)
+        update_analysis_list_item(self.list_widget.item(row), self.analysis_items[row])
+        plate_rows = self.analysis_items.plate_rows(row)
+        if all(self.analysis_items.status(r) is not None for r in plate_rows):
+            # Plate done: continue at the next tile awaiting review, usually on the next plate
+            next_row = self.analysis_items.next_with_status(None, after=row)
+            row = next_row if next_row != -1 else row
+        if row != self.list_widget.currentRow():
+            self.list_widget.setCurrentRow(row)
+        else:
+            self.update_details_text()
+            self.update_analysis_action_buttons_state()
+
+    def step_plate(self, direction):
+        firsts = self.analysis_items.plate_first_rows()
+        current = self.list_widget.currentRow()
+        if not firsts or current < 0 or self.analysis_items.field(current, 'source') is None:
+            return
+        pos = firsts.index(min(self.analysis_items.plate_rows(current))) + direction
+        if 0 <= pos < len(firsts):
+            self.list_widget.setCurrentRow(firsts[pos])
+
+    def fill_analysis_list(self):
+        self.mosaic_cache.clear()
+        self.mosaic_key = None
+        self.list_widget.clear()
+        for item_data in self.analysis_items:
+            self.list_widget.addItem(update_analysis_list_item(QListWidgetItem(), item_data))
+
+        try: 
+            self.list_widget.currentItemChanged.disconnect()
+        except TypeError: 
+            pass 
+        self.list_widget.currentItemChanged.connect(self.display_selected_item)
+
+    def run_inference_queue(self, jobs, output_dir):
+        """Infers the queued rows, nearest to the reviewer's selection first, while review goes on.
+
+        jobs maps row -> (tile path, decoded scan or None, crop rect or None); with a scan
+        the tile is cropped and saved first. Returns False if the run was cancelled by
+        loading other images or going back to delimitation.
+        """
+        reset_cascade_stats()
+        queue = CursorQueue(jobs)
+        self.inference_queue = queue
+        self.update_analysis_action_buttons_state()
+        total = len(queue)
+        while queue:
+            if self.inference_queue is not queue:
+                return False
+            row = queue.pop(self.list_widget.currentRow())
+            rec_path, scan, rect = jobs[row]
+            self.statusBar().showMessage(f"Analisando recorte {total - len(queue)}/{total} "
+                                         f"({os.path.basename(rec_path)}); revise os recortes já prontos...")
+            try:
+                crop = None
+                if scan is not None:
+                    x1, y1, x2, y2 = rect
+                    crop = Image.fromarray(np.ascontiguousarray(scan[y1:y2, x1:x2]))
+                    save_image(crop, rec_path)
+                    self.memory_checkpoint('tile')
+                    self.detection_table.remove_tile(rec_path)
+                analyzed_path, counts, screen = self.perform_yolo_analysis(rec_path, output_dir, image=crop)
+                triage = triage_tile(self.detection_table.tile_detections(rec_path), screen) if TRIAGE_ENABLED else None
+                self.analysis_items.set_result(row, analyzed_path, counts, screen, triage=triage,
+                                               status='Confirmado' if triage and triage['auto'] else None)
+                self.memory_checkpoint('infer')
+            except Exception as e:
+                print(f"Erro ao analisar {os.path.basename(rec_path)}: {e}")
+                traceback.print_exc()
+                self.analysis_items.set_result(row, rec_path, {'total': 0, 'viable': 0, 'inviable': 0},
+                                               status='Erro no Processamento' if scan is not None else 'Erro na Análise YOLO')
+            update_analysis_list_item(self.list_widget.item(row), self.analysis_items[row])
+            if self.view_mosaic.isVisible() and any(r == row for _, r in self.view_mosaic.cells):
+                self.mosaic_key = None
+                self.display_selected_item(self.list_widget.currentItem())
+            elif row == self.list_widget.currentRow():
+                self.display_selected_item(self.list_widget.currentItem())
+            else:
+                self.update_analysis_action_buttons_state()
+            QApplication.processEvents()
+        self.inference_queue = None
+        if TRIAGE_ENABLED:
+            self.apply_review_order()
+        self.update_analysis_action_buttons_state()
+        return True
+
+    def apply_review_order(self):
+        # Least confident tiles first; the selected tile stays selected
+        current = self.list_widget.currentRow()
+        new_row = self.analysis_items.reorder(self.analysis_items.review_order())
+        self.fill_analysis_list()
+        if len(self.analysis_items):
+            self.list_widget.setCurrentRow(int(new_row[current]) if 0 <= current < len(new_row) else 0)
+        summary = triage_summary(it.get('triage') for it in self.analysis_items)
+        if summary:
+            print(summary)
+
+    def stop_inference(self):
+        # The running queue notices on its next tile and returns
+        self.inference_queue = None
 
     def analyze_images(self):
         valid_image_data_for_analysis = {}
@@ -968,17 +1521,15 @@ class SeedAnalyzerApp(QMainWindow):
             is_valid_for_analysis_flag = True
             list_item_text_found = ""
             
-            path_basename = os.path.basename(path)
             for i in range(self.list_widget.count()):
-                item_text_iter = self.list_widget.item(i).text()
-                if path_basename == item_text_iter.split(" [")[0]: 
-                    list_item_text_found = item_text_iter
+                if self.list_widget.item(i).data(Qt.ItemDataRole.UserRole) == path:
+                    list_item_text_found = self.list_widget.item(i).text()
                     break
             
             if '[ERRO]' in list_item_text_found or '[TAMANHO INSUFICIENTE]' in list_item_text_found:
                 is_valid_for_analysis_flag = False
             
-            if data.get('roi') is None: 
+            if not data.get('rois'): 
                 is_valid_for_analysis_flag = False
 
             if is_valid_for_analysis_flag:
@@ -996,74 +1547,50 @@ class SeedAnalyzerApp(QMainWindow):
         self.statusBar().showMessage("Preparando análise e recortes...")
         QApplication.processEvents()
 
-        base_output_parent_dir = os.path.dirname(original_paths_for_analysis[0]) 
-        
-        recortes_orig_dir = os.path.join(base_output_parent_dir, 'imagens_recortadas_originais')
-        os.makedirs(recortes_orig_dir, exist_ok=True)
+        base_output_parent_dir = output_base_dir(original_paths_for_analysis[0])
         
-        yolo_analyzed_output_dir = os.path.join(base_output_parent_dir, 'imagens_recortadas_analisadas')
-        os.makedirs(yolo_analyzed_output_dir, exist_ok=True)
-
-        self.analysis_items = []
-        QApplication.setOverrideCursor(Qt.CursorShape.WaitCursor)
-
-        total_tiles_to_process = len(valid_image_data_for_analysis) * (TILE_COLS * TILE_ROWS)
-        processed_tiles_count = 0
-
+        recortes_orig_dir, yolo_analyzed_output_dir = self.output_dirs(
+            base_output_parent_dir, ORIGINAL_TILES_DIRNAME, ORIGINAL_ANALYZED_DIRNAME)
+
+        # Tiles from a previous run are reused when their pixel rectangle did not change,
+        # keeping the review status; only moved tiles are re-cropped and re-inferred.
+        previous_items = {(it['source'], it['plate'], it['tile']): it for it in self.analysis_items if it.get('source')}
+        if not previous_items:
+            self.detection_table.clear()
+        self.analysis_items = AnalysisStore()
+
+        # Every tile is listed right away; the ones to (re)infer wait in the queue as placeholders
+        jobs = {}
         for path, data in valid_image_data_for_analysis.items():
-            base_file_name_orig = os.path.basename(path)
-            
-            pil_original_image = data['pil'] 
-            ox, oy, ow, oh = map(int, data['roi'])
-            tile_w = ow // TILE_COLS
-            tile_h = oh // TILE_ROWS
-
-            for idx in range(TILE_COLS * TILE_ROWS):
-                processed_tiles_count += 1
-                self.statusBar().showMessage(f"Processando recorte {processed_tiles_count}/{total_tiles_to_process} de {base_file_name_orig}...")
-                QApplication.processEvents()
-
-                row = idx // TILE_COLS
-                col = idx % TILE_COLS
-                left = ox + col * tile_w
-                top = oy + row * tile_h
-
-                try:
-                    crop = pil_original_image.crop((left, top, left+tile_w, top+tile_h))
-                    base_name_no_ext = os.path.splitext(base_file_name_orig)[0]
-                    rec_name = f"{base_name_no_ext}_{idx+1}.png"
-                    
-                    rec_path = os.path.join(recortes_orig_dir, rec_name) 
-                    crop.save(rec_path)
-
-                    analyzed_yolo_img_path, counts = self.perform_yolo_analysis(rec_path, yolo_analyzed_output_dir)
-                    
-                    self.analysis_items.append({
-                        'recorte': rec_path,                 
-                        'analysed': analyzed_yolo_img_path,  
-                        'counts': counts,
-                        'status': None
-                    })
-                except Exception as e:
-                    print(f"Erro ao processar tile {idx+1} da imagem {base_file_name_orig}: {e}")
-                    traceback.print_exc()
-                    error_placeholder_name = f"{os.path.splitext(base_file_name_orig)[0]}_{idx+1}_PROCESSING_ERROR.png"
-                    self.analysis_items.append({
-                        'recorte': error_placeholder_name, 
-                        'analysed': error_placeholder_name, 
-                        'counts': {'total': 0, 'viable': 0, 'inviable': 0},
-                        'status': 'Erro no Processamento'
-                    })
+            # Every plate of the scan is cropped from the same decoded image
+            for plate, idx, rect in plate_tile_rects(data['rois']):
+                previous = previous_items.pop((path, plate, idx), None)
+                if previous and previous['rect'] == rect and previous['status'] not in ('Erro no Processamento', QUEUED_STATUS) \
+                        and path_exists(previous['recorte']):
+                    self.analysis_items.append(previous)
+                    continue
+                rec_path = os.path.join(recortes_orig_dir, tile_name(path, idx, plate))
+                row = self.analysis_items.append({
+                    'recorte': rec_path,
+                    'analysed': rec_path,
+                    'counts': {'total': 0, 'viable': 0, 'inviable': 0},
+                    'status': QUEUED_STATUS,
+                    'source': path,
+                    'plate': plate,
+                    'tile': idx,
+                    'rect': rect
+                })
+                jobs[row] = (rec_path, data['pixels'], rect)
 
+        for stale in previous_items.values():
+            self.detection_table.remove_tile(stale['recorte'])
 
-        QApplication.restoreOverrideCursor()
-        self.statusBar().showMessage("Análise YOLO concluída. Preparando visualização...")
-        QApplication.processEvents()
+        reused_tiles_count = len(self.analysis_items) - len(jobs)
 
         self.analysis_stage = True
         self.image_view.setVisible(False)
         self.recorte_container.setVisible(True)
-        self.btn_delimit.setVisible(False)
+        self.set_delimit_controls_visible(False)
         self.btn_analyze.setVisible(False)
         
         buttons_to_show = [
@@ -1074,53 +1601,36 @@ class SeedAnalyzerApp(QMainWindow):
         for btn in buttons_to_show:
             btn.setVisible(True)
 
-        self.list_widget.clear()
-        for item_data in self.analysis_items:
-            list_text = os.path.basename(item_data['recorte'])
-            if item_data['status'] == 'Erro no Processamento':
-                list_text += " [ERRO]" 
-            
-            list_item_widget = QListWidgetItem(list_text)
-            if item_data['status'] == 'Erro no Processamento':
-                list_item_widget.setForeground(QColor('magenta')) 
-            self.list_widget.addItem(list_item_widget)
-        
-        try: 
-            self.list_widget.currentItemChanged.disconnect()
-        except TypeError: 
-            pass 
-        self.list_widget.currentItemChanged.connect(self.display_selected_item)
+        self.btn_back_to_delimit.setVisible(True)
+        self.btn_back_to_delimit.setEnabled(True)
+
+        self.fill_analysis_list()
         
         if self.list_widget.count() > 0:
-            first_valid_analysis_idx = -1
-            for i in range(self.list_widget.count()):
-                if self.analysis_items[i]['status'] != 'Erro no Processamento':
-                    first_valid_analysis_idx = i
-                    break
-            
-            if first_valid_analysis_idx != -1:
-                self.list_widget.setCurrentRow(first_valid_analysis_idx)
-            elif self.list_widget.count() > 0 : 
-                self.list_widget.setCurrentRow(0)
-            else: 
-                self.scene_orig.clear(); self.scene_analyzed.clear()
-                self.update_details_text() 
+            pending_idx = self.analysis_items.next_with_status(None)
+            self.list_widget.setCurrentRow(pending_idx if pending_idx != -1 else 0)
         else: 
             self.scene_orig.clear(); self.scene_analyzed.clear()
             self.update_details_text() 
 
-        self.update_analysis_action_buttons_state()
         self.activateWindow(); self.list_widget.setFocus()
-        self.statusBar().showMessage("Pronto para revisão da análise.")
+
+        if not self.run_inference_queue(jobs, yolo_analyzed_output_dir):
+            return
+        self.memory_checkpoint('infer', boundary=True)
+        self.save_detections(yolo_analyzed_output_dir)
+        self.report_prescreen()
+        self.statusBar().showMessage(f"Análise YOLO concluída ({len(jobs)} recortes analisados, "
+                                     f"{reused_tiles_count} mantidos). Pronto para revisão da análise.")
 
     def confirm_current_analysis(self):
         idx = self.list_widget.currentRow()
         if idx < 0 or idx >= len(self.analysis_items): return
+        if self.analysis_items.status(idx) == QUEUED_STATUS: return
         
-        self.analysis_items[idx]['status'] = 'Confirmado'
+        self.analysis_items.set_status(idx, 'Confirmado')
         itm = self.list_widget.item(idx)
-        base_name = os.path.basename(self.analysis_items[idx]['recorte'])
-        new_text = f"{base_name} [C]"
+        new_text = analysis_list_text(self.analysis_items[idx])
         if itm.text() != new_text: 
             itm.setText(new_text)
         
@@ -1132,11 +1642,11 @@ class SeedAnalyzerApp(QMainWindow):
     def remove_current_analysis(self):
         idx = self.list_widget.currentRow()
         if idx < 0 or idx >= len(self.analysis_items): return
+        if self.analysis_items.status(idx) == QUEUED_STATUS: return
 
-        self.analysis_items[idx]['status'] = 'Removido'
+        self.analysis_items.set_status(idx, 'Removido')
         itm = self.list_widget.item(idx)
-        base_name = os.path.basename(self.analysis_items[idx]['recorte'])
-        new_text = f"{base_name} [R]"
+        new_text = analysis_list_text(self.analysis_items[idx])
         if itm.text() != new_text: 
             itm.setText(new_text)
 
@@ -1148,48 +1658,34 @@ class SeedAnalyzerApp(QMainWindow):
         current_idx = self.list_widget.currentRow()
         if len(self.analysis_items) == 0: return 
 
-        for i in range(current_idx + 1, len(self.analysis_items)):
-            if self.analysis_items[i]['status'] is None:
-                self.list_widget.setCurrentRow(i)
-                return
-        for i in range(current_idx): 
-            if self.analysis_items[i]['status'] is None:
-                self.list_widget.setCurrentRow(i)
-                return
+        pending_idx = self.analysis_items.next_with_status(None, after=current_idx)
+        if pending_idx != -1:
+            self.list_widget.setCurrentRow(pending_idx)
+            return
         
         self.update_analysis_action_buttons_state()
 
 
     def confirm_all(self):
         if not self.analysis_items: return
-        for i, it in enumerate(self.analysis_items):
-            it['status'] = 'Confirmado'
-            list_item = self.list_widget.item(i)
-            base_name = os.path.basename(it['recorte'])
-            list_item.setText(f"{base_name} [C]") 
+        for i in self.analysis_items.set_status_where('Confirmado'):
+            self.list_widget.item(i).setText(analysis_list_text(self.analysis_items[i]))
         self.update_analysis_action_buttons_state()
         self.update_details_text() 
 
     def remove_all(self):
         if not self.analysis_items: return
-        for i, it in enumerate(self.analysis_items):
-            it['status'] = 'Removido'
-            list_item = self.list_widget.item(i)
-            base_name = os.path.basename(it['recorte'])
-            list_item.setText(f"{base_name} [R]") 
+        for i in self.analysis_items.set_status_where('Removido'):
+            self.list_widget.item(i).setText(analysis_list_text(self.analysis_items[i]))
         self.update_analysis_action_buttons_state()
         self.update_details_text() 
 
     def confirm_remaining(self):
         if not self.analysis_items: return
-        items_changed = False
-        for i, item_data in enumerate(self.analysis_items):
-            if item_data['status'] is None:
-                item_data['status'] = 'Confirmado'
-                list_item = self.list_widget.item(i)
-                base_name = os.path.basename(item_data['recorte'])
-                list_item.setText(f"{base_name} [C]")
-                items_changed = True
+        changed_rows = self.analysis_items.set_status_where('Confirmado', current=None)
+        for i in changed_rows:
+            self.list_widget.item(i).setText(analysis_list_text(self.analysis_items[i]))
+        items_changed = len(changed_rows) > 0
         
         if items_changed:
             QMessageBox.information(self, "Info", "Todas as análises restantes foram confirmadas.")
@@ -1200,14 +1696,10 @@ class SeedAnalyzerApp(QMainWindow):
 
     def remove_remaining(self):
         if not self.analysis_items: return
-        items_changed = False
-        for i, item_data in enumerate(self.analysis_items):
-            if item_data['status'] is None:
-                item_data['status'] = 'Removido'
-                list_item = self.list_widget.item(i)
-                base_name = os.path.basename(item_data['recorte'])
-                list_item.setText(f"{base_name} [R]")
-                items_changed = True
+        changed_rows = self.analysis_items.set_status_where('Removido', current=None)
+        for i in changed_rows:
+            self.list_widget.item(i).setText(analysis_list_text(self.analysis_items[i]))
+        items_changed = len(changed_rows) > 0
 
         if items_changed:
             QMessageBox.information(self, "Info", "Todas as análises restantes foram removidas.")
@@ -1230,8 +1722,9 @@ class SeedAnalyzerApp(QMainWindow):
                                 f"Por favor preencha os seguintes campos:\n\n• {'\n• '.join(empty_fields)}")
                 return
             
-            confirmed_items = [item for item in self.analysis_items if item['status'] == 'Confirmado']
-            if not confirmed_items:
+            # Scan/plate/tile order, not the confidence order of the review list
+            confirmed_rows = self.analysis_items.in_added_order(self.analysis_items.rows_with_status('Confirmado'))
+            if not len(confirmed_rows):
                 QMessageBox.warning(self, "Aviso", "Não há itens confirmados para gerar o relatório.")
                 return
                 
@@ -1242,34 +1735,18 @@ class SeedAnalyzerApp(QMainWindow):
             if self.processed_files_base_dir: 
                 base_dir = self.processed_files_base_dir
             elif self.image_paths: 
-                base_dir = os.path.dirname(self.image_paths[0])
+                base_dir = output_base_dir(self.image_paths[0])
             elif not os.path.isdir(base_dir): 
                  QMessageBox.critical(self, "Erro", "Não foi possível determinar um diretório válido para salvar o relatório.")
                  return
 
-            filename = os.path.join(base_dir, f"relatorio_{required_inputs['Análise']}_{timestamp}.csv")
-            
-            with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
-                writer = csv.writer(csvfile)
-                writer.writerow(["Informações da Análise"])
-                writer.writerow(["Análise", required_inputs['Análise']])
-                writer.writerow(["Espécie", required_inputs['Espécie']])
-                writer.writerow(["Temperatura", f"{required_inputs['Temperatura']} °C"])
-                writer.writerow(["Tempo", f"{required_inputs['Tempo']} h"])
-                writer.writerow([]) 
-                writer.writerow(["Imagem", "Total Sementes", "Sementes Viáveis", "Sementes Inviáveis", "% Viabilidade"])
-                
-                total_seeds, total_viable = 0, 0
-                for item in confirmed_items:
-                    name = os.path.basename(item['recorte'])
-                    counts = item['counts']
-                    viability = round((counts['viable'] / counts['total']) * 100, 2) if counts['total'] > 0 else 0
-                    writer.writerow([name, counts['total'], counts['viable'], counts['inviable'], f"{viability}%"])
-                    total_seeds += counts['total']; total_viable += counts['viable']
-                    
-                writer.writerow([])
-                overall_viability = round((total_viable / total_seeds) * 100, 2) if total_seeds > 0 else 0
-                writer.writerow(["TOTAL", total_seeds, total_viable, total_seeds - total_viable, f"{overall_viability}%"])
+            filename = write_report(report_filename(base_dir, required_inputs['Análise'], timestamp), required_inputs,
+                                    (self.analysis_items[row] for row in confirmed_rows),
+                                    totals=self.analysis_items.totals('Confirmado'))
+
+            self.memory_checkpoint('review', boundary=True)
+            memory_filename = os.path.join(base_dir, f"memoria_{required_inputs['Análise']}_{timestamp}.txt")
+            self.memory_monitor.write_report(memory_filename)
             
             QMessageBox.information(self, "Relatório Gerado", f"Relatório CSV criado com sucesso:\n{filename}")
         except Exception as e:
@@ -1286,6 +1763,7 @@ class SeedAnalyzerApp(QMainWindow):
             <ul>
                 <li>Clique em "Selecionar Arquivos" ou "Selecionar Pasta".</li>
                 <li>Imagens muito pequenas (menores que {W}x{H} pixels) ou corrompidas serão marcadas e não poderão ser delimitadas.</li>
+                <li>Também é possível selecionar arquivos .zip ou .tar: as imagens são lidas diretamente do arquivo, sem extrair, e os resultados vão para uma pasta com o nome do arquivo ao lado dele.</li>
             </ul>
         </li>
         <li><b>Carregamento de Imagens Já Processadas (recortadas):</b>
@@ -1295,10 +1773,20 @@ class SeedAnalyzerApp(QMainWindow):
                 <li>Este modo pula a etapa de delimitação e vai direto para a análise.</li>
             </ul>
         </li>
+        <li><b>Monitoramento de Pasta (sem interface):</b>
+            <ul>
+                <li>Execute <code>python seed_cli.py watch PASTA --roi X,Y</code> (repita <code>--roi</code> para cada placa, ou use <code>--processed</code> para recortes) para analisar cada imagem assim que o scanner a gravar.</li>
+                <li>Os resultados são acrescentados ao arquivo {SF} da pasta; use "Carregar Sessão" para revisá-los.</li>
+                <li>Para compartilhar um modelo já carregado entre vários usuários, inicie <code>python seed_cli.py serve</code> e defina a variável de ambiente SEED_ANALYZER_SERVER (ex.: http://127.0.0.1:8765) antes de abrir o programa.</li>
+                <li>Para testes de carga sem imagens reais, gere placas com <code>python seed_cli.py synth generate PASTA --count N</code> e defina SEED_ANALYZER_MODEL=sintetico para contar as sementes sintéticas sem o modelo YOLO; <code>synth check PASTA</code> compara a sessão com o gabarito.</li>
+            </ul>
+        </li>
         <li><b>Navegação:</b> Use as teclas de seta (Cima/Baixo) ou o scroll do mouse sobre a área da imagem para navegar entre os itens da lista em ambas as fases.</li>
         <li><b>Fase de Delimitação (apenas para imagens originais):</b>
             <ul>
                 <li>Posicione o retângulo vermelho sobre a área desejada na imagem grande.</li>
+                <li>Use Ctrl + scroll do mouse para aproximar até o nível das sementes e conferir o alinhamento; afastar até o fim volta à imagem inteira.</li>
+                <li>Se a imagem tiver mais de uma placa, use "+ Placa" para adicionar um retângulo numerado para cada uma ("- Placa" remove o último). Todas as placas são recortadas da mesma leitura da imagem e o relatório traz os totais por placa.</li>
                 <li>Clique em "Delimitar [D]" (ou use Enter/Ctrl+D).</li>
                 <li>Repita para todas as imagens válidas. O programa tentará selecionar a próxima imagem não delimitada na sequência.</li>
                 <li>Após todas as imagens válidas serem delimitadas, o botão "Analisar Imagens" ficará disponível.</li>
@@ -1308,8 +1796,13 @@ class SeedAnalyzerApp(QMainWindow):
             <ul>
                 <li>Se partiu de imagens originais, elas serão recortadas em seções ({TC} colunas x {TR} linhas).</li>
                 <li>Cada seção (ou cada imagem processada carregada) passará pela análise do modelo YOLOv8.</li>
+                <li>A lista de revisão aparece logo no início da análise: recortes ainda não analisados ficam marcados com [AGUARDANDO] e os mais próximos do item selecionado são analisados primeiro, então é possível revisar enquanto a análise continua.</li>
+                <li>Marque "Mosaico da placa" para ver os {TC}x{TR} recortes de uma placa de uma só vez, com as detecções desenhadas (verde: viável, vermelho: inviável). Clique esquerdo em um recorte confirma, clique direito remove; ao terminar a placa, a seleção passa para a próxima.</li>
+                <li>Ao fim da análise, os recortes pendentes são ordenados do mais incerto ao mais seguro. Se a confirmação automática estiver ativada (TRIAGE_AUTO_CONFIRM), recortes em que todas as detecções são confiantes e com formato típico de semente são confirmados sozinhos ([C auto]) e uma pequena amostra deles fica na lista como [AUDITORIA]; recortes pulados pela pré-triagem nunca são confirmados automaticamente.</li>
                 <li>O modelo identificará sementes viáveis e inviáveis, e uma imagem com as detecções será gerada.</li>
                 <li>Você verá o recorte original (ou a imagem processada) e a imagem analisada pela YOLO lado a lado.</li>
+                <li>Com OUTPUT_BUNDLE ativado, os recortes, as imagens analisadas e as detecções da sessão são gravados em um único arquivo ({BF}) em vez de pastas; use <code>python seed_cli.py export {BF}</code> para extraí-los nas pastas usuais.</li>
+                <li>Recortes sem sementes (só fundo ou reflexo) ou fora de foco são marcados como [VAZIO] ou [DESFOCADO] e não passam pelo modelo; revise-os normalmente. Uma pequena amostra deles ainda é analisada para conferir a regra (resumo no console).</li>
             </ul>
         </li>
         <li><b>Revisão da Análise:</b>
@@ -1317,6 +1810,7 @@ class SeedAnalyzerApp(QMainWindow):
                 <li>Selecione uma seção analisada na lista.</li>
                 <li>Clique em "Confirmar [C]" (ou Ctrl+C) ou "Remover [R]" (ou Ctrl+R) para marcar/alterar seu status. O programa tentará selecionar a próxima seção não processada.</li>
                 <li>Use "Confirmar Todas", "Remover Todas", "Confirmar Restantes" ou "Remover Restantes" para ações em lote.</li>
+                <li>Para corrigir a delimitação de uma imagem, clique em "Ajustar Delimitação", mova o retângulo e analise novamente. Apenas os recortes cuja posição mudou são reanalisados; os demais mantêm seu status.</li>
             </ul>
         </li>
         <li><b>Gerar Relatório:</b>
@@ -1328,11 +1822,11 @@ class SeedAnalyzerApp(QMainWindow):
         </li>
         </ol>
         
-        <p><b>Atalhos de teclado:</b> Enter/Ctrl+D (Delimitar), Ctrl+C (Confirmar), Ctrl+R (Remover).</p>
+        <p><b>Atalhos de teclado:</b> Enter/Ctrl+D (Delimitar), Ctrl+C (Confirmar), Ctrl+R (Remover), Ctrl+M (Mosaico da placa), Page Up/Page Down (placa anterior/seguinte no mosaico).</p>
         """.format(
             W=TARGET_RECT_WIDTH_ORIGINAL, H=TARGET_RECT_HEIGHT_ORIGINAL,
             PW=EXPECTED_PROCESSED_WIDTH, PH=EXPECTED_PROCESSED_HEIGHT,
-            TC=TILE_COLS, TR=TILE_ROWS
+            TC=TILE_COLS, TR=TILE_ROWS, SF=SESSION_FILENAME, BF=BUNDLE_FILENAME
         )
         
         msg = QMessageBox(self)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import tarfile
+import threading
+import zipfile
+
+ARCHIVE_EXTENSIONS = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2', '.tar.xz', '.txz')
+
+
+def is_archive(path):
+    return str(path).lower().endswith(ARCHIVE_EXTENSIONS)
+
+
+def archive_stem(path):
+    name = os.path.basename(path)
+    for ext in sorted(ARCHIVE_EXTENSIONS, key=len, reverse=True):
+        if name.lower().endswith(ext):
+            return name[:-len(ext)]
+    return os.path.splitext(name)[0]
+
+
+def archive_output_dir(path):
+    # Results for the images of "envio.zip" go to a folder "envio" beside it
+    return os.path.join(os.path.dirname(os.path.abspath(path)), archive_stem(path))
+
+
+class ArchiveReader:
+    """Read-only access to the members of a zip or tar archive, without extracting it.
+
+    Zip members are opened as seekable streams, so reading a plate's dimensions
+    touches only its header; tar members are read one at a time into memory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        if zipfile.is_zipfile(path):
+            self._zip = zipfile.ZipFile(path)
+            self._tar = None
+            self.index = {info.filename: info for info in self._zip.infolist() if not info.is_dir()}
+        else:
+            self._zip = None
+            self._tar = tarfile.open(path)
+            self.index = {m.name: m for m in self._tar.getmembers() if m.isfile()}
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def names(self):
+        return list(self.index)
+
+    def open(self, name):
+        if self._zip is not None:
+            return self._zip.open(self.index[name])
+        # tar members share the archive's file position, so hand out an in-memory copy
+        return io.BytesIO(self.get(name))
+
+    def get(self, name):
+        if self._zip is not None:
+            return self._zip.read(self.index[name])
+        with self._lock:
+            return self._tar.extractfile(self.index[name]).read()
+
+    def put(self, name, data):
+        raise ValueError(f"{self.path} é somente leitura")
+
+    def close(self):
+        (self._zip or self._tar).close()
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import random
+import multiprocessing
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+import seed_pipeline
+from seed_pipeline import MODEL_PATH, INFERENCE_IMGSZ, INFERENCE_CONF, count_classes, is_image_file
+
+INFERENCE_PROFILE_PATH = "inference_profile.json"
+COUNT_TOLERANCE = 0.01  # max relative difference of total seeds vs. the reference imgsz
+
+
+def default_thread_candidates():
+    cpus = os.cpu_count() or 1
+    candidates = {1, cpus}
+    n = 2
+    while n < cpus:
+        candidates.add(n)
+        n *= 2
+    return sorted(candidates)
+
+
+def load_inference_profile(path=INFERENCE_PROFILE_PATH):
+    """Applies a stored autotune profile: torch threads and imgsz. Returns the profile or None."""
+    if not os.path.exists(path):
+        return None
+    try:
+        with open(path, encoding='utf-8') as f:
+            profile = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"Perfil de inferência inválido em {path}: {e}")
+        return None
+    apply_threads(profile.get('intra_op_threads'), profile.get('inter_op_threads'))
+    if profile.get('imgsz'):
+        seed_pipeline.INFERENCE_IMGSZ = int(profile['imgsz'])
+    if profile.get('batch'):
+        seed_pipeline.INFERENCE_BATCH = int(profile['batch'])
+    if profile.get('cpu_model'):
+        seed_pipeline.CPU_MODEL_PATH = profile['cpu_model']
+    if profile.get('cascade_imgsz'):
+        seed_pipeline.CASCADE_ENABLED = True
+        seed_pipeline.CASCADE_IMGSZ = int(profile['cascade_imgsz'])
+    print(f"Perfil de inferência carregado: {profile.get('intra_op_threads')} threads intra-op, "
+          f"{profile.get('inter_op_threads')} inter-op, lote {profile.get('batch')}, imgsz {profile.get('imgsz')}")
+    return profile
+
+
+def apply_threads(intra_op, inter_op):
+    try:
+        import torch
+    except ImportError:
+        return
+    if intra_op:
+        torch.set_num_threads(int(intra_op))
+    if inter_op:
+        try:
+            torch.set_num_interop_threads(int(inter_op))
+        except RuntimeError:
+            # Only allowed before the first parallel region; keep the current value
+            print("Aviso: número de threads inter-op já definido neste processo.")
+
+
+def _benchmark_worker(model_path, tile_paths, intra_op, inter_op, batch_sizes, imgsz_values, repeats):
+    # Runs in a fresh process: inter-op threads can only be set once per process
+    apply_threads(intra_op, inter_op)
+    from ultralytics import YOLO
+    model = YOLO(model_path)
+    tiles = [np.asarray(Image.open(p).convert('RGB'))[:, :, ::-1].copy() for p in tile_paths]
+    rows = []
+    for imgsz in imgsz_values:
+        model.predict(source=tiles[0], imgsz=imgsz, conf=INFERENCE_CONF, verbose=False)  # warm-up
+        for batch in batch_sizes:
+            best = float('inf')
+            totals = None
+            for _ in range(repeats):
+                started = time.perf_counter()
+                per_tile = []
+                for i in range(0, len(tiles), batch):
+                    results = model.predict(source=tiles[i:i + batch], imgsz=imgsz, conf=INFERENCE_CONF,
+                                            batch=batch, verbose=False)
+                    per_tile.extend(count_classes(r)['total'] for r in results)
+                best = min(best, time.perf_counter() - started)
+                totals = per_tile
+            rows.append({
+                'intra_op_threads': intra_op, 'inter_op_threads': inter_op,
+                'batch': batch, 'imgsz': imgsz,
+                'seconds': best, 'tiles_per_second': len(tiles) / best,
+                'tile_totals': totals,
+            })
+    return rows
+
+
+def autotune(tiles_folder, model_path=MODEL_PATH, sample=24, intra_candidates=None, inter_candidates=(1, 2),
+             batch_candidates=(1, 2, 4, 8), imgsz_candidates=(INFERENCE_IMGSZ, 800, 640), repeats=2,
+             profile_path=INFERENCE_PROFILE_PATH, seed=0):
+    tile_paths = sorted(os.path.join(tiles_folder, fn) for fn in os.listdir(tiles_folder) if is_image_file(fn))
+    if not tile_paths:
+        raise ValueError(f"Nenhum recorte encontrado em {tiles_folder}")
+    random.Random(seed).shuffle(tile_paths)
+    tile_paths = tile_paths[:sample]
+    intra_candidates = intra_candidates or default_thread_candidates()
+    imgsz_values = sorted(set(imgsz_candidates) | {INFERENCE_IMGSZ}, reverse=True)
+
+    rows = []
+    ctx = multiprocessing.get_context('spawn')
+    for intra_op in intra_candidates:
+        for inter_op in inter_candidates:
+            print(f"Medindo intra-op={intra_op}, inter-op={inter_op} em {len(tile_paths)} recortes...")
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                rows.extend(pool.submit(_benchmark_worker, model_path, tile_paths, intra_op, inter_op,
+                                        list(batch_candidates), imgsz_values, repeats).result())
+
+    # A smaller imgsz is only eligible if its counts agree with the reference size
+    reference = next(r['tile_totals'] for r in rows if r['imgsz'] == INFERENCE_IMGSZ)
+    reference_total = max(sum(reference), 1)
+    for row in rows:
+        row['count_delta'] = abs(sum(row['tile_totals']) - sum(reference)) / reference_total
+        row['eligible'] = row['imgsz'] == INFERENCE_IMGSZ or row['count_delta'] <= COUNT_TOLERANCE
+    for row in sorted(rows, key=lambda r: -r['tiles_per_second']):
+        print(f"  intra={row['intra_op_threads']:>2} inter={row['inter_op_threads']} lote={row['batch']} "
+              f"imgsz={row['imgsz']}: {row['tiles_per_second']:.2f} recortes/s "
+              f"(Δ contagem {row['count_delta']:.1%}{'' if row['eligible'] else ', descartado'})")
+    best = max((r for r in rows if r['eligible']), key=lambda r: r['tiles_per_second'])
+
+    profile = {
+        'intra_op_threads': best['intra_op_threads'],
+        'inter_op_threads': best['inter_op_threads'],
+        'batch': best['batch'],
+        'imgsz': best['imgsz'],
+        'tiles_per_second': round(best['tiles_per_second'], 3),
+        'model': model_path,
+        'sample_tiles': len(tile_paths),
+        'cpu_count': os.cpu_count(),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'results': [{k: v for k, v in r.items() if k != 'tile_totals'} for r in rows],
+    }
+    # Keep a promoted INT8 model (seed_cli.py quantize) and a validated cascade across re-tuning
+    if os.path.exists(profile_path):
+        try:
+            with open(profile_path, encoding='utf-8') as f:
+                previous = json.load(f)
+            for key in ('cpu_model', 'cpu_model_parity', 'cascade_imgsz', 'cascade_validation'):
+                if key in previous:
+                    profile[key] = previous[key]
+        except (OSError, ValueError):
+            pass
+    with open(profile_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+    print(f"Melhor perfil salvo em {profile_path}: intra={best['intra_op_threads']}, "
+          f"inter={best['inter_op_threads']}, lote={best['batch']}, imgsz={best['imgsz']} "
+          f"({best['tiles_per_second']:.2f} recortes/s)")
+    return profile
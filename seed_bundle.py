@@ -0,0 +1,246 @@
+# -*- coding: utf-8 -*-
+import io
+import os
+import struct
+import threading
+
+import numpy as np
+from PIL import Image
+
+from seed_archive import ArchiveReader, is_archive, archive_output_dir
+
+# A path inside a bundle or a zip/tar archive is "<container file>::/<member name>", e.g.
+# "scans/sessao.seedpack::/imagens_recortadas_originais/placa1_3.png" or "envio.zip::/placas/placa1.tif";
+# the slash keeps os.path.basename/join working on these paths
+MEMBER_SEPARATOR = '::/'
+BUNDLE_METADATA_MEMBER = 'sessao.json'
+
+# Record layout: magic, name length, data length, name (utf-8), data
+_RECORD_HEADER = struct.Struct('<4sHQ')
+_RECORD_MAGIC = b'SPK1'
+
+
+class SeedBundle:
+    """Append-only pack file holding a session's tiles, annotated images and detections.
+
+    Every write appends a record; the index (member name -> offset, length) is
+    rebuilt by walking the record headers when the file is opened, so a record
+    cut short by a crash is simply dropped. Writing a member again makes the
+    newest copy the one that is read and exported.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}
+        self._lock = threading.Lock()
+        self._file = open(path, 'r+b' if os.path.exists(path) else 'w+b')
+        self._end = self._scan()
+
+    def _scan(self):
+        f = self._file
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        offset = 0
+        while offset + _RECORD_HEADER.size <= size:
+            f.seek(offset)
+            magic, name_len, data_len = _RECORD_HEADER.unpack(f.read(_RECORD_HEADER.size))
+            data_offset = offset + _RECORD_HEADER.size + name_len
+            if magic != _RECORD_MAGIC or data_offset + data_len > size:
+                break
+            name = f.read(name_len).decode('utf-8')
+            self.index[name] = (data_offset, data_len)
+            offset = data_offset + data_len
+        if offset < size:
+            print(f"Aviso: {size - offset} bytes incompletos descartados no fim de {self.path}")
+            f.truncate(offset)
+        return offset
+
+    def __contains__(self, name):
+        return name in self.index
+
+    def __len__(self):
+        return len(self.index)
+
+    def names(self):
+        return list(self.index)
+
+    def put(self, name, data):
+        name_bytes = name.encode('utf-8')
+        with self._lock:
+            f = self._file
+            f.seek(self._end)
+            f.write(_RECORD_HEADER.pack(_RECORD_MAGIC, len(name_bytes), len(data)))
+            f.write(name_bytes)
+            f.write(data)
+            f.flush()
+            data_offset = self._end + _RECORD_HEADER.size + len(name_bytes)
+            self.index[name] = (data_offset, len(data))
+            self._end = data_offset + len(data)
+
+    def get(self, name):
+        offset, length = self.index[name]
+        with self._lock:
+            self._file.seek(offset)
+            return self._file.read(length)
+
+    def open(self, name):
+        return io.BytesIO(self.get(name))
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+    def export(self, dest_dir):
+        """Unpacks the newest copy of every member into dest_dir using the folder layout."""
+        for name in self.index:
+            target = os.path.join(dest_dir, *name.split('/'))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            data = self.get(name)
+            if name.endswith('.npz'):
+                data = self._rewrite_detection_paths(data, dest_dir)
+            with open(target, 'wb') as f:
+                f.write(data)
+        return len(self.index)
+
+    def _rewrite_detection_paths(self, data, dest_dir):
+        # Detection tables reference tiles by bundle path; point them at the exported files
+        with np.load(io.BytesIO(data), allow_pickle=False) as npz:
+            arrays = {k: npz[k] for k in npz.files}
+        if 'tiles' in arrays:
+            prefix = self.path + MEMBER_SEPARATOR
+            arrays['tiles'] = np.array([os.path.join(dest_dir, *t[len(prefix):].split('/')) if t.startswith(prefix)
+                                        else t for t in arrays['tiles'].tolist()], dtype=np.str_)
+        buf = io.BytesIO()
+        np.savez_compressed(buf, **arrays)
+        return buf.getvalue()
+
+
+_open_containers = {}
+
+
+def get_container(path):
+    # One open handle per file, however the path is spelled
+    key = os.path.abspath(path)
+    container = _open_containers.get(key)
+    if container is None:
+        container = ArchiveReader(path) if is_archive(path) else SeedBundle(path)
+        _open_containers[key] = container
+    return container
+
+
+def close_containers():
+    for container in _open_containers.values():
+        container.close()
+    _open_containers.clear()
+
+
+def bundle_member_path(bundle_path, member):
+    return f"{bundle_path}{MEMBER_SEPARATOR}{member}"
+
+
+def is_member_path(path):
+    return MEMBER_SEPARATOR in str(path)
+
+
+def split_member_path(path):
+    container, _, member = str(path).partition(MEMBER_SEPARATOR)
+    return container, member.replace('\\', '/')
+
+
+def path_exists(path):
+    if is_member_path(path):
+        container, member = split_member_path(path)
+        return os.path.exists(container) and member in get_container(container)
+    return os.path.exists(path)
+
+
+def read_bytes(path):
+    if is_member_path(path):
+        container, member = split_member_path(path)
+        return get_container(container).get(member)
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def write_bytes(path, data):
+    if is_member_path(path):
+        container, member = split_member_path(path)
+        get_container(container).put(member, data)
+        return path
+    with open(path, 'wb') as f:
+        f.write(data)
+    return path
+
+
+def open_image(path):
+    if is_member_path(path):
+        container, member = split_member_path(path)
+        with get_container(container).open(member) as f:
+            img = Image.open(f)
+            img.load()
+        return img
+    return Image.open(path)
+
+
+def image_size(path):
+    # Only the image header is read, also for archive members
+    if is_member_path(path):
+        container, member = split_member_path(path)
+        with get_container(container).open(member) as f, Image.open(f) as img:
+            return img.size
+    with Image.open(path) as img:
+        return img.size
+
+
+def expand_archives(paths, accept):
+    """Replaces every zip/tar archive in `paths` by member paths of the files `accept`ed (by name)."""
+    expanded = []
+    for path in paths:
+        if is_archive(path) and os.path.isfile(path):
+            names = sorted(n for n in get_container(path).names() if accept(n))
+            expanded.extend(bundle_member_path(path, n) for n in names)
+        else:
+            expanded.append(path)
+    return expanded
+
+
+def output_base_dir(path):
+    """Folder where results for an input image go: next to the file, or for an archive
+    member, in a folder named after the archive beside it."""
+    if is_member_path(path):
+        container, _ = split_member_path(path)
+        if is_archive(container):
+            return archive_output_dir(container)
+        return os.path.dirname(container)
+    return os.path.dirname(path)
+
+
+def source_label(path):
+    """Name of an input image for lists and output files: the file name, or for an archive
+    member its path inside the archive, so plate1.png in two folders of a zip stay apart."""
+    if is_member_path(path):
+        container, member = split_member_path(path)
+        if is_archive(container):
+            return member.strip('/')
+    return os.path.basename(path)
+
+
+def source_stem(path):
+    """source_label without the extension and with folders joined by '_', for output names."""
+    return os.path.splitext(source_label(path))[0].replace('/', '_')
+
+
+def save_image(img, path, format='PNG'):
+    if is_member_path(path):
+        buf = io.BytesIO()
+        img.save(buf, format=format)
+        return write_bytes(path, buf.getvalue())
+    img.save(path)
+    return path
+
+
+def export_bundle(bundle_path, dest_dir=None):
+    dest_dir = dest_dir or os.path.dirname(os.path.abspath(bundle_path))
+    count = get_container(bundle_path).export(dest_dir)
+    print(f"{count} arquivos exportados de {bundle_path} para {dest_dir}")
+    return count
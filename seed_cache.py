@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+import os
+import hashlib
+
+import numpy as np
+
+from seed_bundle import open_image, is_member_path, split_member_path
+
+# --- Decoded scan cache ---
+DECODE_CACHE_ENABLED = False  # optional: keeps decoded scans on disk for repeat sessions
+DECODE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "orchid-seed-analyzer", "decodificadas")
+DECODE_CACHE_MAX_MB = 8192   # least recently used entries are removed above this
+
+
+def cache_key(path):
+    """Key of a decoded image: its path plus the mtime and size of the file holding it."""
+    if is_member_path(path):
+        container, member = split_member_path(path)
+        st = os.stat(container)
+        name = f"{os.path.abspath(container)}::{member}"
+    else:
+        st = os.stat(path)
+        name = os.path.abspath(path)
+    return hashlib.sha1(f"{name}|{st.st_mtime_ns}|{st.st_size}".encode('utf-8')).hexdigest()
+
+
+def decode_rgb(path):
+    return np.asarray(open_image(path).convert('RGB'))
+
+
+def evict(cache_dir=DECODE_CACHE_DIR, max_bytes=DECODE_CACHE_MAX_MB * 1024 * 1024, keep=None):
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.name.endswith('.npy') and entry.path != keep:
+            st = entry.stat()
+            entries.append((st.st_mtime, st.st_size, entry.path))
+    used = sum(size for _, size, _ in entries)
+    if keep and os.path.exists(keep):
+        used += os.path.getsize(keep)
+    for _, size, path in sorted(entries):
+        if used <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            used -= size
+        except OSError:
+            pass  # in use by another process (Windows) or already gone
+
+
+def load_decoded(path, cache_dir=DECODE_CACHE_DIR, max_bytes=DECODE_CACHE_MAX_MB * 1024 * 1024):
+    """RGB uint8 array (H, W, 3) of an image.
+
+    A hit is a read-only memory map of the cached .npy, so reopening a scan costs no
+    decode and no copy; pages are read only where the scan is sliced. A miss decodes
+    once, stores the array (temporary file + os.replace) and evicts the least recently
+    used entries beyond max_bytes. With the cache disabled this is a plain decode.
+    """
+    if not DECODE_CACHE_ENABLED:
+        return decode_rgb(path)
+    entry = os.path.join(cache_dir, cache_key(path) + '.npy')
+    try:
+        pixels = np.load(entry, mmap_mode='r')
+        os.utime(entry)  # most recently used
+        return pixels
+    except FileNotFoundError:
+        pass
+    except (OSError, ValueError) as e:
+        print(f"Aviso: cache de {os.path.basename(path)} ilegível ({e}); decodificando novamente.")
+    pixels = decode_rgb(path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        tmp = f"{entry}.{os.getpid()}.tmp"
+        with open(tmp, 'wb') as f:
+            np.save(f, np.ascontiguousarray(pixels))
+        os.replace(tmp, entry)
+        evict(cache_dir, max_bytes, keep=entry)
+        return np.load(entry, mmap_mode='r')
+    except OSError as e:
+        print(f"Aviso: não foi possível gravar o cache de {os.path.basename(path)}: {e}")
+        return pixels
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+import os
+import csv
+import json
+import time
+from datetime import datetime
+
+import seed_pipeline
+from seed_pipeline import MODEL_PATH, count_classes, empty_counts, predict_tiles, cascade_ambiguity, load_model
+from seed_autotune import INFERENCE_PROFILE_PATH
+from seed_quantize import list_tiles
+
+# --- Agreement required to enable the cascade ---
+CASCADE_MAX_VIABILITY_DELTA_PP = 0.5   # overall viability, percentage points
+CASCADE_MAX_TILE_MAE = 0.5             # mean per-tile |Δ viable| + |Δ inviable|
+
+
+def _counts(result):
+    return count_classes(result) if result is not None else empty_counts()
+
+
+def _viability(counts):
+    total = sum(c['total'] for c in counts)
+    viable = sum(c['viable'] for c in counts)
+    return (viable / total * 100) if total else 0.0
+
+
+def cascade_report(tiles_folder, model_path=MODEL_PATH, cascade_imgsz=None, report_path=None):
+    """Compares the cascade with full-resolution inference on reference tiles.
+
+    Every tile is inferred at both sizes; the cascade result of a tile is the
+    low-resolution one unless cascade_ambiguity escalates it, so one pass at each
+    size gives both the counts and the cost of the cascade.
+    """
+    cascade_imgsz = cascade_imgsz or seed_pipeline.CASCADE_IMGSZ
+    full_imgsz = seed_pipeline.INFERENCE_IMGSZ
+    paths = list_tiles(tiles_folder)
+    if not paths:
+        raise ValueError(f"Nenhum recorte de referência em {tiles_folder}")
+    model = load_model(model_path, server_url='')
+    predict_tiles(model, paths[:1], imgsz=cascade_imgsz)  # warm-up at the low size too
+
+    started = time.perf_counter()
+    full_results = [predict_tiles(model, [p], imgsz=full_imgsz)[0] for p in paths]
+    full_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    low_results = [predict_tiles(model, [p], imgsz=cascade_imgsz)[0] for p in paths]
+    low_seconds = time.perf_counter() - started
+
+    full, cascade, reasons = [], [], []
+    for full_result, low_result in zip(full_results, low_results):
+        reason = cascade_ambiguity(low_result)
+        reasons.append(reason)
+        full.append(_counts(full_result))
+        cascade.append(_counts(full_result if reason else low_result))
+
+    escalated = sum(1 for r in reasons if r)
+    tile_abs = [abs(a['viable'] - b['viable']) + abs(a['inviable'] - b['inviable']) for a, b in zip(full, cascade)]
+    cascade_seconds = low_seconds + full_seconds * escalated / len(paths)
+    summary = {
+        'tiles': len(paths),
+        'cascade_imgsz': cascade_imgsz, 'full_imgsz': full_imgsz,
+        'escalated': escalated,
+        'full_viability': round(_viability(full), 3), 'cascade_viability': round(_viability(cascade), 3),
+        'tile_mae': round(sum(tile_abs) / len(tile_abs), 3),
+        'tiles_agree': sum(1 for d in tile_abs if not d),
+        'full_seconds': round(full_seconds, 2), 'cascade_seconds': round(cascade_seconds, 2),
+    }
+    summary['viability_delta_pp'] = round(abs(summary['full_viability'] - summary['cascade_viability']), 3)
+    summary['passed'] = (summary['viability_delta_pp'] <= CASCADE_MAX_VIABILITY_DELTA_PP and
+                         summary['tile_mae'] <= CASCADE_MAX_TILE_MAE)
+
+    if report_path is None:
+        timestamp = datetime.now().strftime("%d%m%Y_%H%M%S")
+        report_path = os.path.join(tiles_folder, f"cascata_{timestamp}.csv")
+    with open(report_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Imagem", f"Viáveis {full_imgsz}", f"Inviáveis {full_imgsz}", "Viáveis Cascata",
+                         "Inviáveis Cascata", "Reanalisado", "Motivo"])
+        for path, a, b, reason in zip(paths, full, cascade, reasons):
+            writer.writerow([os.path.basename(path), a['viable'], a['inviable'], b['viable'], b['inviable'],
+                             "sim" if reason else "não", reason or ""])
+        writer.writerow([])
+        writer.writerow(["Recortes reanalisados", escalated, f"de {len(paths)}"])
+        writer.writerow(["Recortes com contagens iguais", summary['tiles_agree'], f"de {len(paths)}"])
+        writer.writerow([f"% Viabilidade {full_imgsz}", f"{summary['full_viability']}%"])
+        writer.writerow(["% Viabilidade Cascata", f"{summary['cascade_viability']}%"])
+        writer.writerow(["Δ Viabilidade (p.p.)", summary['viability_delta_pp'], f"limite {CASCADE_MAX_VIABILITY_DELTA_PP}"])
+        writer.writerow(["Erro médio por recorte", summary['tile_mae'], f"limite {CASCADE_MAX_TILE_MAE}"])
+        writer.writerow(["Tempo (s)", summary['full_seconds'], summary['cascade_seconds']])
+        writer.writerow(["Aprovado", "sim" if summary['passed'] else "não"])
+    summary['report'] = report_path
+    print(f"Cascata {cascade_imgsz}->{full_imgsz} em {len(paths)} recortes: {escalated} reanalisados, "
+          f"{summary['tiles_agree']} com contagens iguais, viabilidade {summary['full_viability']}% x "
+          f"{summary['cascade_viability']}%, tempo {summary['full_seconds']} s x {summary['cascade_seconds']} s "
+          f"-> {'APROVADA' if summary['passed'] else 'REPROVADA'}. Relatório: {report_path}")
+    return summary
+
+
+def enable_cascade(summary, profile_path=INFERENCE_PROFILE_PATH):
+    """Records the validated cascade size in the inference profile."""
+    if not summary.get('passed'):
+        raise ValueError("A cascata não passou na verificação de concordância e não será ativada.")
+    profile = {}
+    if os.path.exists(profile_path):
+        with open(profile_path, encoding='utf-8') as f:
+            profile = json.load(f)
+    profile['cascade_imgsz'] = summary['cascade_imgsz']
+    profile['cascade_validation'] = {k: v for k, v in summary.items() if k != 'passed'}
+    with open(profile_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+    print(f"Cascata ativada no perfil: primeira passada em {summary['cascade_imgsz']}")
+    return profile
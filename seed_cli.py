@@ -0,0 +1,300 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import json
+import argparse
+
+import seed_pipeline
+from seed_pipeline import MODEL_PATH, load_model
+from seed_autotune import INFERENCE_PROFILE_PATH, load_inference_profile
+
+
+def parse_roi(value):
+    # "X,Y" in original pixels, or a JSON file with "x" and "y" keys (or a list of them, one per plate)
+    if os.path.isfile(value):
+        with open(value, encoding='utf-8') as f:
+            data = json.load(f)
+        return [(int(d['x']), int(d['y'])) for d in (data if isinstance(data, list) else [data])]
+    try:
+        x, y = (int(float(v)) for v in value.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"ROI inválida: '{value}'. Use X,Y ou um arquivo JSON com x e y.")
+    return [(x, y)]
+
+
+def cmd_watch(args):
+    from seed_watch import run_watch
+    if not args.processed and not args.roi:
+        print("Informe --roi X,Y para imagens originais ou --processed para recortes já processados.")
+        return 2
+    model = load_model(args.model, server_url=args.server)
+    run_watch(args.folder, model, rois=args.roi, processed=args.processed,
+              settle_seconds=args.settle, poll_interval=args.interval, force_polling=args.polling)
+    return 0
+
+
+def cmd_analyze(args):
+    from seed_watch import run_batch
+    if not args.processed and not args.roi:
+        print("Informe --roi X,Y para imagens originais ou --processed para recortes já processados.")
+        return 2
+    if not os.path.exists(args.source):
+        print(f"Pasta ou arquivo compactado não encontrado: {args.source}")
+        return 2
+    model = load_model(args.model, server_url=args.server)
+    run_batch(args.source, model, rois=args.roi, processed=args.processed)
+    return 0
+
+
+def cmd_serve(args):
+    import seed_server
+    max_batch = args.max_batch or (seed_pipeline.INFERENCE_BATCH if args.profile_loaded else seed_server.MAX_BATCH)
+    if args.self_test:
+        seed_server.self_test(max_batch=max(max_batch, 2))
+        return 0
+    model = load_model(args.model, server_url='')
+    seed_server.serve(model, host=args.host, port=args.port, max_batch=max_batch,
+                      window_ms=args.window_ms, model_name=args.model, roots=args.root)
+    return 0
+
+
+def cmd_autotune(args):
+    from seed_autotune import autotune
+    autotune(args.tiles, model_path=args.model, sample=args.sample,
+             intra_candidates=args.intra or None, inter_candidates=args.inter,
+             batch_candidates=args.batch, imgsz_candidates=args.imgsz,
+             repeats=args.repeats, profile_path=args.profile)
+    return 0
+
+
+def cmd_quantize(args):
+    from seed_quantize import export_int8, parity_report, promote_int8
+    int8_path = args.int8
+    if not int8_path:
+        if not args.calibration:
+            print("Informe --calibration com recortes para calibrar a exportação INT8 (ou --int8 com um modelo já exportado).")
+            return 2
+        int8_path = export_int8(args.model, args.calibration)
+    summary = parity_report(args.model, int8_path, args.tiles, report_path=args.report)
+    if not summary['passed']:
+        print("Modelo INT8 fora da tolerância; o modelo FP32 continua em uso.")
+        return 1
+    if not args.no_promote:
+        promote_int8(int8_path, summary, profile_path=args.profile)
+    return 0
+
+
+def cmd_cascade(args):
+    from seed_cascade import cascade_report, enable_cascade
+    summary = cascade_report(args.tiles, model_path=args.model, cascade_imgsz=args.imgsz, report_path=args.report)
+    if not summary['passed']:
+        print("Cascata fora da tolerância; a inferência continua em resolução completa.")
+        return 1
+    if args.enable:
+        enable_cascade(summary, profile_path=args.profile)
+    return 0
+
+
+def cmd_compare(args):
+    from seed_compare import compare_models
+    missing = [f for f in args.experiments if not os.path.isdir(f)]
+    if missing:
+        print(f"Pasta não encontrada: {', '.join(missing)}")
+        return 2
+    compare_models(args.experiments, args.model_a, args.model_b, report_path=args.report,
+                   imgsz=args.imgsz, batch=args.batch)
+    return 0
+
+
+def cmd_shard(args):
+    from seed_shard import ShardManifest, run_worker
+    if args.action == 'init':
+        if not args.processed and not args.roi:
+            print("Informe --roi X,Y para imagens originais ou --processed para recortes já processados.")
+            return 2
+        if not os.path.exists(args.target):
+            print(f"Pasta ou arquivo compactado não encontrado: {args.target}")
+            return 2
+        ShardManifest.create(args.target, rois=args.roi, processed=args.processed, root=args.manifest)
+        return 0
+    if args.action == 'status':
+        manifest = ShardManifest(args.target)
+        counts = manifest.status()
+        print(f"{len(manifest.shards)} lotes: " + ", ".join(f"{v} {k}" for k, v in counts.items()))
+        return 0
+    if args.action == 'merge':
+        info = {'Análise': args.analise, 'Espécie': args.especie, 'Temperatura': args.temperatura, 'Tempo': args.tempo}
+        missing = [k for k, v in info.items() if not v]
+        if missing:
+            print(f"Informe os campos do relatório: {', '.join(missing)}.")
+            return 2
+        try:
+            ShardManifest(args.target).merge(info, allow_partial=args.partial)
+        except RuntimeError as e:
+            print(f"{e} Use --partial para gerar o relatório mesmo assim.")
+            return 1
+        return 0
+    if args.processes > 1:
+        # Local workers are independent processes claiming from the same manifest
+        import subprocess
+        command = [sys.executable, os.path.abspath(__file__), '--profile', args.profile, 'shard', 'work', args.target,
+                   '--model', args.model, '--lease', str(args.lease)]
+        if args.server is not None:
+            command += ['--server', args.server]
+        workers = [subprocess.Popen(command) for _ in range(args.processes)]
+        return max(w.wait() for w in workers)
+    model = load_model(args.model, server_url=args.server)
+    run_worker(args.target, model, lease_seconds=args.lease)
+    return 0
+
+
+def cmd_synth(args):
+    from seed_synth import GROUND_TRUTH_FILENAME, generate_plates, check_counts
+    if args.action == 'generate':
+        generate_plates(args.folder, args.count, plates=args.plates, processed=args.processed,
+                        seed=args.seed, workers=args.workers)
+        return 0
+    truth = os.path.join(args.truth or args.folder, GROUND_TRUTH_FILENAME)
+    session = os.path.join(args.folder, 'sessao.jsonl')
+    for path in (truth, session):
+        if not os.path.isfile(path):
+            print(f"Arquivo não encontrado: {path}")
+            return 2
+    summary = check_counts(session, truth)
+    return 0 if summary['analysed'] == summary['tiles'] and summary['exact'] == summary['tiles'] else 1
+
+
+def cmd_export(args):
+    from seed_bundle import export_bundle
+    if not os.path.isfile(args.bundle):
+        print(f"Pacote não encontrado: {args.bundle}")
+        return 2
+    export_bundle(args.bundle, args.dest)
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='seed_cli', description="Analisador de Sementes sem interface gráfica.")
+    parser.add_argument('--profile', default=INFERENCE_PROFILE_PATH,
+                        help="Perfil de inferência gerado por 'autotune' (threads, lote, imgsz).")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    watch = sub.add_parser('watch', help="Monitora uma pasta e analisa novas imagens assim que são gravadas.")
+    watch.add_argument('folder')
+    watch.add_argument('--roi', type=parse_roi, action='extend',
+                       help="Posição X,Y da ROI nas imagens originais (ou arquivo JSON); repita para cada placa.")
+    watch.add_argument('--processed', action='store_true', help="A pasta recebe recortes já processados.")
+    watch.add_argument('--model', default=MODEL_PATH)
+    watch.add_argument('--settle', type=float, default=2.0, help="Segundos sem alterações para considerar o arquivo completo.")
+    watch.add_argument('--interval', type=float, default=0.5, help="Intervalo de verificação em segundos.")
+    watch.add_argument('--polling', action='store_true', help="Força o modo de varredura periódica.")
+    watch.add_argument('--server', default=None, help="URL do servidor de inferência (padrão: SEED_ANALYZER_SERVER).")
+    watch.set_defaults(func=cmd_watch)
+
+    analyze = sub.add_parser('analyze', help="Analisa uma vez todas as imagens de uma pasta ou arquivo .zip/.tar.")
+    analyze.add_argument('source', help="Pasta ou arquivo compactado (lido sem extrair).")
+    analyze.add_argument('--roi', type=parse_roi, action='extend',
+                         help="Posição X,Y da ROI nas imagens originais (ou arquivo JSON); repita para cada placa.")
+    analyze.add_argument('--processed', action='store_true', help="A origem contém recortes já processados.")
+    analyze.add_argument('--model', default=MODEL_PATH)
+    analyze.add_argument('--server', default=None, help="URL do servidor de inferência (padrão: SEED_ANALYZER_SERVER).")
+    analyze.set_defaults(func=cmd_analyze)
+
+    serve = sub.add_parser('serve', help="Servidor local de inferência com modelo aquecido e micro-lotes.")
+    serve.add_argument('--model', default=MODEL_PATH)
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--max-batch', type=int, default=None, help="Padrão: lote do perfil ou 8.")
+    serve.add_argument('--window-ms', type=float, default=15, help="Janela para agrupar requisições em um lote.")
+    serve.add_argument('--root', action='append', default=None,
+                       help="Pasta em que o servidor pode ler recortes e gravar resultados (repetível; padrão: pasta atual).")
+    serve.add_argument('--self-test', action='store_true', help="Executa o teste de loopback com um modelo simulado.")
+    serve.set_defaults(func=cmd_serve)
+
+    tune = sub.add_parser('autotune', help="Mede threads, lote e imgsz nesta máquina e salva o melhor perfil.")
+    tune.add_argument('tiles', help="Pasta com recortes reais (946x946) para a medição.")
+    tune.add_argument('--model', default=MODEL_PATH)
+    tune.add_argument('--sample', type=int, default=24)
+    tune.add_argument('--intra', type=int, nargs='*', help="Threads intra-op a testar (padrão: 1, 2, 4, ... núcleos).")
+    tune.add_argument('--inter', type=int, nargs='+', default=[1, 2])
+    tune.add_argument('--batch', type=int, nargs='+', default=[1, 2, 4, 8])
+    tune.add_argument('--imgsz', type=int, nargs='+', default=[960, 800, 640])
+    tune.add_argument('--repeats', type=int, default=2)
+    tune.set_defaults(func=cmd_autotune)
+
+    quant = sub.add_parser('quantize', help="Exporta o modelo em INT8 para CPU e valida a paridade das contagens.")
+    quant.add_argument('tiles', help="Pasta com recortes de referência para a verificação de paridade.")
+    quant.add_argument('--model', default=MODEL_PATH)
+    quant.add_argument('--calibration', help="Pasta com recortes para calibração (pode ser a mesma de referência).")
+    quant.add_argument('--int8', help="Modelo INT8 já exportado; pula a exportação.")
+    quant.add_argument('--report', help="Caminho do CSV de paridade (padrão: na pasta de referência).")
+    quant.add_argument('--no-promote', action='store_true', help="Apenas valida, sem gravar o modelo no perfil.")
+    quant.set_defaults(func=cmd_quantize)
+
+    cascade = sub.add_parser('cascade', help="Valida a cascata de resolução (baixa primeiro, completa só nos recortes ambíguos).")
+    cascade.add_argument('tiles', help="Pasta com recortes de referência.")
+    cascade.add_argument('--model', default=MODEL_PATH)
+    cascade.add_argument('--imgsz', type=int, default=None, help="Tamanho da primeira passada (padrão: 640).")
+    cascade.add_argument('--report', help="Caminho do CSV de comparação (padrão: na pasta de referência).")
+    cascade.add_argument('--enable', action='store_true', help="Ativa a cascata no perfil se a validação passar.")
+    cascade.set_defaults(func=cmd_cascade)
+
+    compare = sub.add_parser('compare', help="Reanalisa os recortes de experimentos anteriores com dois modelos e compara as contagens.")
+    compare.add_argument('experiments', nargs='+',
+                         help="Pastas de experimentos (com imagens_recortadas_originais) ou pastas de recortes.")
+    compare.add_argument('--model-a', default=MODEL_PATH, help="Modelo de referência (padrão: o modelo atual).")
+    compare.add_argument('--model-b', required=True, help="Modelo novo a comparar.")
+    compare.add_argument('--imgsz', type=int, default=None, help="Tamanho de inferência (padrão: o do perfil).")
+    compare.add_argument('--batch', type=int, default=None, help="Recortes por lote (padrão: o do perfil).")
+    compare.add_argument('--report', help="Caminho do CSV (padrão: na pasta do primeiro experimento).")
+    compare.set_defaults(func=cmd_compare)
+
+    shard = sub.add_parser('shard', help="Divide uma análise grande entre vários processos ou máquinas por um manifesto em pasta compartilhada.")
+    shard.add_argument('action', choices=['init', 'work', 'status', 'merge'],
+                       help="init cria o manifesto; work reserva e analisa lotes; status mostra o andamento; merge gera a sessão e o relatório.")
+    shard.add_argument('target', help="init: pasta ou arquivo compactado com as imagens; demais: pasta do manifesto.")
+    shard.add_argument('--manifest', help="init: pasta do manifesto (padrão: 'manifesto' na pasta de saída).")
+    shard.add_argument('--roi', type=parse_roi, action='extend',
+                       help="Posição X,Y da ROI nas imagens originais (ou arquivo JSON); repita para cada placa.")
+    shard.add_argument('--processed', action='store_true', help="A origem contém recortes já processados.")
+    shard.add_argument('--model', default=MODEL_PATH)
+    shard.add_argument('--server', default=None, help="URL do servidor de inferência (padrão: SEED_ANALYZER_SERVER).")
+    shard.add_argument('--processes', type=int, default=1, help="work: número de processos locais.")
+    shard.add_argument('--lease', type=float, default=900, help="work: segundos até uma reserva sem conclusão expirar.")
+    shard.add_argument('--partial', action='store_true', help="merge: gera o relatório mesmo com lotes pendentes.")
+    shard.add_argument('--analise', help="merge: nome da análise.")
+    shard.add_argument('--especie', help="merge: espécie.")
+    shard.add_argument('--temperatura', help="merge: temperatura em °C.")
+    shard.add_argument('--tempo', help="merge: tempo em horas.")
+    shard.set_defaults(func=cmd_shard)
+
+    synth = sub.add_parser('synth', help="Gera placas sintéticas com gabarito para testes de carga (modelo '--model sintetico').")
+    synth.add_argument('action', choices=['generate', 'check'],
+                       help="generate grava as placas e o gabarito; check compara a sessão da pasta com o gabarito.")
+    synth.add_argument('folder', help="Pasta de destino (generate) ou pasta analisada (check).")
+    synth.add_argument('--count', type=int, default=10, help="generate: número de imagens.")
+    synth.add_argument('--plates', type=int, default=1, help="generate: placas por imagem.")
+    synth.add_argument('--processed', action='store_true', help="generate: grava os recortes 946x946 já divididos.")
+    synth.add_argument('--seed', type=int, default=0)
+    synth.add_argument('--workers', type=int, default=None, help="generate: processos (padrão: núcleos da CPU).")
+    synth.add_argument('--truth', help="check: pasta do gabarito, se diferente da analisada.")
+    synth.set_defaults(func=cmd_synth)
+
+    export = sub.add_parser('export', help="Desempacota um pacote de sessão (.seedpack) nas pastas usuais.")
+    export.add_argument('bundle')
+    export.add_argument('--dest', help="Pasta de destino (padrão: a pasta do pacote).")
+    export.set_defaults(func=cmd_export)
+
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.profile_loaded = False
+    if args.command not in ('autotune', 'quantize', 'export', 'synth'):
+        args.profile_loaded = load_inference_profile(args.profile) is not None
+    return args.func(args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
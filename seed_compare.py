@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import os
+import csv
+import time
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import seed_pipeline
+from seed_pipeline import ORIGINAL_TILES_DIRNAME, count_classes, empty_counts, load_tile_bgr, predict_tiles, warm_up
+from seed_quantize import list_tiles
+from seed_report import viability_pct
+
+
+def experiment_tiles(folder):
+    """Tiles of an experiment: its imagens_recortadas_originais folder, or the folder itself."""
+    folder = os.path.abspath(folder)
+    tiles_dir = os.path.join(folder, ORIGINAL_TILES_DIRNAME)
+    if os.path.isdir(tiles_dir):
+        return os.path.basename(folder), list_tiles(tiles_dir)
+    if os.path.basename(folder) == ORIGINAL_TILES_DIRNAME:
+        return os.path.basename(os.path.dirname(folder)), list_tiles(folder)
+    return os.path.basename(folder), list_tiles(folder)
+
+
+def _load(model_path):
+    # The exact weights given, never the promoted CPU model load_model may substitute
+    from ultralytics import YOLO
+    model = YOLO(model_path) if model_path.endswith('.pt') else YOLO(model_path, task='segment')
+    warm_up(model)
+    return model
+
+
+def _decode(paths):
+    return [load_tile_bgr(p) for p in paths]
+
+
+def _timed_counts(model, paths, images, imgsz, batch):
+    started = time.perf_counter()
+    results = predict_tiles(model, paths, images=images, imgsz=imgsz, batch=batch, bgr=True)
+    counts = [count_classes(r) if r is not None else empty_counts() for r in results]
+    return counts, time.perf_counter() - started
+
+
+def _sum(counts):
+    total = empty_counts()
+    for c in counts:
+        for k in total:
+            total[k] += c[k]
+    return total
+
+
+def compare_models(experiments, model_a, model_b, report_path=None, imgsz=None, batch=None):
+    """Re-scores the tiles of past experiments with two models and reports the count changes.
+
+    Each chunk of tiles is decoded once and handed to both models, which run side by
+    side in their own threads while the next chunk is decoded. Both run at the full
+    inference size (no cascade) so the differences come from the weights alone.
+    """
+    imgsz = imgsz or seed_pipeline.INFERENCE_IMGSZ
+    batch = max(batch or seed_pipeline.INFERENCE_BATCH, 1)
+    tiles = []  # (experiment, path)
+    for folder in experiments:
+        name, paths = experiment_tiles(folder)
+        if not paths:
+            print(f"Aviso: nenhum recorte em {folder}")
+        tiles.extend((name, p) for p in paths)
+    if not tiles:
+        raise ValueError("Nenhum recorte encontrado nos experimentos informados.")
+    models = [_load(model_a), _load(model_b)]
+
+    counts = ([], [])
+    seconds = [0.0, 0.0]
+    paths = [p for _, p in tiles]
+    chunks = [paths[i:i + batch] for i in range(0, len(paths), batch)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        decoding = pool.submit(_decode, chunks[0])
+        for k, chunk in enumerate(chunks):
+            images = decoding.result()
+            if k + 1 < len(chunks):
+                decoding = pool.submit(_decode, chunks[k + 1])
+            runs = [pool.submit(_timed_counts, model, chunk, images, imgsz, batch) for model in models]
+            for m, run in enumerate(runs):
+                chunk_counts, chunk_seconds = run.result()
+                counts[m].extend(chunk_counts)
+                seconds[m] += chunk_seconds
+    wall_seconds = time.perf_counter() - started
+
+    per_experiment = {}
+    for (name, _), a, b in zip(tiles, *counts):
+        per_experiment.setdefault(name, ([], []))
+        per_experiment[name][0].append(a)
+        per_experiment[name][1].append(b)
+
+    if report_path is None:
+        timestamp = datetime.now().strftime("%d%m%Y_%H%M%S")
+        report_path = os.path.join(os.path.abspath(experiments[0]), f"comparacao_modelos_{timestamp}.csv")
+    with open(report_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Modelo A", model_a])
+        writer.writerow(["Modelo B", model_b])
+        writer.writerow([])
+        writer.writerow(["Experimento", "Imagem", "Viáveis A", "Inviáveis A", "% Viabilidade A",
+                         "Viáveis B", "Inviáveis B", "% Viabilidade B", "Δ Viáveis", "Δ Inviáveis", "Δ Viabilidade (p.p.)"])
+        for (name, path), a, b in zip(tiles, *counts):
+            va, vb = viability_pct(a['viable'], a['total']), viability_pct(b['viable'], b['total'])
+            writer.writerow([name, os.path.basename(path), a['viable'], a['inviable'], f"{va}%",
+                             b['viable'], b['inviable'], f"{vb}%",
+                             b['viable'] - a['viable'], b['inviable'] - a['inviable'], round(vb - va, 2)])
+        writer.writerow([])
+        writer.writerow(["Experimento", "Recortes", "Recortes alterados", "Viáveis A", "Inviáveis A", "% Viabilidade A",
+                         "Viáveis B", "Inviáveis B", "% Viabilidade B", "Δ Viáveis", "Δ Inviáveis", "Δ Viabilidade (p.p.)"])
+        for name, (tiles_a, tiles_b) in per_experiment.items():
+            a, b = _sum(tiles_a), _sum(tiles_b)
+            changed = sum(1 for x, y in zip(tiles_a, tiles_b)
+                          if (x['viable'], x['inviable']) != (y['viable'], y['inviable']))
+            va, vb = viability_pct(a['viable'], a['total']), viability_pct(b['viable'], b['total'])
+            writer.writerow([name, len(tiles_a), changed, a['viable'], a['inviable'], f"{va}%",
+                             b['viable'], b['inviable'], f"{vb}%",
+                             b['viable'] - a['viable'], b['inviable'] - a['inviable'], round(vb - va, 2)])
+        writer.writerow([])
+        writer.writerow(["Modelo", "Tempo de inferência (s)", "Recortes/s"])
+        for label, s in zip(("A", "B"), seconds):
+            writer.writerow([label, round(s, 2), round(len(tiles) / s, 2) if s else ""])
+        writer.writerow(["Tempo total (s)", round(wall_seconds, 2)])
+
+    for name, (tiles_a, tiles_b) in per_experiment.items():
+        a, b = _sum(tiles_a), _sum(tiles_b)
+        print(f"{name}: {len(tiles_a)} recortes, viabilidade {viability_pct(a['viable'], a['total'])}% (A) x "
+              f"{viability_pct(b['viable'], b['total'])}% (B)")
+    print(f"A: {len(tiles) / seconds[0]:.1f} recortes/s, B: {len(tiles) / seconds[1]:.1f} recortes/s, "
+          f"total {wall_seconds:.1f} s. Relatório: {report_path}")
+    return report_path
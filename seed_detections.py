@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+DETECTIONS_FILENAME = 'deteccoes.npz'
+
+
+def mask_metrics(masks):
+    """Area and perimeter (in mask pixels) for a whole (N, H, W) mask stack at once.
+
+    The perimeter is the number of pixel edges between foreground and background,
+    with the image border counted as background.
+    """
+    m = np.asarray(masks) > 0.5
+    n = m.shape[0]
+    if n == 0:
+        return np.zeros(0, np.float32), np.zeros(0, np.float32)
+    area = m.reshape(n, -1).sum(axis=1)
+    p = np.pad(m, ((0, 0), (1, 1), (1, 1)))
+    core = p[:, 1:-1, 1:-1]
+    perimeter = np.zeros(n, dtype=np.int64)
+    for neighbour in (p[:, :-2, 1:-1], p[:, 2:, 1:-1], p[:, 1:-1, :-2], p[:, 1:-1, 2:]):
+        perimeter += (core & ~neighbour).reshape(n, -1).sum(axis=1)
+    return area.astype(np.float32), perimeter.astype(np.float32)
+
+
+def rle_encode(masks):
+    """Row-major run-length encoding of an (N, H, W) mask stack.
+
+    Returns (counts, offsets): the runs of mask i are counts[offsets[i]:offsets[i+1]],
+    alternating background/foreground and always starting with a (possibly empty)
+    background run.
+    """
+    m = np.asarray(masks) > 0.5
+    n = m.shape[0]
+    if n == 0:
+        return np.zeros(0, np.uint32), np.zeros(1, np.int64)
+    flat = m.reshape(n, -1)
+    length = flat.shape[1]
+    change = np.empty_like(flat)
+    change[:, 0] = flat[:, 0]
+    np.not_equal(flat[:, 1:], flat[:, :-1], out=change[:, 1:])
+    rows, cols = np.nonzero(change)
+    idx = np.arange(n)
+    values = np.concatenate([np.zeros(n, np.int64), cols, np.full(n, length, np.int64)])
+    owners = np.concatenate([idx, rows, idx])
+    order = np.lexsort((values, owners))
+    values, owners = values[order], owners[order]
+    same_mask = owners[1:] == owners[:-1]
+    counts = np.diff(values)[same_mask].astype(np.uint32)
+    runs_per_mask = np.bincount(rows, minlength=n) + 1
+    offsets = np.zeros(n + 1, np.int64)
+    np.cumsum(runs_per_mask, out=offsets[1:])
+    return counts, offsets
+
+
+def rle_decode(counts, shape):
+    counts = np.asarray(counts, dtype=np.int64)
+    values = np.zeros(len(counts), dtype=bool)
+    values[1::2] = True
+    return np.repeat(values, counts).reshape(shape)
+
+
+def extract_detections(result):
+    """Columnar arrays for every detection in one ultralytics result."""
+    boxes = result.boxes
+    n = 0 if boxes is None else len(boxes)
+    out = {
+        'class_id': np.zeros(n, np.int16),
+        'confidence': np.zeros(n, np.float32),
+        'bbox': np.zeros((n, 4), np.float32),
+        'mask_area': np.zeros(n, np.float32),
+        'mask_perimeter': np.zeros(n, np.float32),
+        'rle_counts': np.zeros(0, np.uint32),
+        'rle_offsets': np.zeros(n + 1, np.int64),
+        'mask_shape': (0, 0),
+        'orig_shape': tuple(int(v) for v in result.orig_shape),
+    }
+    if n == 0:
+        return out
+    out['class_id'] = boxes.cls.cpu().numpy().astype(np.int16)
+    out['confidence'] = boxes.conf.cpu().numpy().astype(np.float32)
+    out['bbox'] = boxes.xyxy.cpu().numpy().astype(np.float32)
+    if result.masks is not None:
+        masks = (result.masks.data > 0.5).cpu().numpy()
+        mask_h, mask_w = masks.shape[1:]
+        orig_h, orig_w = out['orig_shape']
+        # Masks live in the letterboxed inference frame; rescale metrics to tile pixels
+        gain = min(mask_h / orig_h, mask_w / orig_w)
+        area, perimeter = mask_metrics(masks)
+        out['mask_area'] = area / (gain * gain)
+        out['mask_perimeter'] = perimeter / gain
+        out['rle_counts'], out['rle_offsets'] = rle_encode(masks)
+        out['mask_shape'] = (mask_h, mask_w)
+    return out
+
+
+class DetectionTable:
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.tiles = []
+        self.tile_index = {}
+        self.tile_mask_shape = []
+        self.tile_orig_shape = []
+        self.class_names = {}
+        self._tile_chunk = {}
+        self._chunks = []
+        self._rle_chunks = []
+        self._rle_total = 0
+
+    def __len__(self):
+        return sum(len(chunk['class_id']) for chunk in self._chunks)
+
+    def _tile_id(self, tile_path):
+        if tile_path not in self.tile_index:
+            self.tile_index[tile_path] = len(self.tiles)
+            self.tiles.append(tile_path)
+            self.tile_mask_shape.append((0, 0))
+            self.tile_orig_shape.append((0, 0))
+        return self.tile_index[tile_path]
+
+    def add(self, tile_path, result):
+        self.class_names.update({int(k): v for k, v in result.names.items()})
+        self.add_arrays(tile_path, extract_detections(result))
+
+    def add_arrays(self, tile_path, det):
+        tile_id = self._tile_id(tile_path)
+        self.tile_mask_shape[tile_id] = det['mask_shape']
+        self.tile_orig_shape[tile_id] = det['orig_shape']
+        n = len(det['class_id'])
+        chunk = {k: det[k] for k in ('class_id', 'confidence', 'bbox', 'mask_area', 'mask_perimeter')}
+        chunk['tile_id'] = np.full(n, tile_id, np.int32)
+        chunk['rle_start'] = det['rle_offsets'][:-1] + self._rle_total
+        chunk['rle_len'] = np.diff(det['rle_offsets']).astype(np.int32)
+        self._tile_chunk[tile_id] = len(self._chunks)
+        self._chunks.append(chunk)
+        self._rle_chunks.append(det['rle_counts'])
+        self._rle_total += len(det['rle_counts'])
+
+    def remove_tile(self, tile_path):
+        # Tile ids stay stable; the tile's rows are simply dropped from the export
+        tile_id = self.tile_index.get(tile_path)
+        if tile_id is None:
+            return
+        for chunk in self._chunks:
+            keep = chunk['tile_id'] != tile_id
+            if not keep.all():
+                for k in chunk:
+                    chunk[k] = chunk[k][keep]
+
+    def tile_detections(self, tile_path):
+        """The latest detections of one tile (class_id, confidence, bbox, mask_area, mask_perimeter)."""
+        tile_id = self.tile_index.get(tile_path)
+        if tile_id is None or tile_id not in self._tile_chunk:
+            return {k: np.zeros((0, 4) if k == 'bbox' else 0, np.float32)
+                    for k in ('class_id', 'confidence', 'bbox', 'mask_area', 'mask_perimeter')}
+        chunk = self._chunks[self._tile_chunk[tile_id]]
+        return {k: chunk[k] for k in ('class_id', 'confidence', 'bbox', 'mask_area', 'mask_perimeter')}
+
+    def to_arrays(self):
+        def column(name, dtype, shape=()):
+            parts = [c[name] for c in self._chunks]
+            return np.concatenate(parts).astype(dtype) if parts else np.zeros((0,) + shape, dtype)
+        rle_counts = np.concatenate(self._rle_chunks) if self._rle_chunks else np.zeros(0, np.uint32)
+        names = [self.class_names.get(i, str(i)) for i in range(max(self.class_names, default=-1) + 1)]
+        return {
+            'tile_id': column('tile_id', np.int32),
+            'class_id': column('class_id', np.int16),
+            'confidence': column('confidence', np.float32),
+            'bbox': column('bbox', np.float32, (4,)),
+            'mask_area': column('mask_area', np.float32),
+            'mask_perimeter': column('mask_perimeter', np.float32),
+            # Runs of detection i are rle_counts[rle_start[i]:rle_start[i] + rle_len[i]]
+            'rle_start': column('rle_start', np.int64),
+            'rle_len': column('rle_len', np.int32),
+            'rle_counts': rle_counts,
+            'tiles': np.array(self.tiles, dtype=np.str_),
+            'tile_mask_shape': np.array(self.tile_mask_shape, dtype=np.int32).reshape(-1, 2),
+            'tile_orig_shape': np.array(self.tile_orig_shape, dtype=np.int32).reshape(-1, 2),
+            'class_names': np.array(names, dtype=np.str_),
+        }
+
+    def save(self, path):
+        np.savez_compressed(path, **self.to_arrays())
+        return path
+
+
+def load_detections(path):
+    with np.load(path, allow_pickle=False) as data:
+        return {k: data[k] for k in data.files}
+
+
+def detection_mask(table, i):
+    tile_id = table['tile_id'][i]
+    shape = tuple(table['tile_mask_shape'][tile_id])
+    start = table['rle_start'][i]
+    return rle_decode(table['rle_counts'][start:start + table['rle_len'][i]], shape)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import cv2
+import numpy as np
+
+from seed_bundle import open_image
+from seed_pipeline import TILE_COLS, TILE_ROWS
+
+MOSAIC_CELL_SIZE = 320      # maximum size in pixels of each tile in the mosaic
+MOSAIC_CLASS_COLORS = {'viavel': (40, 200, 40), 'inviavel': (230, 40, 40)}
+
+
+def plate_mosaic(tiles, detection_table=None, cell_size=MOSAIC_CELL_SIZE):
+    """Stitches a plate's tiles into one downsampled RGB array with the detections drawn on it.
+
+    `tiles` is a list of (tile index, tile path, annotated path). Tiles with rows in
+    the detection table get their boxes drawn on the plain tile; the others (e.g. a
+    loaded session) use the annotated image instead. Returns the array and the cell
+    size (width, height) in mosaic pixels.
+    """
+    cells = {}
+    cell_w = cell_h = None
+    for idx, tile_path, analysed_path in tiles:
+        det = detection_table.tile_detections(tile_path) if detection_table is not None else None
+        has_detections = det is not None and tile_path in detection_table.tile_index
+        with open_image(tile_path if has_detections else analysed_path) as img:
+            img = img.convert('RGB')
+            factor = max(1, -(-min(img.size) // cell_size))  # cells no larger than cell_size
+            small = np.asarray(img.reduce(factor) if factor > 1 else img).copy()
+        if has_detections and len(det['bbox']):
+            classes = detection_table.class_names
+            for (x1, y1, x2, y2), class_id in zip(det['bbox'] / factor, det['class_id']):
+                color = MOSAIC_CLASS_COLORS.get(classes.get(int(class_id)), (240, 200, 0))
+                cv2.rectangle(small, (int(x1), int(y1)), (int(x2), int(y2)), color, 1)
+        cells[idx] = small
+        cell_h, cell_w = small.shape[:2]
+    mosaic = np.full((cell_h * TILE_ROWS, cell_w * TILE_COLS, 3), 255, np.uint8)
+    for idx, small in cells.items():
+        top, left = (idx // TILE_COLS) * cell_h, (idx % TILE_COLS) * cell_w
+        h, w = min(small.shape[0], cell_h), min(small.shape[1], cell_w)
+        mosaic[top:top + h, left:left + w] = small[:h, :w]
+    return mosaic, (cell_w, cell_h)
@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+import os
+import random
+import traceback
+import weakref
+import numpy as np
+from PIL import Image
+import cv2
+
+from seed_bundle import is_member_path, open_image, save_image, source_stem
+
+# --- Configuration ---
+TARGET_RECT_WIDTH_ORIGINAL = 5676
+TARGET_RECT_HEIGHT_ORIGINAL = 1892
+TILE_COLS = 6
+TILE_ROWS = 2
+EXPECTED_PROCESSED_WIDTH = 946
+EXPECTED_PROCESSED_HEIGHT = 946
+MODEL_PATH = os.environ.get('SEED_ANALYZER_MODEL', "model_weights/best.pt")
+SYNTHETIC_MODEL_PATH = 'sintetico'  # blob counter for synthetic plates (seed_synth.py), no weights needed
+INFERENCE_IMGSZ = 960
+INFERENCE_CONF = 0.25
+INFERENCE_BATCH = 1  # overridden by the autotune profile (seed_cli.py autotune)
+# Letterbox/normalize tiles into a reused tensor and call the network directly instead of model.predict
+FAST_PREPROCESS = True
+# Cascade: infer at CASCADE_IMGSZ first and redo at INFERENCE_IMGSZ only the ambiguous tiles
+# (enable after checking count agreement with `seed_cli.py cascade`)
+CASCADE_ENABLED = False
+CASCADE_IMGSZ = 640
+CASCADE_MARGIN = 0.15       # a detection closer than this to INFERENCE_CONF makes the tile ambiguous
+CASCADE_MAX_SEEDS = 60      # denser tiles always go to full resolution
+CASCADE_CLASS_IOU = 0.5     # viable and inviable boxes overlapping more than this disagree on a seed
+# INT8 model used instead of MODEL_PATH when there is no GPU; set from the profile by `seed_cli.py quantize`
+CPU_MODEL_PATH = ''
+# Set to e.g. http://127.0.0.1:8765 to use a shared warm model from `seed_cli.py serve`
+INFERENCE_SERVER_URL = os.environ.get('SEED_ANALYZER_SERVER', '')
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.bmp', '.tif', '.tiff')
+ORIGINAL_TILES_DIRNAME = 'imagens_recortadas_originais'
+ORIGINAL_ANALYZED_DIRNAME = 'imagens_recortadas_analisadas'
+PROCESSED_ANALYZED_DIRNAME = 'imagens_processadas_analisadas'
+# Write each session's tiles, annotated images and detections into one pack file instead of folders
+OUTPUT_BUNDLE = False
+BUNDLE_FILENAME = 'sessao.seedpack'
+# Pre-screen: tiles that are background-only or out of focus skip the model
+PRESCREEN_ENABLED = False          # optional: thresholds not yet validated against reviewed plates
+PRESCREEN_CONTRAST = 30             # gray levels away from the tile median counted as foreground
+PRESCREEN_MIN_FOREGROUND = 0.002    # below this foreground fraction the tile is empty
+PRESCREEN_MIN_SHARPNESS = 15.0      # below this Laplacian variance the tile is out of focus
+PRESCREEN_AUDIT_RATE = 0.05         # fraction of skipped tiles still run through the model
+# --- End Configuration ---
+
+PRESCREEN_EMPTY = 'vazio'
+PRESCREEN_BLURRY = 'desfocado'
+
+CASCADE_EMPTY = 'sem detecções'
+CASCADE_LOW_MARGIN = 'confiança'
+CASCADE_DENSE = 'densidade'
+CASCADE_CLASS_CONFLICT = 'conflito de classe'
+CASCADE_REASONS = (CASCADE_EMPTY, CASCADE_LOW_MARGIN, CASCADE_DENSE, CASCADE_CLASS_CONFLICT)
+CASCADE_STATS = {'tiles': 0, 'escalated': 0}
+
+
+def empty_counts():
+    return {'total': 0, 'viable': 0, 'inviable': 0}
+
+
+def is_image_file(name):
+    return name.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def tile_rects(roi):
+    ox, oy, ow, oh = map(int, roi)
+    tile_w = ow // TILE_COLS
+    tile_h = oh // TILE_ROWS
+    rects = []
+    for idx in range(TILE_COLS * TILE_ROWS):
+        left = ox + (idx % TILE_COLS) * tile_w
+        top = oy + (idx // TILE_COLS) * tile_h
+        rects.append((left, top, left + tile_w, top + tile_h))
+    return rects
+
+
+def full_roi(x, y):
+    return (x, y, TARGET_RECT_WIDTH_ORIGINAL, TARGET_RECT_HEIGHT_ORIGINAL)
+
+
+def plate_tile_rects(rois):
+    """(plate, tile, rect) for every tile of every ROI (plate) of one scan."""
+    return [(plate, idx, rect) for plate, roi in enumerate(rois) for idx, rect in enumerate(tile_rects(roi))]
+
+
+def tile_name(source_path, idx, plate=0):
+    base_name_no_ext = source_stem(source_path)
+    # The first plate keeps the single-ROI names
+    if plate:
+        return f"{base_name_no_ext}_p{plate+1}_{idx+1}.png"
+    return f"{base_name_no_ext}_{idx+1}.png"
+
+
+def tile_path_for(source_path, idx, output_dir, plate=0):
+    return os.path.join(output_dir, tile_name(source_path, idx, plate))
+
+
+def load_model(model_path=MODEL_PATH, server_url=None, warmup=True):
+    server_url = INFERENCE_SERVER_URL if server_url is None else server_url
+    if server_url:
+        from seed_server import RemoteModel
+        return RemoteModel(server_url)
+    if model_path == SYNTHETIC_MODEL_PATH:
+        from seed_synth import BlobDetector
+        return BlobDetector()
+    from ultralytics import YOLO
+    if model_path == MODEL_PATH and CPU_MODEL_PATH and not _cuda_available():
+        if os.path.exists(CPU_MODEL_PATH):
+            print(f"Usando modelo INT8 para CPU: {CPU_MODEL_PATH}")
+            model = YOLO(CPU_MODEL_PATH, task='segment')
+            if warmup:
+                warm_up(model)
+            return model
+        print(f"Aviso: modelo INT8 promovido não encontrado em {CPU_MODEL_PATH}; usando {model_path}")
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Arquivo do modelo YOLO não encontrado em: {model_path}")
+    model = YOLO(model_path)
+    if warmup:
+        warm_up(model)
+    return model
+
+
+def _cuda_available():
+    try:
+        import torch
+    except ImportError:
+        return False
+    return torch.cuda.is_available()
+
+
+def warm_up(model):
+    # The first predict pays for predictor setup and kernel selection; do it before the first real tile
+    blank = np.zeros((EXPECTED_PROCESSED_HEIGHT, EXPECTED_PROCESSED_WIDTH, 3), dtype=np.uint8)
+    try:
+        model.predict(source=blank, imgsz=INFERENCE_IMGSZ, conf=INFERENCE_CONF, save=False, verbose=False)
+    except Exception as e:
+        print(f"Aviso: falha no aquecimento do modelo: {e}")
+
+
+def count_classes(result):
+    counts = empty_counts()
+    detected_classes = result.boxes.cls.cpu().numpy()
+    class_names_from_model = result.names
+    for cls_idx in detected_classes:
+        class_name = class_names_from_model[int(cls_idx)]
+        if class_name == 'viavel':
+            counts['viable'] += 1
+        elif class_name == 'inviavel':
+            counts['inviable'] += 1
+    counts['total'] = counts['viable'] + counts['inviable']
+    return counts
+
+
+def save_copy(image_path, output_dir, suffix):
+    img_pil = open_image(image_path)
+    copy_path = os.path.join(output_dir, source_stem(image_path) + suffix)
+    return save_image(img_pil, copy_path)
+
+
+def predict_source(image_path):
+    # Tiles inside a bundle are handed to the model as decoded BGR arrays
+    if is_member_path(image_path):
+        return np.ascontiguousarray(np.asarray(open_image(image_path).convert('RGB'))[:, :, ::-1])
+    return image_path
+
+
+def load_tile_bgr(image_path, image=None):
+    if image is not None:
+        return cv2.cvtColor(np.asarray(image.convert('RGB') if isinstance(image, Image.Image) else image),
+                            cv2.COLOR_RGB2BGR)
+    if is_member_path(image_path):
+        return predict_source(image_path)
+    # imdecode rather than imread: imread cannot open non-ASCII paths on Windows
+    tile = cv2.imdecode(np.fromfile(image_path, np.uint8), cv2.IMREAD_COLOR)
+    if tile is None:
+        raise ValueError(f"Não foi possível ler a imagem {image_path}")
+    return tile
+
+
+_batchers = weakref.WeakKeyDictionary()  # model -> {(imgsz, batch): TileBatcher}; False once the fast path failed
+
+
+def _tile_batcher(model, tile, imgsz, batch=None):
+    batch = max(batch or INFERENCE_BATCH, 1)
+    batchers = _batchers.setdefault(model, {})
+    batcher = batchers.get((imgsz, batch))
+    if batcher is None:
+        predictor = getattr(model, 'predictor', None)
+        if predictor is None or getattr(predictor, 'model', None) is None:
+            return None  # set up by the first model.predict (warm_up)
+        from seed_preprocess import TileBatcher
+        batcher = TileBatcher(predictor, tile.shape, imgsz, batch)
+        batchers[imgsz, batch] = batcher
+    return batcher if batcher.fits(tile) else None
+
+
+def _predict(model, image_paths, images, imgsz, batch=None, bgr=False):
+    if FAST_PREPROCESS and hasattr(model, 'predictor') and _batchers.get(model) is not False:
+        tiles = [img if bgr and img is not None else load_tile_bgr(p, img) for p, img in zip(image_paths, images)]
+        try:
+            batcher = _tile_batcher(model, tiles[0], imgsz, batch)
+            if batcher is not None and all(batcher.fits(t) for t in tiles):
+                return batcher.predict(tiles, list(image_paths))
+        except Exception as e:
+            # e.g. an exported backend that does not take tensors; stay on model.predict for this model
+            print(f"Aviso: pré-processamento rápido desativado para este modelo: {e}")
+            traceback.print_exc()
+            _batchers[model] = False
+        sources = tiles
+    else:
+        sources = [predict_source(p) for p in image_paths]
+    return model.predict(source=sources if len(sources) > 1 else sources[0],
+                         imgsz=imgsz,
+                         conf=INFERENCE_CONF,
+                         batch=len(sources),
+                         save=False,
+                         verbose=False)
+
+
+def cascade_ambiguity(result):
+    """Why a low-resolution result needs the full-resolution pass, or None if it can be kept."""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return CASCADE_EMPTY  # seeds too small to survive the downscale look like an empty tile
+    conf = boxes.conf.cpu().numpy()
+    if (conf < INFERENCE_CONF + CASCADE_MARGIN).any():
+        return CASCADE_LOW_MARGIN
+    if len(conf) > CASCADE_MAX_SEEDS:
+        return CASCADE_DENSE
+    cls = boxes.cls.cpu().numpy()
+    if len(np.unique(cls)) > 1:
+        # The same seed found as both viable and inviable
+        xyxy = boxes.xyxy.cpu().numpy()
+        lt = np.maximum(xyxy[:, None, :2], xyxy[None, :, :2])
+        rb = np.minimum(xyxy[:, None, 2:], xyxy[None, :, 2:])
+        inter = np.clip(rb - lt, 0, None).prod(axis=2)
+        area = (xyxy[:, 2:] - xyxy[:, :2]).prod(axis=1)
+        iou = inter / (area[:, None] + area[None, :] - inter + 1e-9)
+        if ((iou > CASCADE_CLASS_IOU) & (cls[:, None] != cls[None, :])).any():
+            return CASCADE_CLASS_CONFLICT
+    return None
+
+
+def predict_tiles(model, image_paths, images=None, imgsz=None, batch=None, bgr=False):
+    """model.predict over tiles, through the TileBatcher fast path when it applies.
+
+    `images` optionally holds the already decoded tiles (PIL RGB or arrays; BGR arrays
+    as from load_tile_bgr with `bgr`), which saves reading them back from disk on the
+    fast path. `batch` overrides INFERENCE_BATCH for it. With CASCADE_ENABLED (and no
+    explicit imgsz) tiles are first inferred at CASCADE_IMGSZ and only the ambiguous
+    ones again at INFERENCE_IMGSZ.
+    """
+    images = images or [None] * len(image_paths)
+    if imgsz is not None or not CASCADE_ENABLED or CASCADE_IMGSZ >= INFERENCE_IMGSZ:
+        return _predict(model, image_paths, images, imgsz or INFERENCE_IMGSZ, batch, bgr)
+    results = list(_predict(model, image_paths, images, CASCADE_IMGSZ, batch, bgr))
+    escalate = []
+    for i, result in enumerate(results):
+        reason = cascade_ambiguity(result)
+        if reason:
+            escalate.append(i)
+            CASCADE_STATS[reason] = CASCADE_STATS.get(reason, 0) + 1
+    CASCADE_STATS['tiles'] += len(results)
+    CASCADE_STATS['escalated'] += len(escalate)
+    if escalate:
+        full = _predict(model, [image_paths[i] for i in escalate], [images[i] for i in escalate], INFERENCE_IMGSZ,
+                        batch, bgr)
+        for i, result in zip(escalate, full):
+            results[i] = result
+    return results
+
+
+def reset_cascade_stats():
+    # Called at the start of every analysis run so cascade_summary describes that run alone
+    CASCADE_STATS.clear()
+    CASCADE_STATS.update(tiles=0, escalated=0)
+
+
+def cascade_summary():
+    tiles = CASCADE_STATS['tiles']
+    if not tiles:
+        return None
+    reasons = ", ".join(f"{CASCADE_STATS[r]} por {r}" for r in CASCADE_REASONS if CASCADE_STATS.get(r))
+    return (f"Cascata: {CASCADE_STATS['escalated']} de {tiles} recortes reanalisados em {INFERENCE_IMGSZ} "
+            f"(primeira passada em {CASCADE_IMGSZ})" + (f": {reasons}" if reasons else ""))
+
+
+def predict_batch(model, image_paths):
+    return predict_tiles(model, image_paths)
+
+
+def process_result(result, image_path_to_analyze, output_dir_for_analyzed_image, detection_table=None):
+    if detection_table is not None and result is not None:
+        detection_table.add(image_path_to_analyze, result)
+
+    if result is not None and result.masks is not None:
+        annotated_frame_np = result.plot()
+        annotated_frame_pil = Image.fromarray(cv2.cvtColor(annotated_frame_np, cv2.COLOR_BGR2RGB))
+
+        base_name = source_stem(image_path_to_analyze)
+        analyzed_img_path = os.path.join(output_dir_for_analyzed_image, f"{base_name}_analisada.png")
+        save_image(annotated_frame_pil, analyzed_img_path)
+        return analyzed_img_path, count_classes(result)
+
+    print(f"Nenhuma detecção para {image_path_to_analyze}")
+    return save_copy(image_path_to_analyze, output_dir_for_analyzed_image, "_no_detection.png"), empty_counts()
+
+
+class UnsupportedTileError(ValueError):
+    """A tile the model cannot take at all (e.g. an archive member sent to the inference
+    server); raised to the caller instead of the zero-count fallback of analyze_tile."""
+
+
+def analyze_tile(model, image_path_to_analyze, output_dir_for_analyzed_image, detection_table=None, image=None):
+    """Runs the segmentation model on one tile and writes the annotated image.
+
+    Returns (annotated image path, counts). Errors are reported on the console and
+    produce a copy of the tile with zero counts, as the GUI has always done.
+    """
+    if not model:
+        print("Modelo YOLO não carregado. Análise não pode ser realizada.")
+        return save_copy(image_path_to_analyze, output_dir_for_analyzed_image, "_error.png"), empty_counts()
+
+    try:
+        # Remote models (inference server clients) run the whole step themselves
+        if hasattr(model, 'analyze_tile'):
+            return model.analyze_tile(image_path_to_analyze, output_dir_for_analyzed_image, detection_table)
+
+        results = predict_tiles(model, [image_path_to_analyze], [image])
+        result = results[0] if results else None
+        return process_result(result, image_path_to_analyze, output_dir_for_analyzed_image, detection_table)
+
+    except UnsupportedTileError:
+        raise
+    except Exception as e:
+        print(f"Erro durante a análise YOLO da imagem {image_path_to_analyze}: {e}")
+        traceback.print_exc()
+        return save_copy(image_path_to_analyze, output_dir_for_analyzed_image, "_pred_error.png"), empty_counts()
+
+
+def prescreen_tile(image):
+    """Returns (reason or None, metrics) for a tile given as a PIL image or array."""
+    if isinstance(image, Image.Image):
+        gray = np.asarray(image.convert('L'))
+    else:
+        gray = np.asarray(image)
+        if gray.ndim == 3:
+            gray = cv2.cvtColor(gray, cv2.COLOR_RGB2GRAY)
+    # Median and foreground fraction from the 256-bin histogram instead of sorting the pixels
+    hist = np.bincount(gray.ravel(), minlength=256)
+    median = int(np.searchsorted(np.cumsum(hist), gray.size / 2))
+    levels = np.arange(256)
+    foreground = hist[np.abs(levels - median) > PRESCREEN_CONTRAST].sum() / gray.size
+    # Focus on a half-size copy: averages out sensor noise that would otherwise read as detail
+    half = cv2.resize(gray, (gray.shape[1] // 2, gray.shape[0] // 2), interpolation=cv2.INTER_AREA)
+    sharpness = float(cv2.Laplacian(half, cv2.CV_64F).var())
+    reason = None
+    if foreground < PRESCREEN_MIN_FOREGROUND:
+        reason = PRESCREEN_EMPTY
+    elif sharpness < PRESCREEN_MIN_SHARPNESS:
+        reason = PRESCREEN_BLURRY
+    return reason, {'foreground': round(float(foreground), 5), 'sharpness': round(sharpness, 2)}
+
+
+def screen_and_analyze_tile(model, image_path_to_analyze, output_dir_for_analyzed_image, detection_table=None,
+                            image=None, audit_rate=None, rng=random):
+    """analyze_tile behind the pre-screen. Returns (annotated path, counts, screen).
+
+    `screen` is None when the tile passed, otherwise a dict with the reason and metrics.
+    Skipped tiles keep the tile itself as the annotated image. A fraction `audit_rate` of
+    them is still inferred, and the model counts are kept, to validate the skip rule.
+    """
+    if not PRESCREEN_ENABLED:
+        return (*analyze_tile(model, image_path_to_analyze, output_dir_for_analyzed_image, detection_table,
+                              image=image), None)
+    try:
+        if image is None:
+            with open_image(image_path_to_analyze) as img:
+                reason, metrics = prescreen_tile(img)
+        else:
+            reason, metrics = prescreen_tile(image)
+    except Exception as e:
+        print(f"Erro na triagem de {image_path_to_analyze}: {e}")
+        reason = None
+    if reason is None:
+        return (*analyze_tile(model, image_path_to_analyze, output_dir_for_analyzed_image, detection_table,
+                              image=image), None)
+
+    screen = {'reason': reason, **metrics, 'audited': False}
+    audit_rate = PRESCREEN_AUDIT_RATE if audit_rate is None else audit_rate
+    if audit_rate > 0 and rng.random() < audit_rate:
+        analyzed_path, counts = analyze_tile(model, image_path_to_analyze, output_dir_for_analyzed_image,
+                                             detection_table, image=image)
+        screen['audited'] = True
+        screen['audit_total'] = counts['total']
+        return analyzed_path, counts, screen
+    return image_path_to_analyze, empty_counts(), screen
+
+
+def prescreen_summary(screens):
+    screens = [s for s in screens if s]
+    if not screens:
+        return None
+    empty = sum(1 for s in screens if s['reason'] == PRESCREEN_EMPTY)
+    audited = [s for s in screens if s['audited']]
+    missed = [s for s in audited if s.get('audit_total')]
+    text = (f"Triagem: {len(screens)} recortes sem inferência ({empty} vazios, {len(screens) - empty} desfocados); "
+            f"auditoria: {len(audited)} inferidos, {len(missed)} com sementes detectadas")
+    if missed:
+        text += f" ({sum(s['audit_total'] for s in missed)} sementes) - revise os limites de triagem"
+    return text
+
+
+def analyze_tiles(model, image_paths, output_dir_for_analyzed_image, detection_table=None, batch=None):
+    """Batched analyze_tile: predicts `batch` tiles per call (INFERENCE_BATCH by default)."""
+    batch = batch or INFERENCE_BATCH
+    if batch <= 1 or not model or hasattr(model, 'analyze_tile'):
+        return [analyze_tile(model, p, output_dir_for_analyzed_image, detection_table) for p in image_paths]
+    outputs = []
+    for i in range(0, len(image_paths), batch):
+        chunk = list(image_paths[i:i + batch])
+        try:
+            results = predict_batch(model, chunk)
+        except Exception as e:
+            print(f"Erro durante a análise YOLO do lote {chunk[0]}...: {e}")
+            traceback.print_exc()
+            outputs.extend((save_copy(p, output_dir_for_analyzed_image, "_pred_error.png"), empty_counts())
+                           for p in chunk)
+            continue
+        for path, result in zip(chunk, results):
+            try:
+                outputs.append(process_result(result, path, output_dir_for_analyzed_image, detection_table))
+            except Exception as e:
+                print(f"Erro durante a análise YOLO da imagem {path}: {e}")
+                traceback.print_exc()
+                outputs.append((save_copy(path, output_dir_for_analyzed_image, "_pred_error.png"), empty_counts()))
+    return outputs
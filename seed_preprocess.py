@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+import cv2
+
+LETTERBOX_FILL = 114  # same padding gray as ultralytics
+
+
+class TileBatcher:
+    """Fixed-geometry replacement for ultralytics' per-call preprocessing.
+
+    Tiles are letterboxed straight into a reused uint8 host buffer (pinned when on
+    GPU), copied into a preallocated device buffer and normalized in place, then
+    fed to the predictor's network under torch.inference_mode. Postprocessing
+    (NMS, mask decoding, scaling back to tile pixels) is the predictor's own.
+    """
+
+    def __init__(self, predictor, tile_shape, imgsz, batch):
+        import torch
+        self.torch = torch
+        self.predictor = predictor
+        self.tile_shape = tuple(tile_shape[:2])
+        self.batch = batch
+        net = predictor.model
+        self.device = predictor.device
+        h, w = self.tile_shape
+        # Same geometry as ultralytics' LetterBox(auto=False, center=True)
+        r = min(imgsz / h, imgsz / w)
+        self.new_w, self.new_h = int(round(w * r)), int(round(h * r))
+        self.top = int(round((imgsz - self.new_h) / 2 - 0.1))
+        self.left = int(round((imgsz - self.new_w) / 2 - 0.1))
+        pin = self.device.type == 'cuda'
+        self.host_t = torch.full((batch, imgsz, imgsz, 3), LETTERBOX_FILL, dtype=torch.uint8, pin_memory=pin)
+        self.host = self.host_t.numpy()
+        self.staging = self.host_t if not pin else torch.empty_like(self.host_t, device=self.device)
+        dtype = torch.float16 if getattr(net, 'fp16', False) else torch.float32
+        self.buffer = torch.empty((batch, 3, imgsz, imgsz), dtype=dtype, device=self.device)
+
+    def fits(self, image):
+        return image.shape[:2] == self.tile_shape
+
+    def _fill(self, i, image_bgr):
+        target = self.host[i, self.top:self.top + self.new_h, self.left:self.left + self.new_w]
+        if target.flags['C_CONTIGUOUS']:
+            cv2.resize(image_bgr, (self.new_w, self.new_h), dst=target, interpolation=cv2.INTER_LINEAR)
+        else:
+            target[:] = cv2.resize(image_bgr, (self.new_w, self.new_h), interpolation=cv2.INTER_LINEAR)
+
+    def predict(self, images_bgr, paths):
+        results = []
+        for start in range(0, len(images_bgr), self.batch):
+            chunk = images_bgr[start:start + self.batch]
+            results.extend(self._predict_chunk(chunk, paths[start:start + self.batch]))
+        return results
+
+    def _predict_chunk(self, images_bgr, paths):
+        torch = self.torch
+        n = len(images_bgr)
+        for i, image in enumerate(images_bgr):
+            self._fill(i, image)
+        with torch.inference_mode():
+            staged = self.staging[:n]
+            if staged.data_ptr() != self.host_t.data_ptr():
+                staged.copy_(self.host_t[:n], non_blocking=True)
+            out = self.buffer[:n]
+            # BGR HWC uint8 -> RGB CHW in [0, 1], written into the reused buffer
+            for c in range(3):
+                out[:, c].copy_(staged[..., 2 - c])
+            out.mul_(1 / 255)
+            preds = self.predictor.model(out)
+            # postprocess reads the image paths from the predictor's current batch
+            self.predictor.batch = (list(paths), list(images_bgr), [''] * n)
+            return self.predictor.postprocess(preds, out, list(images_bgr))
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+import os
+import csv
+import json
+import tempfile
+from datetime import datetime
+
+import seed_pipeline
+from seed_pipeline import MODEL_PATH, INFERENCE_CONF, count_classes, is_image_file
+from seed_autotune import INFERENCE_PROFILE_PATH
+
+# --- Parity tolerances for promoting an INT8 model ---
+INT8_MAX_VIABILITY_DELTA_PP = 0.5   # overall viability, percentage points
+INT8_MAX_TOTAL_DELTA = 0.01         # overall seed total, relative
+INT8_MAX_TILE_MAE = 0.5             # mean per-tile |Δ viable| + |Δ inviable|
+
+
+def list_tiles(folder):
+    return sorted(os.path.join(folder, fn) for fn in os.listdir(folder) if is_image_file(fn))
+
+
+def export_int8(model_path=MODEL_PATH, calibration_folder=None, imgsz=None):
+    """Post-training INT8 export for CPU (OpenVINO), calibrated on real tiles."""
+    from ultralytics import YOLO
+    imgsz = imgsz or seed_pipeline.INFERENCE_IMGSZ
+    model = YOLO(model_path)
+    # Ultralytics reads calibration images from a dataset YAML; point both splits at the tile folder
+    names = {int(k): v for k, v in model.names.items()}
+    with tempfile.NamedTemporaryFile('w', suffix='.yaml', delete=False, encoding='utf-8') as f:
+        f.write(f"path: {os.path.abspath(calibration_folder)}\ntrain: .\nval: .\nnames:\n")
+        for k in sorted(names):
+            f.write(f"  {k}: {names[k]}\n")
+        data_yaml = f.name
+    try:
+        exported = model.export(format='openvino', int8=True, data=data_yaml, imgsz=imgsz)
+    finally:
+        os.remove(data_yaml)
+    print(f"Modelo INT8 exportado para {exported}")
+    return exported
+
+
+def _tile_counts(model, paths, imgsz):
+    counts = []
+    for path in paths:
+        results = model.predict(source=path, imgsz=imgsz, conf=INFERENCE_CONF, save=False, verbose=False)
+        counts.append(count_classes(results[0]) if results else seed_pipeline.empty_counts())
+    return counts
+
+
+def _viability(counts):
+    total = sum(c['total'] for c in counts)
+    viable = sum(c['viable'] for c in counts)
+    return (viable / total * 100) if total else 0.0, total
+
+
+def parity_report(fp32_path, int8_path, tiles_folder, report_path=None, imgsz=None):
+    """Runs both models over the reference tiles and compares counts tile by tile."""
+    from ultralytics import YOLO
+    imgsz = imgsz or seed_pipeline.INFERENCE_IMGSZ
+    paths = list_tiles(tiles_folder)
+    if not paths:
+        raise ValueError(f"Nenhum recorte de referência em {tiles_folder}")
+    fp32 = _tile_counts(YOLO(fp32_path), paths, imgsz)
+    int8 = _tile_counts(YOLO(int8_path, task='segment'), paths, imgsz)
+
+    fp32_viability, fp32_total = _viability(fp32)
+    int8_viability, int8_total = _viability(int8)
+    tile_abs = [abs(a['viable'] - b['viable']) + abs(a['inviable'] - b['inviable']) for a, b in zip(fp32, int8)]
+    summary = {
+        'tiles': len(paths),
+        'fp32_total': fp32_total, 'int8_total': int8_total,
+        'fp32_viability': round(fp32_viability, 3), 'int8_viability': round(int8_viability, 3),
+        'viability_delta_pp': round(abs(fp32_viability - int8_viability), 3),
+        'total_delta': round(abs(fp32_total - int8_total) / max(fp32_total, 1), 4),
+        'tile_mae': round(sum(tile_abs) / len(tile_abs), 3),
+        'tiles_changed': sum(1 for d in tile_abs if d),
+    }
+    summary['passed'] = (summary['viability_delta_pp'] <= INT8_MAX_VIABILITY_DELTA_PP and
+                         summary['total_delta'] <= INT8_MAX_TOTAL_DELTA and
+                         summary['tile_mae'] <= INT8_MAX_TILE_MAE)
+
+    if report_path is None:
+        timestamp = datetime.now().strftime("%d%m%Y_%H%M%S")
+        report_path = os.path.join(tiles_folder, f"paridade_int8_{timestamp}.csv")
+    with open(report_path, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Imagem", "Viáveis FP32", "Inviáveis FP32", "Viáveis INT8", "Inviáveis INT8",
+                         "Δ Viáveis", "Δ Inviáveis"])
+        for path, a, b in zip(paths, fp32, int8):
+            writer.writerow([os.path.basename(path), a['viable'], a['inviable'], b['viable'], b['inviable'],
+                             b['viable'] - a['viable'], b['inviable'] - a['inviable']])
+        writer.writerow([])
+        writer.writerow(["% Viabilidade FP32", f"{summary['fp32_viability']}%"])
+        writer.writerow(["% Viabilidade INT8", f"{summary['int8_viability']}%"])
+        writer.writerow(["Δ Viabilidade (p.p.)", summary['viability_delta_pp'], f"limite {INT8_MAX_VIABILITY_DELTA_PP}"])
+        writer.writerow(["Δ Total relativo", summary['total_delta'], f"limite {INT8_MAX_TOTAL_DELTA}"])
+        writer.writerow(["Erro médio por recorte", summary['tile_mae'], f"limite {INT8_MAX_TILE_MAE}"])
+        writer.writerow(["Aprovado", "sim" if summary['passed'] else "não"])
+    summary['report'] = report_path
+    print(f"Paridade FP32 x INT8 em {len(paths)} recortes: viabilidade {summary['fp32_viability']}% x "
+          f"{summary['int8_viability']}% (Δ {summary['viability_delta_pp']} p.p.), erro médio por recorte "
+          f"{summary['tile_mae']} -> {'APROVADO' if summary['passed'] else 'REPROVADO'}. Relatório: {report_path}")
+    return summary
+
+
+def promote_int8(int8_path, summary, profile_path=INFERENCE_PROFILE_PATH):
+    """Records the INT8 model in the inference profile so CPU runs load it instead of FP32."""
+    if not summary.get('passed'):
+        raise ValueError("O modelo INT8 não passou na verificação de paridade e não será promovido.")
+    profile = {}
+    if os.path.exists(profile_path):
+        with open(profile_path, encoding='utf-8') as f:
+            profile = json.load(f)
+    profile['cpu_model'] = str(int8_path)
+    profile['cpu_model_parity'] = {k: v for k, v in summary.items() if k != 'passed'}
+    with open(profile_path, 'w', encoding='utf-8') as f:
+        json.dump(profile, f, indent=2)
+    print(f"Modelo INT8 promovido para execução em CPU: {int8_path}")
+    return profile
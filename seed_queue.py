@@ -0,0 +1,33 @@
+# -*- coding: utf-8 -*-
+import bisect
+
+# A row behind the cursor is only taken first when it is this many times closer than the next row ahead
+AHEAD_BIAS = 2
+
+
+class CursorQueue:
+    """Rows waiting for inference, handed out nearest-first to a cursor (the row under review).
+
+    Rows ahead of the cursor are favoured since the reviewer works down the list,
+    so the tiles about to be reviewed are the ones inferred next.
+    """
+
+    def __init__(self, rows):
+        self._rows = sorted(rows)
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __bool__(self):
+        return bool(self._rows)
+
+    def __contains__(self, row):
+        i = bisect.bisect_left(self._rows, row)
+        return i < len(self._rows) and self._rows[i] == row
+
+    def pop(self, cursor=-1):
+        rows = self._rows
+        i = bisect.bisect_left(rows, max(cursor, 0))
+        if i == len(rows) or (i > 0 and AHEAD_BIAS * (cursor - rows[i - 1]) < rows[i] - cursor):
+            i -= 1
+        return rows.pop(i)
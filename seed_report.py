@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+import os
+import csv
+from datetime import datetime
+
+import numpy as np
+
+REPORT_FIELDS = ("Análise", "Espécie", "Temperatura", "Tempo")
+
+# --- Bootstrap confidence intervals (tiles resampled within each plate / experiment) ---
+BOOTSTRAP_RESAMPLES = 2000
+BOOTSTRAP_CONFIDENCE = 0.95
+BOOTSTRAP_SEED = 0                     # fixed so the same tiles always give the same report
+BOOTSTRAP_CHUNK_ELEMENTS = 4_000_000   # resampled tile draws held in memory at once
+
+
+def report_filename(base_dir, analysis_name, timestamp=None):
+    timestamp = timestamp or datetime.now().strftime("%d%m%Y_%H%M%S")
+    return os.path.join(base_dir, f"relatorio_{analysis_name}_{timestamp}.csv")
+
+
+def viability_pct(viable, total):
+    return round((viable / total) * 100, 2) if total > 0 else 0
+
+
+def bootstrap_viability(viable, total, groups=None, resamples=BOOTSTRAP_RESAMPLES,
+                        confidence=BOOTSTRAP_CONFIDENCE, seed=BOOTSTRAP_SEED):
+    """Viability % per group with a percentile bootstrap interval, resampling tiles within each group.
+
+    All groups are resampled together: every draw picks, for each tile slot, a random
+    tile of the same group, and np.add.reduceat sums the draws per group. Draws are
+    made in chunks of resamples so memory stays bounded for experiments of any size.
+    Returns (group labels, point %, lower %, upper %) as arrays.
+    """
+    viable = np.asarray(viable, np.int64)
+    total = np.asarray(total, np.int64)
+    groups = np.zeros(len(viable), np.int64) if groups is None else np.asarray(groups)
+    order = np.argsort(groups, kind='stable')
+    viable, total, groups = viable[order], total[order], groups[order]
+    labels, starts, sizes = np.unique(groups, return_index=True, return_counts=True)
+    if not len(labels):
+        empty = np.zeros(0)
+        return labels, empty, empty, empty
+
+    def pct(v, t):
+        return np.where(t > 0, 100 * v / np.maximum(t, 1), 0.0)
+
+    point = pct(np.add.reduceat(viable, starts), np.add.reduceat(total, starts))
+    offsets = np.repeat(starts, sizes)
+    spans = np.repeat(sizes, sizes)
+    rng = np.random.default_rng(seed)
+    stats = np.empty((resamples, len(labels)))
+    chunk = max(1, BOOTSTRAP_CHUNK_ELEMENTS // len(viable))
+    for start in range(0, resamples, chunk):
+        n = min(chunk, resamples - start)
+        idx = offsets + rng.integers(0, spans, size=(n, len(viable)))
+        stats[start:start + n] = pct(np.add.reduceat(viable[idx], starts, axis=1),
+                                     np.add.reduceat(total[idx], starts, axis=1))
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(stats, [alpha, 1 - alpha], axis=0)
+    return labels, point, low, high
+
+
+def write_report(filename, info, items, totals=None):
+    """Writes the experiment CSV for the confirmed tiles `items` (dicts or AnalysisStore items).
+
+    `info` holds the REPORT_FIELDS values. `totals` (total, viable, inviable) may be
+    passed when the caller already keeps them; otherwise they are summed here. The
+    experiment and each source plate also get a bootstrap interval over their tiles.
+    """
+    with open(filename, 'w', newline='', encoding='utf-8-sig') as csvfile:
+        writer = csv.writer(csvfile)
+        writer.writerow(["Informações da Análise"])
+        writer.writerow(["Análise", info['Análise']])
+        writer.writerow(["Espécie", info['Espécie']])
+        writer.writerow(["Temperatura", f"{info['Temperatura']} °C"])
+        writer.writerow(["Tempo", f"{info['Tempo']} h"])
+        writer.writerow([])
+        writer.writerow(["Imagem", "Total Sementes", "Sementes Viáveis", "Sementes Inviáveis", "% Viabilidade"])
+
+        plates = {}
+        tile_viable, tile_total, tile_plate = [], [], []
+        summed = [0, 0, 0]
+        n_items = auto_confirmed = 0
+        for item in items:
+            counts = item['counts']
+            writer.writerow([os.path.basename(item['recorte']), counts['total'], counts['viable'], counts['inviable'],
+                             f"{viability_pct(counts['viable'], counts['total'])}%"])
+            values = (counts['total'], counts['viable'], counts['inviable'])
+            summed = [a + b for a, b in zip(summed, values)]
+            tile_viable.append(counts['viable'])
+            tile_total.append(counts['total'])
+            # Processed tiles (no crop rect) name themselves as source; they belong to no plate
+            if item.get('source') and item.get('rect'):
+                key = (item['source'], item.get('plate') or 0)
+                plate_totals = plates.setdefault(key, [0, 0, 0, len(plates)])
+                for i, v in enumerate(values):
+                    plate_totals[i] += v
+                tile_plate.append(plate_totals[3])
+            else:
+                tile_plate.append(-1)
+            n_items += 1
+            auto_confirmed += bool((item.get('triage') or {}).get('auto'))
+
+        total_seeds, total_viable, _ = totals or summed
+        writer.writerow([])
+        writer.writerow(["TOTAL", total_seeds, total_viable, total_seeds - total_viable,
+                         f"{viability_pct(total_viable, total_seeds)}%"])
+        level = f"IC {round(BOOTSTRAP_CONFIDENCE * 100)}%"
+        if tile_total:
+            _, _, low, high = bootstrap_viability(tile_viable, tile_total)
+            writer.writerow([f"{level} (bootstrap sobre recortes)", f"{low[0]:.2f}%", f"{high[0]:.2f}%"])
+        if auto_confirmed:
+            writer.writerow(["Confirmados automaticamente", auto_confirmed, f"de {n_items} recortes"])
+
+        # One line per source plate (scan and ROI) once there is more than one
+        if len(plates) > 1:
+            tile_plate = np.asarray(tile_plate)
+            has_plate = tile_plate >= 0
+            _, _, low, high = bootstrap_viability(np.asarray(tile_viable)[has_plate], np.asarray(tile_total)[has_plate],
+                                                  tile_plate[has_plate])
+            writer.writerow([])
+            writer.writerow(["Por placa", "Total Sementes", "Sementes Viáveis", "Sementes Inviáveis", "% Viabilidade",
+                             f"{level} inferior", f"{level} superior", "Recortes"])
+            tiles_per_plate = np.bincount(tile_plate[has_plate], minlength=len(plates))
+            for (source, plate), (total, viable, inviable, index) in plates.items():
+                writer.writerow([f"{os.path.basename(source)} #{plate+1}", total, viable, inviable,
+                                 f"{viability_pct(viable, total)}%", f"{low[index]:.2f}%", f"{high[index]:.2f}%",
+                                 tiles_per_plate[index]])
+    return filename
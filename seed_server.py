@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import queue
+import threading
+import traceback
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from seed_bundle import is_member_path
+from seed_detections import extract_detections
+from seed_pipeline import UnsupportedTileError, predict_batch, process_result
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+MAX_BATCH = 8
+BATCH_WINDOW_MS = 15
+REQUEST_TIMEOUT_SECONDS = 300
+ALLOWED_ROOTS = ()  # folders the server may read tiles from and write into; empty: its working folder
+
+
+def detections_to_json(det, names):
+    return {
+        'class_id': det['class_id'].tolist(),
+        'confidence': det['confidence'].tolist(),
+        'bbox': det['bbox'].tolist(),
+        'mask_area': det['mask_area'].tolist(),
+        'mask_perimeter': det['mask_perimeter'].tolist(),
+        'rle_counts': det['rle_counts'].tolist(),
+        'rle_offsets': det['rle_offsets'].tolist(),
+        'mask_shape': list(det['mask_shape']),
+        'orig_shape': list(det['orig_shape']),
+        'names': {str(k): v for k, v in names.items()},
+    }
+
+
+def detections_from_json(data):
+    return {
+        'class_id': np.asarray(data['class_id'], np.int16),
+        'confidence': np.asarray(data['confidence'], np.float32),
+        'bbox': np.asarray(data['bbox'], np.float32).reshape(-1, 4),
+        'mask_area': np.asarray(data['mask_area'], np.float32),
+        'mask_perimeter': np.asarray(data['mask_perimeter'], np.float32),
+        'rle_counts': np.asarray(data['rle_counts'], np.uint32),
+        'rle_offsets': np.asarray(data['rle_offsets'], np.int64),
+        'mask_shape': tuple(data['mask_shape']),
+        'orig_shape': tuple(data['orig_shape']),
+    }
+
+
+def is_within(path, roots):
+    real = os.path.realpath(path)
+    return any(os.path.commonpath([real, root]) == root for root in roots)
+
+
+class _TileRequest:
+    def __init__(self, image_path, output_dir):
+        self.image_path = image_path
+        self.output_dir = output_dir
+        self.future = Future()
+
+
+class MicroBatcher:
+    """Coalesces concurrent tile requests into one predict call.
+
+    The first request opens a window of `window_ms`; everything that arrives
+    inside it (up to `max_batch` tiles) is inferred together.
+    """
+
+    def __init__(self, model, max_batch=MAX_BATCH, window_ms=BATCH_WINDOW_MS):
+        self.model = model
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self.requests = queue.Queue()
+        self.stats = {'requests': 0, 'batches': 0, 'largest_batch': 0, 'inference_seconds': 0.0}
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, image_path, output_dir):
+        request = _TileRequest(image_path, output_dir)
+        self.requests.put(request)
+        return request.future
+
+    def stop(self):
+        self.requests.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            first = self.requests.get()
+            if first is None:
+                return
+            batch = [first]
+            deadline = time.monotonic() + self.window
+            stopping = False
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self.requests.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._process(batch)
+            if stopping:
+                return
+
+    def _process(self, batch):
+        started = time.perf_counter()
+        try:
+            results = predict_batch(self.model, [r.image_path for r in batch])
+        except Exception as e:
+            traceback.print_exc()
+            for request in batch:
+                request.future.set_exception(e)
+            return
+        self.stats['inference_seconds'] += time.perf_counter() - started
+        self.stats['requests'] += len(batch)
+        self.stats['batches'] += 1
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+        for request, result in zip(batch, results):
+            try:
+                analysed, counts = process_result(result, request.image_path, request.output_dir)
+                detections = detections_to_json(extract_detections(result), result.names)
+                request.future.set_result({'analysed': analysed, 'counts': counts, 'detections': detections})
+            except Exception as e:
+                traceback.print_exc()
+                request.future.set_exception(e)
+
+
+class InferenceRequestHandler(BaseHTTPRequestHandler):
+    server_version = "SeedAnalyzerInference/1.0"
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/health':
+            self._send_json(404, {'error': 'not found'})
+            return
+        batcher = self.server.batcher
+        stats = dict(batcher.stats)
+        stats['mean_batch'] = stats['requests'] / stats['batches'] if stats['batches'] else 0.0
+        self._send_json(200, {'status': 'ok', 'model': self.server.model_name, 'stats': stats})
+
+    def do_POST(self):
+        if self.path != '/analyze':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            payload = json.loads(self.rfile.read(length))
+            image_path = payload['path']
+            output_dir = payload['output_dir']
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {'error': f"requisição inválida: {e}"})
+            return
+        if is_member_path(image_path) or is_member_path(output_dir):
+            self._send_json(400, {'error': f"membros de arquivos compactados ou pacotes não são aceitos: {image_path}"})
+            return
+        if not is_within(image_path, self.server.roots) or not is_within(output_dir, self.server.roots):
+            self._send_json(403, {'error': f"fora das pastas permitidas: {image_path} / {output_dir}"})
+            return
+        if not os.path.isfile(image_path) or not os.path.isdir(output_dir):
+            self._send_json(400, {'error': f"caminho inexistente: {image_path} / {output_dir}"})
+            return
+        try:
+            result = self.server.batcher.submit(image_path, output_dir).result(timeout=REQUEST_TIMEOUT_SECONDS)
+        except Exception as e:
+            self._send_json(500, {'error': str(e)})
+            return
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(model, host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=MAX_BATCH,
+                window_ms=BATCH_WINDOW_MS, model_name='', roots=None):
+    server = ThreadingHTTPServer((host, port), InferenceRequestHandler)
+    server.daemon_threads = True
+    server.roots = [os.path.realpath(r) for r in (roots or ALLOWED_ROOTS or [os.getcwd()])]
+    server.batcher = MicroBatcher(model, max_batch=max_batch, window_ms=window_ms)
+    server.model_name = model_name
+    return server
+
+
+def serve(model, host=DEFAULT_HOST, port=DEFAULT_PORT, max_batch=MAX_BATCH, window_ms=BATCH_WINDOW_MS,
+          model_name='', roots=None):
+    server = make_server(model, host, port, max_batch, window_ms, model_name, roots)
+    print(f"Servidor de inferência em http://{host}:{server.server_port} "
+          f"(lote máx. {max_batch}, janela {window_ms} ms; pastas permitidas: {', '.join(server.roots)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("Servidor encerrado.")
+    finally:
+        server.server_close()
+        server.batcher.stop()
+
+
+class RemoteModel:
+    """Client for `seed_cli.py serve`; accepted anywhere a loaded model is."""
+
+    def __init__(self, url, timeout=REQUEST_TIMEOUT_SECONDS):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+
+    def __repr__(self):
+        return f"RemoteModel({self.url!r})"
+
+    def health(self):
+        with urllib.request.urlopen(f"{self.url}/health", timeout=5) as response:
+            return json.loads(response.read())
+
+    def analyze(self, image_path, output_dir):
+        # The server opens the tile from the shared filesystem; it cannot see inside archives or packs
+        if is_member_path(image_path) or is_member_path(output_dir):
+            raise UnsupportedTileError(f"O servidor de inferência não lê membros de arquivos compactados ou "
+                                       f"pacotes ({image_path}); desative OUTPUT_BUNDLE ou extraia o arquivo.")
+        body = json.dumps({'path': os.path.abspath(image_path), 'output_dir': os.path.abspath(output_dir)})
+        request = urllib.request.Request(f"{self.url}/analyze", data=body.encode('utf-8'),
+                                         headers={'Content-Type': 'application/json'})
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return json.loads(response.read())
+        except urllib.error.HTTPError as e:
+            if 400 <= e.code < 500:
+                try:
+                    error = json.loads(e.read())['error']
+                except (ValueError, KeyError):
+                    error = e.reason
+                raise UnsupportedTileError(f"O servidor de inferência recusou {image_path}: {error}") from e
+            raise
+
+    def analyze_tile(self, image_path, output_dir, detection_table=None):
+        response = self.analyze(image_path, output_dir)
+        if detection_table is not None:
+            detections = response['detections']
+            detection_table.class_names.update({int(k): v for k, v in detections['names'].items()})
+            detection_table.add_arrays(image_path, detections_from_json(detections))
+        return response['analysed'], response['counts']
+
+
+# --- Loopback self-test ---------------------------------------------------
+
+class _StubArray:
+    def __init__(self, array):
+        self.array = np.asarray(array)
+
+    def cpu(self):
+        return self
+
+    def numpy(self):
+        return self.array
+
+    def __gt__(self, other):
+        return _StubArray(self.array > other)
+
+    def __len__(self):
+        return len(self.array)
+
+
+class _StubBoxes:
+    def __init__(self, n):
+        self.cls = _StubArray(np.arange(n) % 2)
+        self.conf = _StubArray(np.full(n, 0.9))
+        self.xyxy = _StubArray(np.tile([10.0, 10.0, 20.0, 20.0], (n, 1)))
+
+    def __len__(self):
+        return len(self.cls)
+
+
+class _StubMasks:
+    def __init__(self, n):
+        data = np.zeros((n, 32, 32), np.float32)
+        data[:, 8:16, 8:16] = 1.0
+        self.data = _StubArray(data)
+
+
+class _StubResult:
+    names = {0: 'viavel', 1: 'inviavel'}
+
+    def __init__(self, path, n):
+        self.orig_shape = (32, 32)
+        self.boxes = _StubBoxes(n)
+        self.masks = _StubMasks(n)
+        self.path = path
+
+    def plot(self):
+        return np.zeros((32, 32, 3), np.uint8)
+
+
+class _StubModel:
+    """Returns three detections per tile and records the size of every batch."""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def predict(self, source, **kwargs):
+        source = [source] if isinstance(source, str) else source
+        self.batch_sizes.append(len(source))
+        time.sleep(0.05)
+        return [_StubResult(path, 3) for path in source]
+
+
+def self_test(n_requests=16, max_batch=MAX_BATCH):
+    """Runs the server on an ephemeral loopback port with a stub model and checks
+    that concurrent requests are answered correctly and coalesced into batches."""
+    import tempfile
+    from concurrent.futures import ThreadPoolExecutor
+    from PIL import Image
+    from seed_detections import DetectionTable
+
+    model = _StubModel()
+    with tempfile.TemporaryDirectory() as tmp:
+        tiles_dir = os.path.join(tmp, 'recortes')
+        os.makedirs(tiles_dir)
+        server = make_server(model, port=0, max_batch=max_batch, window_ms=50, model_name='stub', roots=[tiles_dir])
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+        try:
+            client = RemoteModel(f"http://{DEFAULT_HOST}:{server.server_port}")
+            paths = []
+            for i in range(n_requests):
+                path = os.path.join(tiles_dir, f"tile_{i}.png")
+                Image.new('RGB', (32, 32)).save(path)
+                paths.append(path)
+            with ThreadPoolExecutor(max_workers=n_requests) as pool:
+                responses = list(pool.map(lambda p: client.analyze(p, tiles_dir), paths))
+            table = DetectionTable()
+            for path, response in zip(paths, responses):
+                assert os.path.exists(response['analysed']), response['analysed']
+                assert response['counts'] == {'total': 3, 'viable': 2, 'inviable': 1}, response['counts']
+                table.add_arrays(path, detections_from_json(response['detections']))
+            assert len(table) == 3 * n_requests, len(table)
+            assert float(table.to_arrays()['mask_area'][0]) == 64.0
+            # Outside the allowed folders, and archive members, are refused with an error, not zero counts
+            for image_path, output_dir in ((paths[0], tmp), (f"{tmp}.zip::/tile_0.png", tiles_dir)):
+                try:
+                    client.analyze(image_path, output_dir)
+                    raise AssertionError(f"requisição aceita: {image_path} / {output_dir}")
+                except UnsupportedTileError:
+                    pass
+            health = client.health()
+            assert health['stats']['requests'] == n_requests, health
+            assert sum(model.batch_sizes) == n_requests
+            assert max(model.batch_sizes) > 1, f"nenhum lote formado: {model.batch_sizes}"
+            assert max(model.batch_sizes) <= max_batch
+        finally:
+            server.shutdown()
+            server.server_close()
+            server.batcher.stop()
+    print(f"Auto-teste OK: {n_requests} requisições em {len(model.batch_sizes)} lotes {model.batch_sizes}")
+    return True
@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import socket
+import traceback
+
+from seed_watch import WatchSession, list_source_images, read_session, append_session, SESSION_FILENAME
+from seed_report import report_filename, write_report
+
+MANIFEST_DIRNAME = 'manifesto'
+MANIFEST_FILENAME = 'manifesto.json'
+LEASE_SECONDS = 900   # keep well above the slowest image and the clock skew between nodes
+MAX_ATTEMPTS = 3
+
+
+def default_worker_id():
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+def _write_atomic(path, text):
+    tmp = f"{path}.{default_worker_id()}.tmp"
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+class ShardManifest:
+    """Work manifest shared by headless workers through a folder (local disk or NFS).
+
+    Each shard is one source image with all its plates. A worker claims a shard by
+    hard-linking a lease file into reservas/ (atomic and exclusive, also over NFS),
+    writes the tile records to resultados/<shard>.jsonl through a temporary file and
+    os.replace, then drops the lease. The result file is the only "done" marker and
+    every output path depends on the image alone, so a shard processed twice after a
+    lost lease just rewrites the same files.
+    """
+
+    def __init__(self, root, lease_seconds=LEASE_SECONDS):
+        self.root = os.path.abspath(root)
+        self.lease_seconds = lease_seconds
+        self.leases_dir = os.path.join(self.root, 'reservas')
+        self.results_dir = os.path.join(self.root, 'resultados')
+        self.failures_dir = os.path.join(self.root, 'falhas')
+        meta = _read_json(os.path.join(self.root, MANIFEST_FILENAME))
+        if meta is None:
+            raise FileNotFoundError(f"Manifesto não encontrado em {self.root}")
+        self.meta = meta
+        self.shards = meta['shards']
+        self._next = 0
+
+    @classmethod
+    def create(cls, source, rois=None, processed=False, root=None):
+        """Lists the images of a folder or archive (minus those already in its session) as shards."""
+        source = os.path.abspath(source)
+        paths, folder = list_source_images(source)
+        root = os.path.abspath(root or os.path.join(folder, MANIFEST_DIRNAME))
+        manifest_path = os.path.join(root, MANIFEST_FILENAME)
+        if os.path.exists(manifest_path):
+            raise FileExistsError(f"Já existe um manifesto em {root}")
+        for name in ('reservas', 'resultados', 'falhas'):
+            os.makedirs(os.path.join(root, name), exist_ok=True)
+        known = {r['source'] for r in read_session(os.path.join(folder, SESSION_FILENAME))}
+        meta = {'source': source, 'folder': folder, 'rois': [list(r) for r in rois or []], 'processed': processed,
+                'created': time.time(), 'shards': [p for p in paths if p not in known]}
+        _write_atomic(manifest_path, json.dumps(meta, ensure_ascii=False, indent=2))
+        print(f"Manifesto com {len(meta['shards'])} de {len(paths)} imagens criado em {root}")
+        return cls(root)
+
+    def _name(self, i):
+        return f"{i:06d}"
+
+    def lease_path(self, i):
+        return os.path.join(self.leases_dir, f"{self._name(i)}.lease")
+
+    def result_path(self, i):
+        return os.path.join(self.results_dir, f"{self._name(i)}.jsonl")
+
+    def failure_path(self, i):
+        return os.path.join(self.failures_dir, f"{self._name(i)}.log")
+
+    def is_done(self, i):
+        return os.path.exists(self.result_path(i))
+
+    def attempts(self, i):
+        try:
+            with open(self.failure_path(i), encoding='utf-8') as f:
+                return sum(1 for _ in f)
+        except FileNotFoundError:
+            return 0
+
+    def _take_lease(self, i, worker):
+        lease = self.lease_path(i)
+        tmp = f"{lease}.{worker}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'worker': worker, 'expires': time.time() + self.lease_seconds}, f)
+        try:
+            try:
+                os.link(tmp, lease)
+                return True
+            except FileExistsError:
+                pass
+            held = _read_json(lease)
+            if held is None or held['expires'] > time.time():
+                return False
+            # Expired: only one worker wins the rename; make sure it moved the lease it read
+            stale = f"{lease}.{worker}.stale"
+            try:
+                os.rename(lease, stale)
+            except FileNotFoundError:
+                return False
+            taken = _read_json(stale)
+            if taken != held:
+                try:
+                    os.link(stale, lease)
+                except FileExistsError:
+                    pass
+                os.remove(stale)
+                return False
+            os.remove(stale)
+            print(f"Reserva expirada do lote {self._name(i)} ({held['worker']}) retomada por {worker}")
+            try:
+                os.link(tmp, lease)
+                return True
+            except FileExistsError:
+                return False
+        finally:
+            os.remove(tmp)
+
+    def claim(self, worker):
+        """Index of a shard now leased to `worker`, or None when nothing is left to claim."""
+        n = len(self.shards)
+        for offset in range(n):
+            i = (self._next + offset) % n
+            if self.is_done(i) or self.attempts(i) >= MAX_ATTEMPTS:
+                continue
+            if self._take_lease(i, worker):
+                if self.is_done(i):  # finished by the previous holder in the meantime
+                    self.release(i, worker)
+                    continue
+                self._next = i + 1
+                return i
+        return None
+
+    def release(self, i, worker):
+        held = _read_json(self.lease_path(i))
+        if held is not None and held['worker'] == worker:
+            try:
+                os.remove(self.lease_path(i))
+            except FileNotFoundError:
+                pass
+
+    def complete(self, i, records, worker):
+        _write_atomic(self.result_path(i), "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in records))
+        self.release(i, worker)
+
+    def fail(self, i, worker, error):
+        with open(self.failure_path(i), 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'worker': worker, 'time': time.time(), 'error': str(error)}, ensure_ascii=False) + "\n")
+        self.release(i, worker)
+
+    def status(self):
+        counts = {'concluídos': 0, 'em andamento': 0, 'reservas expiradas': 0, 'com falha': 0, 'pendentes': 0}
+        now = time.time()
+        for i in range(len(self.shards)):
+            held = _read_json(self.lease_path(i))
+            if self.is_done(i):
+                counts['concluídos'] += 1
+            elif self.attempts(i) >= MAX_ATTEMPTS:
+                counts['com falha'] += 1
+            elif held is not None:
+                counts['em andamento' if held['expires'] > now else 'reservas expiradas'] += 1
+            else:
+                counts['pendentes'] += 1
+        return counts
+
+    def records(self):
+        records = []
+        for i in range(len(self.shards)):
+            records.extend(read_session(self.result_path(i)))
+        return records
+
+    def merge(self, info, allow_partial=False):
+        """Appends the shard records to the folder's session file and writes the experiment report.
+
+        Without a reviewer every tile analysed without error counts as confirmed, which
+        gives the same report generate_report writes after confirming all tiles.
+        """
+        missing = [i for i in range(len(self.shards)) if not self.is_done(i)]
+        if missing and not allow_partial:
+            raise RuntimeError(f"{len(missing)} de {len(self.shards)} lotes ainda não concluídos.")
+        records = self.records()
+        folder = self.meta['folder']
+        session_path = os.path.join(folder, SESSION_FILENAME)
+        known = {r['source'] for r in read_session(session_path)}
+        append_session(session_path, [r for r in records if r['source'] not in known])
+        confirmed = [r for r in records if r.get('status') is None]
+        filename = write_report(report_filename(folder, info['Análise']), info, confirmed)
+        print(f"{len(self.shards) - len(missing)} lotes, {len(confirmed)} de {len(records)} recortes no relatório {filename}")
+        return filename
+
+
+def run_worker(root, model, worker=None, lease_seconds=LEASE_SECONDS):
+    """Claims and analyses shards until none is left; returns how many this worker finished."""
+    manifest = ShardManifest(root, lease_seconds=lease_seconds)
+    worker = worker or default_worker_id()
+    meta = manifest.meta
+    session = WatchSession(meta['folder'], model, rois=[tuple(r) for r in meta['rois']], processed=meta['processed'])
+    finished = 0
+    while True:
+        i = manifest.claim(worker)
+        if i is None:
+            break
+        path = manifest.shards[i]
+        started = time.perf_counter()
+        try:
+            records = session.analyze(path)
+        except Exception as e:
+            print(f"[{worker}] Erro ao analisar {path}: {e}")
+            traceback.print_exc()
+            manifest.fail(i, worker, e)
+            continue
+        manifest.complete(i, records, worker)
+        finished += 1
+        print(f"[{worker}] {os.path.basename(path)}: {len(records)} recortes em {time.perf_counter() - started:.1f} s")
+    print(f"[{worker}] {finished} lotes concluídos; nada mais a reservar.")
+    return finished
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+import numpy as np
+
+STATUS_PENDING = 0
+STATUS_CONFIRMED = 1
+STATUS_REMOVED = 2
+# Tile listed for review while its inference is still queued
+QUEUED_STATUS = 'Aguardando Análise'
+# Index = status code; None is a tile still waiting for review
+STATUS_LABELS = [None, 'Confirmado', 'Removido', 'Erro no Processamento', 'Erro na Análise YOLO',
+                 'Erro ao Abrir/Validar', QUEUED_STATUS]
+
+_INITIAL_CAPACITY = 256
+
+
+class AnalysisItem:
+    """Dict-like view of one row of an AnalysisStore. Writing 'status' goes through the store."""
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    def __getitem__(self, key):
+        value = self.store.field(self.row, key)
+        if value is None and key in ('source', 'plate', 'tile', 'rect'):
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        if key != 'status':
+            raise KeyError(f"{key} é somente leitura")
+        self.store.set_status(self.row, value)
+
+    def get(self, key, default=None):
+        value = self.store.field(self.row, key)
+        return default if value is None else value
+
+    def to_dict(self):
+        return {key: self.store.field(self.row, key) for key in AnalysisStore.FIELDS}
+
+
+class AnalysisStore:
+    """Column store for the tiles under review.
+
+    Counts and status live in NumPy arrays, paths are interned once, and the
+    per-status tile counts and seed totals are kept up to date on every status
+    change so the buttons and the report never rescan the list.
+    """
+
+    FIELDS = ('recorte', 'analysed', 'counts', 'status', 'source', 'plate', 'tile', 'rect', 'prescreen', 'triage')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self._n = 0
+        self._status = np.zeros(_INITIAL_CAPACITY, np.int8)
+        self._counts = np.zeros((_INITIAL_CAPACITY, 3), np.int32)  # total, viable, inviable
+        self._recorte = np.zeros(_INITIAL_CAPACITY, np.int32)
+        self._analysed = np.zeros(_INITIAL_CAPACITY, np.int32)
+        self._source = np.full(_INITIAL_CAPACITY, -1, np.int32)
+        self._plate = np.zeros(_INITIAL_CAPACITY, np.int8)
+        self._tile = np.full(_INITIAL_CAPACITY, -1, np.int16)
+        self._rect = np.zeros((_INITIAL_CAPACITY, 4), np.int32)
+        self._score = np.full(_INITIAL_CAPACITY, np.nan, np.float32)
+        self._seq = np.zeros(_INITIAL_CAPACITY, np.int64)  # position when added, kept through reorder
+        self._paths = []
+        self._path_ids = {}
+        self._prescreen = {}
+        self._triage = {}
+        self.status_labels = list(STATUS_LABELS)
+        self._status_codes = {label: code for code, label in enumerate(self.status_labels)}
+        self.status_counts = [0] * len(self.status_labels)
+        self.status_totals = np.zeros((len(self.status_labels), 3), np.int64)
+
+    def __len__(self):
+        return self._n
+
+    def __bool__(self):
+        return self._n > 0
+
+    def __getitem__(self, row):
+        if row < 0:
+            row += self._n
+        if not 0 <= row < self._n:
+            raise IndexError(row)
+        return AnalysisItem(self, row)
+
+    def __iter__(self):
+        for row in range(self._n):
+            yield AnalysisItem(self, row)
+
+    def _intern(self, path):
+        path_id = self._path_ids.get(path)
+        if path_id is None:
+            path_id = len(self._paths)
+            self._paths.append(path)
+            self._path_ids[path] = path_id
+        return path_id
+
+    def _code(self, status):
+        code = self._status_codes.get(status)
+        if code is None:
+            # Labels from older session files
+            code = len(self.status_labels)
+            self.status_labels.append(status)
+            self._status_codes[status] = code
+            self.status_counts.append(0)
+            self.status_totals = np.vstack([self.status_totals, np.zeros((1, 3), np.int64)])
+        return code
+
+    def _grow(self):
+        capacity = len(self._status) * 2
+        for name in ('_status', '_counts', '_recorte', '_analysed', '_source', '_plate', '_tile', '_rect', '_score', '_seq'):
+            old = getattr(self, name)
+            fill = -1 if name in ('_source', '_tile') else np.nan if name == '_score' else 0
+            new = np.full((capacity,) + old.shape[1:], fill, old.dtype)
+            new[:self._n] = old[:self._n]
+            setattr(self, name, new)
+
+    def append(self, item):
+        """Adds a tile from a dict (or another store's item); returns its row."""
+        if isinstance(item, AnalysisItem):
+            item = item.to_dict()
+        if self._n == len(self._status):
+            self._grow()
+        row = self._n
+        counts = item['counts']
+        values = (counts['total'], counts['viable'], counts['inviable'])
+        code = self._code(item.get('status'))
+        self._status[row] = code
+        self._counts[row] = values
+        self._recorte[row] = self._intern(item['recorte'])
+        self._analysed[row] = self._intern(item['analysed'])
+        if item.get('source') is not None:
+            self._source[row] = self._intern(item['source'])
+            self._plate[row] = item.get('plate') or 0
+            self._tile[row] = item['tile']
+            self._rect[row] = item['rect']
+        else:
+            self._source[row] = -1
+            self._tile[row] = -1
+        if item.get('prescreen'):
+            self._prescreen[row] = item['prescreen']
+        self._set_triage(row, item.get('triage'))
+        self._seq[row] = row
+        self._n += 1
+        self.status_counts[code] += 1
+        self.status_totals[code] += values
+        return row
+
+    def field(self, row, key):
+        if key == 'status':
+            return self.status_labels[self._status[row]]
+        if key == 'counts':
+            total, viable, inviable = (int(v) for v in self._counts[row])
+            return {'total': total, 'viable': viable, 'inviable': inviable}
+        if key == 'recorte':
+            return self._paths[self._recorte[row]]
+        if key == 'analysed':
+            return self._paths[self._analysed[row]]
+        if key == 'prescreen':
+            return self._prescreen.get(row)
+        if key == 'triage':
+            return self._triage.get(row)
+        source_id = self._source[row]
+        if source_id < 0:
+            return None
+        if key == 'source':
+            return self._paths[source_id]
+        if key == 'plate':
+            return int(self._plate[row])
+        if key == 'tile':
+            return int(self._tile[row])
+        if key == 'rect':
+            return tuple(int(v) for v in self._rect[row])
+        raise KeyError(key)
+
+    def status(self, row):
+        return self.status_labels[self._status[row]]
+
+    def set_status(self, row, status):
+        old = int(self._status[row])
+        new = self._code(status)
+        if old == new:
+            return
+        self._status[row] = new
+        self.status_counts[old] -= 1
+        self.status_counts[new] += 1
+        self.status_totals[old] -= self._counts[row]
+        self.status_totals[new] += self._counts[row]
+
+    def _set_triage(self, row, triage):
+        if triage:
+            self._triage[row] = triage
+            self._score[row] = triage['score']
+        else:
+            self._triage.pop(row, None)
+            self._score[row] = np.nan
+
+    def set_result(self, row, analysed, counts, prescreen=None, status=None, triage=None):
+        """Fills in a queued row once its inference is done."""
+        code = int(self._status[row])
+        self.status_totals[code] -= self._counts[row]
+        self._counts[row] = (counts['total'], counts['viable'], counts['inviable'])
+        self.status_totals[code] += self._counts[row]
+        self._analysed[row] = self._intern(analysed)
+        if prescreen:
+            self._prescreen[row] = prescreen
+        else:
+            self._prescreen.pop(row, None)
+        self._set_triage(row, triage)
+        self.set_status(row, status)
+
+    def set_status_where(self, status, current=Ellipsis):
+        """Sets `status` on every row (or only rows whose status is `current`); returns the rows changed."""
+        statuses = self._status[:self._n]
+        rows = np.arange(self._n) if current is Ellipsis else np.flatnonzero(statuses == self._code(current))
+        new = self._code(status)
+        rows = rows[statuses[rows] != new]
+        if len(rows):
+            statuses[rows] = new
+            self._recount()
+        return rows.tolist()
+
+    def _recount(self):
+        statuses = self._status[:self._n]
+        n_labels = len(self.status_labels)
+        self.status_counts = np.bincount(statuses, minlength=n_labels).tolist()
+        self.status_totals = np.zeros((n_labels, 3), np.int64)
+        np.add.at(self.status_totals, statuses, self._counts[:self._n])
+
+    def count(self, status):
+        code = self._status_codes.get(status)
+        return 0 if code is None else self.status_counts[code]
+
+    def totals(self, status):
+        """(total, viable, inviable) seeds over the tiles with this status."""
+        code = self._status_codes.get(status)
+        if code is None:
+            return 0, 0, 0
+        return tuple(int(v) for v in self.status_totals[code])
+
+    @property
+    def pending(self):
+        return self.status_counts[STATUS_PENDING]
+
+    @property
+    def confirmed(self):
+        return self.status_counts[STATUS_CONFIRMED]
+
+    @property
+    def removed(self):
+        return self.status_counts[STATUS_REMOVED]
+
+    def all_reviewed(self):
+        return self._n > 0 and self.confirmed + self.removed == self._n
+
+    def rows_with_status(self, status):
+        return np.flatnonzero(self._status[:self._n] == self._code(status)).tolist()
+
+    def plate_rows(self, row):
+        """Rows of the tiles cut from the same plate (source scan and ROI) as `row`, in tile order."""
+        source_id = self._source[row]
+        if source_id < 0:
+            return []
+        n = self._n
+        rows = np.flatnonzero((self._source[:n] == source_id) & (self._plate[:n] == self._plate[row]))
+        return rows[np.argsort(self._tile[rows], kind='stable')].tolist()
+
+    def plate_first_rows(self):
+        """First row of every plate, in list order."""
+        n = self._n
+        has_plate = self._source[:n] >= 0
+        keys = self._source[:n].astype(np.int64) * 256 + self._plate[:n]
+        _, first = np.unique(keys[has_plate], return_index=True)
+        return np.sort(np.flatnonzero(has_plate)[first]).tolist()
+
+    def review_order(self):
+        """Row order putting the tiles awaiting review first, least confident first
+        (unscored tiles count as least confident); every other row keeps its place after them."""
+        statuses = self._status[:self._n]
+        pending = np.flatnonzero(statuses == STATUS_PENDING)
+        scores = np.nan_to_num(self._score[pending], nan=-1.0)
+        pending = pending[np.argsort(scores, kind='stable')]
+        return np.concatenate([pending, np.flatnonzero(statuses != STATUS_PENDING)])
+
+    def reorder(self, order):
+        """Permutes the rows so that new row i is old row order[i]."""
+        order = np.asarray(order, np.int64)
+        n = self._n
+        for name in ('_status', '_counts', '_recorte', '_analysed', '_source', '_plate', '_tile', '_rect', '_score', '_seq'):
+            column = getattr(self, name)
+            column[:n] = column[order]
+        new_row = np.empty(n, np.int64)
+        new_row[order] = np.arange(n)
+        self._prescreen = {int(new_row[r]): v for r, v in self._prescreen.items()}
+        self._triage = {int(new_row[r]): v for r, v in self._triage.items()}
+        return new_row
+
+    def in_added_order(self, rows):
+        """`rows` sorted back into the order the tiles were added (scan, plate, tile),
+        whatever order the review list is in."""
+        rows = np.asarray(rows, np.int64)
+        return rows[np.argsort(self._seq[rows], kind='stable')].tolist()
+
+    def next_with_status(self, status, after=-1):
+        """First row with `status` after `after`, wrapping around; -1 if there is none."""
+        code = self._status_codes.get(status)
+        if code is None:
+            return -1
+        statuses = self._status[:self._n]
+        later = np.flatnonzero(statuses[after + 1:] == code)
+        if len(later):
+            return int(later[0]) + after + 1
+        earlier = np.flatnonzero(statuses[:max(after, 0)] == code)
+        return int(earlier[0]) if len(earlier) else -1
+
+    def first_not_in(self, statuses):
+        codes = [self._status_codes[s] for s in statuses if s in self._status_codes]
+        rows = np.flatnonzero(~np.isin(self._status[:self._n], codes))
+        return int(rows[0]) if len(rows) else -1
@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from seed_bundle import save_image, source_stem
+from seed_pipeline import (TARGET_RECT_WIDTH_ORIGINAL, TARGET_RECT_HEIGHT_ORIGINAL, EXPECTED_PROCESSED_WIDTH,
+                           EXPECTED_PROCESSED_HEIGHT, full_roi, plate_tile_rects, tile_name, empty_counts,
+                           load_tile_bgr)
+
+# --- Synthetic plates ---
+SYNTH_SCAN_MARGIN = 60                  # background around the plate ROI, in pixels
+SYNTH_SEEDS_PER_TILE = (15, 60)         # uniform range of seeds drawn in each tile
+SYNTH_VIABLE_FRACTION = 0.7
+SYNTH_SEED_AXES = (7, 13)               # ellipse semi-axes range, in pixels
+SYNTH_BACKGROUND = (232, 226, 214)      # RGB
+SYNTH_VIABLE_COLOR = (178, 38, 44)      # stained embryo
+SYNTH_INVIABLE_COLOR = (214, 178, 64)   # unstained embryo
+SYNTH_NOISE = 4                         # gray levels of Gaussian noise
+GROUND_TRUTH_FILENAME = 'gabarito.jsonl'
+ROI_FILENAME = 'roi.json'
+
+# --- Blob detector paired with the generator ---
+BLOB_MIN_SATURATION = 60
+BLOB_MIN_AREA = 60
+BLOB_VIABLE_MAX_GREEN = 110             # stained blobs have little green
+BLOB_CLASS_NAMES = {0: 'viavel', 1: 'inviavel'}
+
+
+def scan_size(plates=1):
+    return (TARGET_RECT_WIDTH_ORIGINAL + 2 * SYNTH_SCAN_MARGIN,
+            plates * TARGET_RECT_HEIGHT_ORIGINAL + 2 * SYNTH_SCAN_MARGIN)
+
+
+def scan_rois(plates=1):
+    return [(SYNTH_SCAN_MARGIN, SYNTH_SCAN_MARGIN + p * TARGET_RECT_HEIGHT_ORIGINAL) for p in range(plates)]
+
+
+def _draw_seeds(canvas, rng):
+    """Draws non-overlapping seeds on one tile-sized RGB view; returns its counts."""
+    h, w = canvas.shape[:2]
+    cell = 2 * SYNTH_SEED_AXES[1] + 10
+    cols, rows = (w - 8) // cell, (h - 8) // cell
+    n = min(int(rng.integers(SYNTH_SEEDS_PER_TILE[0], SYNTH_SEEDS_PER_TILE[1] + 1)), cols * rows)
+    counts = empty_counts()
+    # One seed per grid cell, jittered inside it, so seeds never touch each other or the tile edge
+    for cell_idx in rng.choice(cols * rows, n, replace=False):
+        viable = rng.random() < SYNTH_VIABLE_FRACTION
+        a, b = (int(v) for v in rng.integers(SYNTH_SEED_AXES[0], SYNTH_SEED_AXES[1] + 1, 2))
+        # At least 3 px of background on every side inside the cell, antialiasing included
+        slack = cell - 2 * max(a, b) - 6
+        cx = 4 + (cell_idx % cols) * cell + max(a, b) + 3 + int(rng.integers(0, slack + 1))
+        cy = 4 + (cell_idx // cols) * cell + max(a, b) + 3 + int(rng.integers(0, slack + 1))
+        color = SYNTH_VIABLE_COLOR if viable else SYNTH_INVIABLE_COLOR
+        cv2.ellipse(canvas, (cx, cy), (a, b), float(rng.uniform(0, 180)), 0, 360, color, -1, cv2.LINE_AA)
+        counts['viable' if viable else 'inviable'] += 1
+    counts['total'] = counts['viable'] + counts['inviable']
+    return counts
+
+
+def _finish(canvas, rng):
+    if SYNTH_NOISE:
+        noise = rng.normal(0, SYNTH_NOISE, canvas.shape).astype(np.int16)
+        canvas = np.clip(canvas.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+    return Image.fromarray(canvas)
+
+
+def generate_scan(dest, index, plates=1, processed=False, seed=0):
+    """Writes synthetic scan `index` (or its tiles when `processed`); returns its ground-truth record."""
+    rng = np.random.default_rng([seed, index])
+    name = f"placa_{index + 1:05d}.png"
+    source = os.path.join(dest, name)
+    rois = [full_roi(x, y) for x, y in scan_rois(plates)]
+    tiles = []
+    if processed:
+        for plate, idx, _ in plate_tile_rects(rois):
+            canvas = np.empty((EXPECTED_PROCESSED_HEIGHT, EXPECTED_PROCESSED_WIDTH, 3), np.uint8)
+            canvas[:] = SYNTH_BACKGROUND
+            counts = _draw_seeds(canvas, rng)
+            tile = tile_name(source, idx, plate)
+            _finish(canvas, rng).save(os.path.join(dest, tile), compress_level=1)
+            tiles.append({'recorte': tile, 'plate': plate, 'tile': idx, 'counts': counts})
+        return {'source': None, 'rois': None, 'tiles': tiles}
+    width, height = scan_size(plates)
+    canvas = np.empty((height, width, 3), np.uint8)
+    canvas[:] = SYNTH_BACKGROUND
+    for plate, idx, (x1, y1, x2, y2) in plate_tile_rects(rois):
+        counts = _draw_seeds(canvas[y1:y2, x1:x2], rng)
+        tiles.append({'recorte': tile_name(source, idx, plate), 'plate': plate, 'tile': idx, 'counts': counts})
+    _finish(canvas, rng).save(source, compress_level=1)
+    return {'source': name, 'rois': [list(r[:2]) for r in rois], 'tiles': tiles}
+
+
+def _generate_one(task):
+    return generate_scan(*task)
+
+
+def generate_plates(dest, count, plates=1, processed=False, seed=0, workers=None):
+    """Writes `count` synthetic scans (or their pre-split tiles) plus gabarito.jsonl with the
+    true counts of every tile and roi.json for `seed_cli.py analyze --roi`."""
+    os.makedirs(dest, exist_ok=True)
+    started = time.perf_counter()
+    tasks = [(dest, i, plates, processed, seed) for i in range(count)]
+    with Pool(workers or os.cpu_count()) as pool, \
+            open(os.path.join(dest, GROUND_TRUTH_FILENAME), 'w', encoding='utf-8') as f:
+        for i, record in enumerate(pool.imap(_generate_one, tasks, chunksize=4)):
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+            if (i + 1) % 500 == 0:
+                print(f"{i + 1} de {count} placas geradas...")
+    if not processed:
+        with open(os.path.join(dest, ROI_FILENAME), 'w', encoding='utf-8') as f:
+            json.dump([{'x': x, 'y': y} for x, y in scan_rois(plates)], f)
+    print(f"{count} {'conjuntos de recortes' if processed else 'imagens'} sintéticos em {dest} "
+          f"({time.perf_counter() - started:.1f} s)")
+
+
+def check_counts(session_path, truth_path):
+    """Compares the tile counts of a session file with the generator's ground truth."""
+    from seed_watch import read_session
+    truth = {}
+    with open(truth_path, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                for tile in json.loads(line)['tiles']:
+                    truth[tile['recorte']] = tile['counts']
+    found = {os.path.basename(r['recorte']): r['counts'] for r in read_session(session_path)}
+    common = [name for name in truth if name in found]
+    errors = [abs(found[n]['viable'] - truth[n]['viable']) + abs(found[n]['inviable'] - truth[n]['inviable'])
+              for n in common]
+    summary = {'tiles': len(truth), 'analysed': len(common), 'exact': sum(1 for e in errors if not e),
+               'tile_mae': round(float(np.mean(errors)), 4) if errors else 0.0}
+    print(f"{summary['analysed']} de {summary['tiles']} recortes analisados, {summary['exact']} com contagem exata, "
+          f"erro médio por recorte {summary['tile_mae']}")
+    return summary
+
+
+class BlobDetector:
+    """Stand-in for the YOLO model on synthetic plates: counts the colored blobs of a tile.
+
+    Accepted anywhere a loaded model is (like RemoteModel, it runs the whole
+    analyze_tile step), so loading, tiling, triage, review and the report can be
+    exercised without weights or a GPU.
+    """
+
+    def __repr__(self):
+        return "BlobDetector()"
+
+    def detect(self, tile_bgr):
+        hsv = cv2.cvtColor(tile_bgr, cv2.COLOR_BGR2HSV)
+        mask = (hsv[..., 1] > BLOB_MIN_SATURATION).astype(np.uint8)
+        n, labels, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        keep = np.flatnonzero(stats[1:, cv2.CC_STAT_AREA] >= BLOB_MIN_AREA) + 1
+        if not len(keep):
+            return np.zeros((0, 4), np.float32), np.zeros(0, np.int64), np.zeros(0, np.float32)
+        green = np.bincount(labels.ravel(), weights=tile_bgr[..., 1].ravel(), minlength=n)
+        area = stats[keep, cv2.CC_STAT_AREA].astype(np.float32)
+        class_id = (green[keep] / area > BLOB_VIABLE_MAX_GREEN).astype(np.int64)
+        x, y = stats[keep, cv2.CC_STAT_LEFT], stats[keep, cv2.CC_STAT_TOP]
+        bbox = np.stack([x, y, x + stats[keep, cv2.CC_STAT_WIDTH], y + stats[keep, cv2.CC_STAT_HEIGHT]], 1)
+        return bbox.astype(np.float32), class_id, area
+
+    def analyze_tile(self, image_path, output_dir, detection_table=None):
+        tile = load_tile_bgr(image_path)
+        bbox, class_id, area = self.detect(tile)
+        if detection_table is not None:
+            n = len(class_id)
+            detection_table.class_names.update(BLOB_CLASS_NAMES)
+            detection_table.add_arrays(image_path, {
+                'class_id': class_id.astype(np.int16), 'confidence': np.ones(n, np.float32), 'bbox': bbox,
+                'mask_area': area, 'mask_perimeter': (2 * np.sqrt(np.pi * area)).astype(np.float32),
+                'rle_counts': np.zeros(0, np.uint32), 'rle_offsets': np.zeros(n + 1, np.int64),
+                'mask_shape': (0, 0), 'orig_shape': tile.shape[:2]})
+        for (x1, y1, x2, y2), c in zip(bbox.astype(int), class_id):
+            cv2.rectangle(tile, (x1, y1), (x2, y2), (40, 200, 40) if c == 0 else (40, 40, 230), 2)
+        analysed = save_image(Image.fromarray(cv2.cvtColor(tile, cv2.COLOR_BGR2RGB)),
+                              os.path.join(output_dir, f"{source_stem(image_path)}_analisada.png"))
+        viable = int(np.sum(class_id == 0))
+        return analysed, {'total': len(class_id), 'viable': viable, 'inviable': len(class_id) - viable}
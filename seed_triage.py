@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+import random
+
+import numpy as np
+
+from seed_pipeline import PRESCREEN_EMPTY
+
+# --- Confidence triage ---
+TRIAGE_ENABLED = True               # scores tiles and orders the review list by them
+TRIAGE_AUTO_CONFIRM = False         # off until the cut-off below is validated against reviewed sessions
+TRIAGE_AUTO_CONFIRM_SCORE = 0.95    # tiles scoring at least this are confirmed without review
+TRIAGE_AUDIT_RATE = 0.05            # fraction of those left in the review list anyway, as an audit sample
+TRIAGE_MIN_CONFIDENCE = 0.5         # detections below this confidence count as uncertain
+TRIAGE_MIN_CIRCULARITY = 0.55       # 4*pi*area/perimeter^2; lower looks like touching seeds or debris
+TRIAGE_AREA_RANGE = (0.35, 2.5)     # accepted mask area relative to the tile's median seed area
+TRIAGE_NO_DETECTION_SCORE = 0.5     # a tile with foreground but no detections is neither sure nor unsure
+# --- End configuration ---
+
+
+def uncertain_detections(det):
+    """Boolean array flagging detections that are low-confidence or have an atypical mask."""
+    confidence = np.asarray(det['confidence'], np.float32)
+    area = np.asarray(det['mask_area'], np.float32)
+    perimeter = np.asarray(det['mask_perimeter'], np.float32)
+    uncertain = confidence < TRIAGE_MIN_CONFIDENCE
+    has_mask = (area > 0) & (perimeter > 0)
+    if has_mask.any():
+        circularity = np.zeros_like(area)
+        circularity[has_mask] = 4 * np.pi * area[has_mask] / perimeter[has_mask] ** 2
+        median_area = np.median(area[has_mask])
+        low, high = TRIAGE_AREA_RANGE
+        atypical = (circularity < TRIAGE_MIN_CIRCULARITY) | (area < low * median_area) | (area > high * median_area)
+        uncertain |= has_mask & atypical
+    return uncertain
+
+
+def triage_tile(det, screen=None, rng=random):
+    """Quality score in [0, 1] for one analysed tile and whether to confirm it automatically.
+
+    The score is the fraction of detections that are confident and seed-shaped. Tiles
+    the pre-screen skipped score 1 when empty and 0 when out of focus, but are never
+    confirmed automatically since no model saw them. With TRIAGE_AUTO_CONFIRM, a
+    fraction TRIAGE_AUDIT_RATE of the tiles that qualify is kept for review and marked as audit.
+    """
+    n = len(det['confidence'])
+    uncertain = 0
+    skipped = bool(screen) and not screen['audited']
+    if skipped:
+        score = 1.0 if screen['reason'] == PRESCREEN_EMPTY else 0.0
+    elif n == 0:
+        score = TRIAGE_NO_DETECTION_SCORE
+    else:
+        uncertain = int(uncertain_detections(det).sum())
+        score = 1.0 - uncertain / n
+    auto = TRIAGE_AUTO_CONFIRM and not skipped and score >= TRIAGE_AUTO_CONFIRM_SCORE
+    audit = auto and TRIAGE_AUDIT_RATE > 0 and rng.random() < TRIAGE_AUDIT_RATE
+    return {'score': round(score, 4), 'detections': n, 'uncertain': uncertain,
+            'mean_confidence': round(float(np.mean(det['confidence'])), 4) if n else None,
+            'auto': auto and not audit, 'audit': audit}
+
+
+def triage_summary(triages):
+    triages = [t for t in triages if t]
+    if not triages:
+        return None
+    auto = sum(1 for t in triages if t['auto'])
+    audit = sum(1 for t in triages if t['audit'])
+    return (f"Triagem por confiança: {auto} recortes confirmados automaticamente, {audit} em auditoria, "
+            f"{len(triages) - auto - audit} para revisão (ordenados do mais incerto ao mais seguro)")
@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+import os
+import json
+import time
+import queue
+import traceback
+from PIL import Image
+
+from seed_detections import DetectionTable
+from seed_archive import is_archive, archive_output_dir
+from seed_bundle import expand_archives, open_image, image_size, is_member_path, source_stem
+from seed_triage import TRIAGE_ENABLED, triage_tile
+from seed_pipeline import (
+    TARGET_RECT_WIDTH_ORIGINAL, TARGET_RECT_HEIGHT_ORIGINAL,
+    EXPECTED_PROCESSED_WIDTH, EXPECTED_PROCESSED_HEIGHT,
+    ORIGINAL_TILES_DIRNAME, ORIGINAL_ANALYZED_DIRNAME, PROCESSED_ANALYZED_DIRNAME,
+    is_image_file, plate_tile_rects, tile_path_for, analyze_tile, analyze_tiles, empty_counts, cascade_summary,
+    reset_cascade_stats
+)
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # watchdog is optional; the watcher falls back to polling
+    Observer = None
+    FileSystemEventHandler = object
+
+SESSION_FILENAME = 'sessao.jsonl'
+SETTLE_SECONDS = 2.0
+POLL_INTERVAL_SECONDS = 0.5
+MAX_OPEN_RETRIES = 20
+
+
+def source_key(path):
+    # Session sources are absolute paths (archive members already are)
+    return path if is_member_path(path) else os.path.abspath(path)
+
+
+def read_session(path):
+    records = []
+    if not os.path.exists(path):
+        return records
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    return records
+
+
+def append_session(path, records):
+    with open(path, 'a', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+
+class _QueueHandler(FileSystemEventHandler):
+    def __init__(self, events):
+        self.events = events
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self.events.put(event.src_path)
+
+    def on_modified(self, event):
+        if not event.is_directory:
+            self.events.put(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            self.events.put(event.dest_path)
+
+
+class FolderWatcher:
+    """Yields image files of one folder once they have stopped changing.
+
+    Uses watchdog (inotify on Linux) when installed and plain directory polling
+    otherwise. A file is ready when its size and mtime are unchanged for
+    `settle_seconds` and its header can be read.
+    """
+
+    def __init__(self, folder, settle_seconds=SETTLE_SECONDS, poll_interval=POLL_INTERVAL_SECONDS,
+                 force_polling=False, accept=None):
+        self.folder = os.path.abspath(folder)
+        self.accept = accept
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.events = queue.Queue()
+        self.candidates = {}
+        self.retries = {}
+        self.abandoned = set()
+        self.observer = None
+        if Observer is not None and not force_polling:
+            self.observer = Observer()
+            self.observer.schedule(_QueueHandler(self.events), self.folder, recursive=False)
+
+    @property
+    def mode(self):
+        return 'inotify/watchdog' if self.observer is not None else 'polling'
+
+    def start(self):
+        self.scan()
+        if self.observer is not None:
+            self.observer.start()
+
+    def stop(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+
+    def scan(self):
+        for entry in os.scandir(self.folder):
+            if entry.is_file() and is_image_file(entry.name):
+                self.events.put(entry.path)
+
+    def add(self, path):
+        path = os.path.abspath(path)
+        if os.path.dirname(path) != self.folder or not is_image_file(path) or path in self.abandoned:
+            return
+        if self.accept is not None and not self.accept(path):
+            return
+        if path not in self.candidates:
+            self.candidates[path] = (None, None, time.monotonic())
+
+    def retry_later(self, path):
+        self.retries[path] = self.retries.get(path, 0) + 1
+        if self.retries[path] <= MAX_OPEN_RETRIES:
+            self.candidates[path] = (None, None, time.monotonic())
+        else:
+            self.abandon(path, f"após {MAX_OPEN_RETRIES} tentativas")
+
+    def abandon(self, path, reason):
+        self.candidates.pop(path, None)
+        self.abandoned.add(path)
+        print(f"Desistindo de {path} {reason}.")
+
+    def ready_files(self):
+        if self.observer is None:
+            self.scan()
+        while True:
+            try:
+                self.add(self.events.get_nowait())
+            except queue.Empty:
+                break
+        ready = []
+        now = time.monotonic()
+        for path, (size, mtime, stable_since) in list(self.candidates.items()):
+            try:
+                st = os.stat(path)
+            except OSError:
+                self.candidates.pop(path, None)
+                continue
+            if (st.st_size, st.st_mtime_ns) != (size, mtime):
+                self.candidates[path] = (st.st_size, st.st_mtime_ns, now)
+                continue
+            if now - stable_since < self.settle_seconds:
+                continue
+            try:
+                with Image.open(path) as img:
+                    img.size
+            except Exception:
+                self.candidates.pop(path)
+                self.retry_later(path)
+                continue
+            self.candidates.pop(path)
+            ready.append(path)
+        return sorted(ready)
+
+
+class WatchSession:
+    """Analyzes newly arrived scans and appends one JSON record per tile to the session file."""
+
+    def __init__(self, folder, model, rois=None, processed=False):
+        folder = os.path.abspath(folder)
+        self.folder = folder
+        self.model = model
+        self.rois = rois or []
+        self.processed = processed
+        if processed:
+            self.tiles_dir = None
+            self.analyzed_dir = os.path.join(folder, PROCESSED_ANALYZED_DIRNAME)
+        else:
+            self.tiles_dir = os.path.join(folder, ORIGINAL_TILES_DIRNAME)
+            self.analyzed_dir = os.path.join(folder, ORIGINAL_ANALYZED_DIRNAME)
+            os.makedirs(self.tiles_dir, exist_ok=True)
+        os.makedirs(self.analyzed_dir, exist_ok=True)
+        self.session_path = os.path.join(folder, SESSION_FILENAME)
+        self.known_sources = {source_key(r['source']) for r in read_session(self.session_path)}
+
+    def is_new(self, path):
+        return source_key(path) not in self.known_sources
+
+    def analyze(self, path):
+        """Tiles and infers one image, saving its detections; returns the tile records without
+        touching the session file. Output paths depend only on `path`, so re-running is harmless."""
+        detection_table = DetectionTable()
+        if self.processed:
+            records = self._process_tile(path, detection_table)
+        else:
+            records = self._process_original(path, detection_table)
+        if TRIAGE_ENABLED:
+            # Saved with the records so the GUI shows the scores when it loads the session
+            for record in records:
+                if record['status'] is None:
+                    record['triage'] = triage_tile(detection_table.tile_detections(record['recorte']))
+        if len(detection_table):
+            detection_table.save(os.path.join(self.analyzed_dir, f"deteccoes_{source_stem(path)}.npz"))
+        return records
+
+    def process(self, path):
+        started = time.perf_counter()
+        records = self.analyze(path)
+        append_session(self.session_path, records)
+        self.known_sources.add(source_key(path))
+        counts = empty_counts()
+        for record in records:
+            for k in counts:
+                counts[k] += record['counts'][k]
+        message = (f"{os.path.basename(path)}: {len(records)} recortes, {counts['total']} sementes "
+                   f"({counts['viable']} viáveis) em {time.perf_counter() - started:.1f} s")
+        try:
+            message += f", {time.time() - os.path.getmtime(path):.1f} s após a gravação"
+        except OSError:
+            pass  # archive members have no mtime of their own
+        print(message)
+        return records
+
+    def _record(self, source, idx, rect, tile_path, analyzed_path, counts, status=None, plate=0):
+        return {'source': source, 'plate': plate, 'tile': idx, 'rect': list(rect) if rect else None,
+                'recorte': tile_path, 'analysed': analyzed_path, 'counts': counts, 'status': status,
+                'time': time.time()}
+
+    def _process_tile(self, path, detection_table):
+        width, height = image_size(path)
+        if width != EXPECTED_PROCESSED_WIDTH or height != EXPECTED_PROCESSED_HEIGHT:
+            print(f"{os.path.basename(path)} [DIMENSÕES INVÁLIDAS: {width}x{height}, "
+                  f"esperado {EXPECTED_PROCESSED_WIDTH}x{EXPECTED_PROCESSED_HEIGHT}]")
+            return [self._record(path, 0, None, path, path, empty_counts(), 'Erro ao Abrir/Validar')]
+        analyzed_path, counts = analyze_tile(self.model, path, self.analyzed_dir, detection_table)
+        return [self._record(path, 0, None, path, analyzed_path, counts)]
+
+    def _process_original(self, path, detection_table):
+        pil = open_image(path).convert('RGB')
+        width, height = pil.size
+        if width < TARGET_RECT_WIDTH_ORIGINAL or height < TARGET_RECT_HEIGHT_ORIGINAL:
+            print(f"{os.path.basename(path)} [TAMANHO INSUFICIENTE]")
+            return []
+        rois = [(max(0, min(x, width - TARGET_RECT_WIDTH_ORIGINAL)), max(0, min(y, height - TARGET_RECT_HEIGHT_ORIGINAL)),
+                 TARGET_RECT_WIDTH_ORIGINAL, TARGET_RECT_HEIGHT_ORIGINAL) for x, y in self.rois]
+        records = {}
+        cropped = []
+        # All plates are cropped from this one decode and inferred as a single batch
+        for plate, idx, rect in plate_tile_rects(rois):
+            tile_path = tile_path_for(path, idx, self.tiles_dir, plate)
+            try:
+                pil.crop(rect).save(tile_path)
+                cropped.append((plate, idx, rect, tile_path))
+            except Exception as e:
+                print(f"Erro ao processar tile {idx+1} (placa {plate+1}) da imagem {os.path.basename(path)}: {e}")
+                traceback.print_exc()
+                records[plate, idx] = self._record(path, idx, rect, tile_path, tile_path, empty_counts(),
+                                                   'Erro no Processamento', plate)
+        outputs = analyze_tiles(self.model, [c[3] for c in cropped], self.analyzed_dir, detection_table)
+        for (plate, idx, rect, tile_path), (analyzed_path, counts) in zip(cropped, outputs):
+            records[plate, idx] = self._record(path, idx, rect, tile_path, analyzed_path, counts, plate=plate)
+        return [records[key] for key in sorted(records)]
+
+
+def run_watch(folder, model, rois=None, processed=False, settle_seconds=SETTLE_SECONDS,
+              poll_interval=POLL_INTERVAL_SECONDS, force_polling=False, stop_event=None):
+    session = WatchSession(folder, model, rois=rois, processed=processed)
+    watcher = FolderWatcher(folder, settle_seconds=settle_seconds, poll_interval=poll_interval,
+                            force_polling=force_polling, accept=session.is_new)
+    watcher.start()
+    print(f"Monitorando {folder} ({watcher.mode}); sessão em {session.session_path}")
+    try:
+        while stop_event is None or not stop_event.is_set():
+            for path in watcher.ready_files():
+                try:
+                    session.process(path)
+                except OSError as e:
+                    # Most often a file still being copied; try again once it settles
+                    print(f"Não foi possível ler {path} ainda: {e}")
+                    watcher.retry_later(path)
+                except Exception as e:
+                    # A file that will never decode (e.g. DecompressionBombError); keep watching the rest
+                    print(f"Erro ao analisar {path}: {e}")
+                    traceback.print_exc()
+                    watcher.abandon(path, "por erro na análise")
+            time.sleep(poll_interval)
+    except KeyboardInterrupt:
+        print("Monitoramento encerrado.")
+    finally:
+        watcher.stop()
+    return session
+
+
+def list_source_images(source):
+    """Images of a folder or a zip/tar archive, and the folder their outputs go to."""
+    if is_archive(source):
+        folder = archive_output_dir(source)
+        os.makedirs(folder, exist_ok=True)
+        return expand_archives([source], is_image_file), folder
+    return sorted(os.path.join(source, fn) for fn in os.listdir(source) if is_image_file(fn)), source
+
+
+def run_batch(source, model, rois=None, processed=False):
+    """One-shot analysis of every image in a folder or a zip/tar archive, into the same
+    session file the watcher uses. Images already in the session are skipped."""
+    source = os.path.abspath(source)
+    paths, folder = list_source_images(source)
+    session = WatchSession(folder, model, rois=rois, processed=processed)
+    pending = [p for p in paths if session.is_new(p)]
+    print(f"{len(pending)} de {len(paths)} imagens a analisar em {source}; sessão em {session.session_path}")
+    reset_cascade_stats()
+    for path in pending:
+        try:
+            session.process(path)
+        except Exception as e:
+            print(f"Erro ao analisar {path}: {e}")
+            traceback.print_exc()
+    summary = cascade_summary()
+    if summary:
+        print(summary)
+    return session